@@ -5,11 +5,13 @@ Revises: ApdbCassandra_1.2.1
 Create Date: 2025-11-24 16:01:11.609198
 """
 
+import dataclasses
 import logging
 
 import cassandra.query
 
 from lsst.dax.apdb_migrate.cassandra.context import Context
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
 from lsst.utils.iteration import chunk_iterable
 
 # revision identifiers, used by Alembic.
@@ -22,18 +24,15 @@ _LOG = logging.getLogger(__name__)
 
 _TABLE_NAME = "DiaObjectDedup"
 
-_CREATE_TABLE = """\
-CREATE TABLE "{keyspace}"."{table_name}" (
-  dedup_part smallint,
-  "diaObjectId" bigint,
-  "validityStartMjdTai" double,
-  ra double,
-  dec double,
-  "nDiaSources" int,
-  "firstDiaSourceMjdTai" double,
-  PRIMARY KEY (dedup_part, "diaObjectId", "validityStartMjdTai")
-)
-"""
+_TABLE_COLUMNS = [
+    Column("dedup_part", "smallint", "partition_key", 0),
+    Column("diaObjectId", "bigint", "clustering", 0, "asc"),
+    Column("validityStartMjdTai", "double", "clustering", 1, "asc"),
+    Column("ra", "double", "regular"),
+    Column("dec", "double", "regular"),
+    Column("nDiaSources", "int", "regular"),
+    Column("firstDiaSourceMjdTai", "double", "regular"),
+]
 
 _COLUMNS = ("diaObjectId", "validityStartMjdTai", "ra", "dec", "nDiaSources", "firstDiaSourceMjdTai")
 
@@ -43,8 +42,13 @@ def upgrade() -> None:
 
     Summary of changes:
       - Create a "nightly" subset of DiaObject table.
+
+    This migration supports online mode (``--options online=1``), the table is
+    created and filled while APDB is live, and the second run of the same
+    upgrade only copies the records written since the first run started. Both
+    runs need the same ``data-source`` and ``num-partitions`` options.
     """
-    with Context(revision) as ctx:
+    with Context(revision, online=True) as ctx:
         source = ctx.get_mig_option("data-source")
         if source not in ("DiaObject", "DiaObjectLast"):
             raise ValueError(
@@ -78,17 +82,26 @@ def upgrade() -> None:
             if not source_tables:
                 raise LookupError(f"Table {source} does not exist in this database.")
 
-        # Create table.
-        _LOG.info("Creating table %s", _TABLE_NAME)
-        query = _CREATE_TABLE.format(keyspace=ctx.keyspace, table_name=_TABLE_NAME)
-        ctx.session.execute(query)
-
-        if source_tables:
-            _populate(ctx, source_tables, num_part)
+        # Create table, with compaction disabled while it is being filled.
+        table_schema = TableSchema(
+            keyspace=ctx.keyspace,
+            table_name=_TABLE_NAME,
+            columns=[dataclasses.replace(column) for column in _TABLE_COLUMNS],
+            table_options={},
+        )
+        if ctx.online_phase == "catch-up":
+            # Table was created and filled in backfill phase.
+            if source_tables:
+                _populate(ctx, source_tables, num_part, since=ctx.online_scan_start)
+        elif source_tables:
+            with ctx.bulk_load(table_schema):
+                _populate(ctx, source_tables, num_part)
+        else:
+            _LOG.info("Creating table %s", _TABLE_NAME)
+            ctx.update(table_schema.make_ddl())
 
         # Update configuration.
-        updates = {"num_part_dedup": num_part}
-        ctx.metadata.update_config(updates)
+        ctx.update_apdb_config({"num_part_dedup": num_part})
 
 
 def downgrade() -> None:
@@ -97,15 +110,19 @@ def downgrade() -> None:
         # Drop table.
         _LOG.info("Dropping table %s", _TABLE_NAME)
         query = f'DROP TABLE "{ctx.keyspace}"."{_TABLE_NAME}"'
-        ctx.session.execute(query)
+        ctx.update(query)
 
         # Update configuration.
-        deletes = ["num_part_dedup"]
-        ctx.metadata.update_config(deletes=deletes)
+        ctx.update_apdb_config(deletes=["num_part_dedup"])
 
 
-def _populate(ctx: Context, source_tables: list[str], num_part: int) -> None:
-    """Populate new table from one or more other tables."""
+def _populate(ctx: Context, source_tables: list[str], num_part: int, since: float | None = None) -> None:
+    """Populate new table from one or more other tables.
+
+    Partition for each record is determined by its diaObjectId, so records
+    that are copied more than once (e.g. in both phases of online migration)
+    overwrite the same rows.
+    """
     column_list = ", ".join(f'"{column}"' for column in _COLUMNS)
 
     # Prepare insert query.
@@ -113,31 +130,29 @@ def _populate(ctx: Context, source_tables: list[str], num_part: int) -> None:
     insert = (
         f'INSERT INTO "{ctx.keyspace}"."{_TABLE_NAME}" (dedup_part, {column_list}) VALUES ({placeholders})'
     )
-    insert_stmt = ctx.session.prepare(insert)
+    insert_stmt = ctx.prepare(insert)
 
     total_count = 0
-    partition = 0
     for table in sorted(source_tables):
         _LOG.info("Populating %s from %s", _TABLE_NAME, table)
 
-        query = f'SELECT {column_list} FROM "{ctx.keyspace}"."{table}" ALLOW FILTERING'
-        # This can take some time, make sure we do not timeout.
-        result = ctx.session.execute(query, timeout=3600)
-        # Somehow itertools don't work on result, need to make a list first
-        result = list(result)
+        if since is None:
+            snapshot = ctx.scan_table(table, _COLUMNS)
+        else:
+            snapshot = ctx.scan_table_since(table, _COLUMNS, since)
 
         count = 0
-        # Make batches of 1k inserts and send them to the same partition.
-        for row_chunk in chunk_iterable(result, 1_000):
-            batch = cassandra.query.BatchStatement()
-            for row in row_chunk:
-                count += 1
-                params = [partition] + list(row)
-                batch.add(insert_stmt, params)
-            ctx.session.execute(batch)
-
-            # Move to next partition.
-            partition = (partition + 1) % num_part
+        partitions = snapshot.data["diaObjectId"] % num_part
+        for partition in range(num_part):
+            part_snapshot = snapshot.select(partitions == partition)
+            # Make batches of 1k inserts and send them to the same partition.
+            for row_chunk in chunk_iterable(part_snapshot.rows(_COLUMNS), 1_000):
+                batch = cassandra.query.BatchStatement()
+                for row in row_chunk:
+                    count += 1
+                    params = [partition] + list(row)
+                    batch.add(insert_stmt, params)
+                ctx.update(batch)
 
         _LOG.info("Inserted %d records from table %s", count, table)
         total_count += count
@@ -8,6 +8,7 @@ Create Date: 2025-04-02 10:25:59.949120
 import logging
 
 from lsst.dax.apdb_migrate.cassandra.context import Context
+from lsst.dax.apdb_migrate.cassandra.ddl import AddColumns, DropColumns
 
 # revision identifiers, used by Alembic.
 revision = "schema_3.0.0"
@@ -40,11 +41,7 @@ def _migrate(add: bool, final_revision: str) -> None:
             tables.append("DiaSourceChunks")
 
         column = "dipoleFitAttempted"
-        for table in tables:
-            if add:
-                _LOG.info("Adding column %s to table %s", column, table)
-                query = f'ALTER TABLE "{ctx.keyspace}"."{table}" ADD "{column}" BOOLEAN'
-            else:
-                _LOG.info("Dropping column %s from table %s", column, table)
-                query = f'ALTER TABLE "{ctx.keyspace}"."{table}" DROP "{column}"'
-            ctx.update(query)
+        if add:
+            ctx.apply_ddl(AddColumns(table, {column: "BOOLEAN"}) for table in tables)
+        else:
+            ctx.apply_ddl(DropColumns(table, [column]) for table in tables)
@@ -50,33 +50,24 @@ def _migrate(add: bool, final_revision: str) -> None:
 
         if add:
             # Populate new column.
-            query = (
-                'SELECT apdb_part, "diaSourceId", "diaObjectId" '
-                f'FROM "{ctx.keyspace}"."DiaSource" ALLOW FILTERING'
-            )
-            result = ctx.query(query)
+            result = ctx.schema.scan("DiaSource", 'apdb_part, "diaSourceId", "diaObjectId"')
 
             counter: Counter = Counter()
             counter.update(row[2] for row in result)
             _LOG.info("Found %s DiaObjects in DiaSources table", len(counter))
 
-            query = f'SELECT apdb_part, "diaObjectId" FROM "{ctx.keyspace}"."DiaObjectLast"  ALLOW FILTERING'
-            result = ctx.query(query)
+            result = ctx.schema.scan("DiaObjectLast", 'apdb_part, "diaObjectId"')
             last_ids = sorted((row[0], row[1]) for row in result)
 
             _LOG.info("Found %s DiaObjects in DiaObjectLast table", len(last_ids))
             last_obj_ids = set(r[1] for r in last_ids)
             _LOG.info("Found %s unique DiaObjects in DiaObjectLast table", len(last_obj_ids))
 
-            if ctx.dry_run:
-                _LOG.info("Skipping updates due to dry-run.")
-                return
-
             update_query = (
                 f'UPDATE "{ctx.keyspace}"."DiaObjectLast" '
                 'SET "nDiaSources" = ? WHERE apdb_part = ? AND "diaObjectId" = ?'
             )
-            stmt = ctx.session.prepare(update_query)
+            stmt = ctx.prepare(update_query)
 
             batches = []
             for rec_chunk in chunk_iterable(last_ids, 50_000):
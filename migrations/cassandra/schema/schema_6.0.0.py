@@ -8,6 +8,7 @@ Create Date: 2025-04-02 10:26:10.607570
 import logging
 
 from lsst.dax.apdb_migrate.cassandra.context import Context
+from lsst.dax.apdb_migrate.cassandra.ddl import AddColumns, DropColumns
 
 # revision identifiers, used by Alembic.
 revision = "schema_6.0.0"
@@ -40,12 +41,7 @@ def _migrate(add: bool, final_revision: str) -> None:
         if ctx.has_replicas():
             tables.append("DiaSourceChunks")
 
-        for table in tables:
-            for column in new_columns:
-                if add:
-                    _LOG.info("Adding column %s to table %s", column, table)
-                    query = f'ALTER TABLE "{ctx.keyspace}"."{table}" ADD "{column}" BOOLEAN'
-                else:
-                    _LOG.info("Dropping column %s from table %s", column, table)
-                    query = f'ALTER TABLE "{ctx.keyspace}"."{table}" DROP "{column}"'
-                ctx.update(query)
+        if add:
+            ctx.apply_ddl(AddColumns(table, dict.fromkeys(new_columns, "BOOLEAN")) for table in tables)
+        else:
+            ctx.apply_ddl(DropColumns(table, new_columns) for table in tables)
@@ -8,6 +8,7 @@ Create Date: 2025-07-25 13:59:21.723106
 import logging
 
 from lsst.dax.apdb_migrate.cassandra.context import Context
+from lsst.dax.apdb_migrate.cassandra.ddl import AddColumns, DropColumns
 
 # revision identifiers, used by Alembic.
 revision = "schema_7.0.0"
@@ -28,11 +29,9 @@ def upgrade() -> None:
         tables = ctx.schema.tables_for_schema("DiaSource")
         if not tables:
             raise RuntimeError("Cannot find DiaSource* tables in the database.")
-        for table in tables:
-            column_name = "glint_trail"
-            _LOG.info("Adding %s column to %s table", column_name, table)
-            query = f'ALTER TABLE "{ctx.keyspace}"."{table}" ADD "{column_name}" BOOLEAN'
-            ctx.update(query)
+        column_name = "glint_trail"
+        _LOG.info("Adding %s column to %d tables", column_name, len(tables))
+        ctx.apply_ddl(AddColumns(table, {column_name: "BOOLEAN"}) for table in tables)
 
 
 def downgrade() -> None:
@@ -41,8 +40,6 @@ def downgrade() -> None:
         tables = ctx.schema.tables_for_schema("DiaSource")
         if not tables:
             raise RuntimeError("Cannot find DiaSource* tables in the database.")
-        for table in tables:
-            column_name = "glint_trail"
-            _LOG.info("Dropping %s column from %s table", column_name, table)
-            query = f'ALTER TABLE "{ctx.keyspace}"."{table}" DROP "{column_name}"'
-            ctx.update(query)
+        column_name = "glint_trail"
+        _LOG.info("Dropping %s column from %d tables", column_name, len(tables))
+        ctx.apply_ddl(DropColumns(table, [column_name]) for table in tables)
@@ -8,6 +8,7 @@ Create Date: 2025-08-13 20:08:34.303005
 import logging
 
 from lsst.dax.apdb_migrate.cassandra.context import Context
+from lsst.dax.apdb_migrate.cassandra.ddl import AddColumns, DdlOperation, DropColumns
 
 # revision identifiers, used by Alembic.
 revision = "schema_8.0.0"
@@ -271,83 +272,70 @@ def upgrade() -> None:
                 "ApdbCassandra version needs to be upgraded to 0.1.1 before this migration can be applied"
             ) from exc
 
+        # All columns are added first, followed by all drops, each group
+        # modifies every table at most once, so its statements can run
+        # concurrently. Columns that were already added or dropped by a
+        # previous failed attempt are skipped.
+        add_ops: list[DdlOperation] = []
+        drop_ops: list[DdlOperation] = []
         for table_name in _tables_to_migrate:
-            tables = ctx.schema.tables_for_schema(table_name)
-            if not tables:
-                continue
+            additions: dict[str, str] = {}
+            drops: list[str] = []
 
-            for table in tables:
-                additions = []
-                drops = []
+            if columns_to_add := _added_columns.get(table_name):
+                additions.update(columns_to_add)
 
-                if columns_to_add := _added_columns.get(table_name):
-                    additions += [
-                        f'"{column_name}" {column_type}'
-                        for column_name, column_type in columns_to_add.items()
-                    ]
+            if columns_to_rename := _renamed_columns.get(table_name):
+                # Cassandra does not allow renaming, instead drop and add.
+                drops += list(columns_to_rename)
+                additions.update(columns_to_rename.values())
 
-                if columns_to_rename := _renamed_columns.get(table_name):
-                    # Cassandra does not allow renaming, instead drop and add.
-                    drops += [f'"{old_column_name}"' for old_column_name, _ in columns_to_rename.items()]
-                    additions += [
-                        f'"{new_column_name}" {column_type}'
-                        for _, (new_column_name, column_type) in columns_to_rename.items()
-                    ]
+            if columns_to_drop := _dropped_columns.get(table_name):
+                drops += list(columns_to_drop)
 
-                if columns_to_drop := _dropped_columns.get(table_name):
-                    drops += [f'"{column_name}"' for column_name in columns_to_drop]
-
-                # NOTE: Changing column types is not supported in Cassandra, we
-                # could drop and re-add the column with a different type, but
-                # it will destroy existing data. In this particular case it is
-                # possible to keep the existing column type (BIGINT).
+            # NOTE: Changing column types is not supported in Cassandra, we
+            # could drop and re-add the column with a different type, but
+            # it will destroy existing data. In this particular case it is
+            # possible to keep the existing column type (BIGINT).
 
+            for table in ctx.schema.tables_for_schema(table_name):
                 if additions:
-                    _LOG.info("Adding %d columns to table %s", len(additions), table)
-                    query = f'ALTER TABLE "{ctx.keyspace}"."{table}" ADD ({", ".join(additions)})'
-                    ctx.update(query)
-
+                    add_ops.append(AddColumns(table, additions))
                 if drops:
-                    _LOG.info("Dropping %d columns from table %s", len(drops), table)
-                    query = f'ALTER TABLE "{ctx.keyspace}"."{table}" DROP ({", ".join(drops)})'
-                    ctx.update(query)
+                    drop_ops.append(DropColumns(table, drops))
+
+        ctx.apply_ddl(add_ops)
+        ctx.apply_ddl(drop_ops)
 
 
 def downgrade() -> None:
     """Undo changes applied in `upgrade`."""
     with Context(down_revision) as ctx:
+        add_ops: list[DdlOperation] = []
+        drop_ops: list[DdlOperation] = []
         for table_name in _tables_to_migrate:
-            tables = ctx.schema.tables_for_schema(table_name)
-            if not tables:
-                continue
+            additions: dict[str, str] = {}
+            drops: list[str] = []
 
-            for table in tables:
-                additions = []
-                drops = []
+            if columns_to_add := _added_columns.get(table_name):
+                drops += list(columns_to_add)
 
-                if columns_to_add := _added_columns.get(table_name):
-                    drops += [f'"{column_name}"' for column_name in columns_to_add]
+            if columns_to_rename := _renamed_columns.get(table_name):
+                # Cassandra does not allow renaming, instead drop and add.
+                additions.update(
+                    (old_column_name, column_type)
+                    for old_column_name, (_, column_type) in columns_to_rename.items()
+                )
+                drops += [new_column_name for new_column_name, _ in columns_to_rename.values()]
 
-                if columns_to_rename := _renamed_columns.get(table_name):
-                    # Cassandra does not allow renaming, instead drop and add.
-                    additions += [
-                        f'"{old_column_name}" {column_type}'
-                        for old_column_name, (_, column_type) in columns_to_rename.items()
-                    ]
-                    drops += [f'"{new_column_name}"' for new_column_name, _ in columns_to_rename.values()]
-
-                if columns_to_drop := _dropped_columns.get(table_name):
-                    additions += [
-                        f'"{column_name}" {column_type}'
-                        for column_name, column_type in columns_to_drop.items()
-                    ]
+            if columns_to_drop := _dropped_columns.get(table_name):
+                additions.update(columns_to_drop)
 
+            for table in ctx.schema.tables_for_schema(table_name):
                 if additions:
-                    _LOG.info("Adding %d columns to table %s", len(additions), table)
-                    query = f'ALTER TABLE "{ctx.keyspace}"."{table}" ADD ({", ".join(additions)})'
-                    ctx.update(query)
-
+                    add_ops.append(AddColumns(table, additions))
                 if drops:
-                    _LOG.info("Dropping %d columns from table %s", len(drops), table)
-                    query = f'ALTER TABLE "{ctx.keyspace}"."{table}" DROP ({", ".join(drops)})'
-                    ctx.update(query)
+                    drop_ops.append(DropColumns(table, drops))
+
+        ctx.apply_ddl(add_ops)
+        ctx.apply_ddl(drop_ops)
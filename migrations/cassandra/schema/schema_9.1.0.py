@@ -6,9 +6,11 @@ Create Date: 2025-10-14 20:54:13.669243
 """
 
 import logging
+import re
+import time
 
 import cassandra.query
-from lsst.dax.apdb_migrate.cassandra.context import Context
+from lsst.dax.apdb_migrate.cassandra.context import BackfillContext, Context
 from lsst.utils.iteration import chunk_iterable
 
 # revision identifiers, used by Alembic.
@@ -33,8 +35,19 @@ def upgrade() -> None:
     large. It may be necessary to use different approach in that case, e.g.
     dumping data to CVS files with dsbulk and working on those files. Also,
     database may be configured without DiaObject table.
+
+    Scanned data can be cached locally with ``--options snapshot-cache=PATH``
+    to avoid repeated scans when migration is re-run after failure.
+
+    This migration supports online mode (``--options online=1``), the column
+    is added and filled while APDB is live, and the second run of the same
+    upgrade only fills the records written since the first run started.
+
+    With ``--options backfill=deferred`` only the column is added, filling it
+    is done later by ``apdb-migrate-cassandra backfill`` command, starting
+    from the most recent time partitions.
     """
-    with Context(revision) as ctx:
+    with Context(revision, online=True) as ctx:
         # Get the list of source tables.
         tables = ctx.schema.tables_for_schema("DiaObject", include_replica=False, include_obj_last=False)
         if tables != ["DiaObject"]:
@@ -42,18 +55,27 @@ def upgrade() -> None:
         if not tables:
             raise LookupError("Table DiaObject does not exist in this database.")
 
+        if ctx.get_mig_option("backfill") == "deferred":
+            if ctx.online_phase is not None:
+                raise ValueError("Online mode cannot be used with deferred backfill.")
+            _add_column(ctx)
+            ctx.add_backfill_job(_backfill_units(ctx, tables))
+            return
+
+        # In catch-up phase only look at records written after backfill
+        # phase started.
+        since = ctx.online_scan_start if ctx.online_phase == "catch-up" else None
+
         # Get existing diaObjectIds in DiaObjectLast table.
-        last_dia_object_ids = _get_last_dia_object_ids(ctx)
+        last_dia_object_ids = _get_last_dia_object_ids(ctx, since)
         _LOG.info("Found %d unique DiaObjects in DiaObjectLast table.", len(last_dia_object_ids))
 
         # Get diaObjectIds and their validityStart.
-        validity_start_map = _get_validity_start(ctx, tables, last_dia_object_ids)
+        validity_start_map = _get_validity_start(ctx, tables, last_dia_object_ids, since)
         _LOG.info("Found %d DiaObjects in DiaObject table.", len(validity_start_map))
 
-        # Add the new column.
-        _LOG.info("Adding new column")
-        query = f'ALTER TABLE "{ctx.keyspace}"."DiaObjectLast" ADD "validityStartMjdTai" DOUBLE'
-        ctx.update(query)
+        if since is None:
+            _add_column(ctx)
 
         # Fill coplumn with the data we collected.
         _populate(ctx, last_dia_object_ids, validity_start_map)
@@ -65,26 +87,126 @@ def downgrade() -> None:
         _LOG.info("Dropping  column")
         query = f'ALTER TABLE "{ctx.keyspace}"."DiaObjectLast" DROP "validityStartMjdTai"'
         ctx.update(query)
+        # Remove pending backfill job, if any.
+        ctx.metadata.delete(f"backfill:{revision}")
+
+
+def backfill(ctx: BackfillContext, unit: str) -> None:
+    """Fill validityStart column in DiaObjectLast from one unit of DiaObject
+    data.
+
+    Parameters
+    ----------
+    ctx : `BackfillContext`
+        Backfill context.
+    unit : `str`
+        Unit of work, either a name of per-partition table, or table name and
+        time partition separated by colon.
+    """
+    last_dia_objects = ctx.cache.get("DiaObjectLast")
+    if last_dia_objects is None:
+        # Read current contents of DiaObjectLast once per run. Updates are
+        # written with the timestamp of this read, so that anything written
+        # by APDB after this point is never overwritten.
+        ctx.cache["timestamp"] = int(time.time() * 1_000_000)
+        select_list = '"diaObjectId", apdb_part, "validityStartMjdTai"'
+        last_dia_objects = {
+            diaObjectId: (apdb_part, validity)
+            for diaObjectId, apdb_part, validity in ctx.schema.scan("DiaObjectLast", select_list)
+        }
+        ctx.cache["DiaObjectLast"] = last_dia_objects
+        _LOG.info("Found %d unique DiaObjects in DiaObjectLast table.", len(last_dia_objects))
+
+    table, _, time_part = unit.partition(":")
+    partitions = None
+    if time_part:
+        # Spatial partitions of DiaObject table usually cannot be enumerated,
+        # and scanning the whole table for each time partition is too slow.
+        # Only spatial partitions that have records in DiaObjectLast are
+        # relevant, and their number is reasonable.
+        spatial_partitions = sorted({apdb_part for apdb_part, _ in last_dia_objects.values()})
+        partition_key = ctx.schema.partition_key(table)
+        partitions = [
+            tuple(
+                dict(apdb_part=apdb_part, apdb_time_part=int(time_part))[column] for column in partition_key
+            )
+            for apdb_part in spatial_partitions
+        ]
+    rows = ctx.schema.scan(table, '"diaObjectId", "validityStartMjdTai"', partitions=partitions)
+    validity_map: dict[int, float] = {}
+    for diaObjectId, validityStartMjdTai in rows:
+        if (
+            existing_validity := validity_map.get(diaObjectId)
+        ) is None or existing_validity < validityStartMjdTai:
+            validity_map[diaObjectId] = validityStartMjdTai
+
+    # Only update records which do not have newer validity already.
+    updates = []
+    for diaObjectId, validity in validity_map.items():
+        if (last := last_dia_objects.get(diaObjectId)) is not None:
+            apdb_part, last_validity = last
+            if last_validity is None or last_validity < validity:
+                updates.append((validity, apdb_part, diaObjectId))
+                last_dia_objects[diaObjectId] = (apdb_part, validity)
+    _LOG.info("Will update %d records from %s.", len(updates), unit)
+
+    update = (
+        f'UPDATE "{ctx.keyspace}"."DiaObjectLast" USING TIMESTAMP {ctx.cache["timestamp"]} '
+        'SET "validityStartMjdTai" = ? '
+        'WHERE apdb_part = ? AND "diaObjectId" = ?'
+    )
+    update_stmt = ctx.prepare(update)
+    for chunk in chunk_iterable(updates, 10_000):
+        batch = cassandra.query.BatchStatement()
+        for values in chunk:
+            batch.add(update_stmt, values)
+        ctx.update(batch)
+        ctx.throttle(len(batch))
+
+
+def _add_column(ctx: Context) -> None:
+    """Add validityStart column to DiaObjectLast."""
+    _LOG.info("Adding new column")
+    query = f'ALTER TABLE "{ctx.keyspace}"."DiaObjectLast" ADD "validityStartMjdTai" DOUBLE'
+    ctx.update(query)
+
+
+def _backfill_units(ctx: Context, tables: list[str]) -> list[str]:
+    """Return units of work for deferred backfill, most recent first."""
+    if tables == ["DiaObject"]:
+        # Single table, units are time partitions, their range is known from
+        # metadata, some of them may be empty.
+        time_partitions = ctx.schema.time_partition_range()
+        if time_partitions is None:
+            _LOG.warning("Range of time partitions is unknown, backfill will scan whole DiaObject table.")
+            return ["DiaObject"]
+        return [f"DiaObject:{time_part}" for time_part in reversed(time_partitions)]
+    else:
+        # Per-partition tables, units are tables.
+        partitions = []
+        for table in tables:
+            if match := re.fullmatch(r"DiaObject_(\d+)", table):
+                partitions.append(int(match.group(1)))
+        return [f"DiaObject_{partition}" for partition in sorted(partitions, reverse=True)]
 
 
 def _get_validity_start(
-    ctx: Context, tables: list[str], last_dia_object_ids: dict[int, int]
+    ctx: Context, tables: list[str], last_dia_object_ids: dict[int, int], since: float | None
 ) -> dict[int, float]:
     """Scan DiaObject table(s) and return max. validityStart values for each
     diaObjectId.
     """
     validity_map: dict[int, float] = {}
     for table in sorted(tables):
-        _LOG.info("Scanning %s table", table)
-
-        query = f'SELECT "diaObjectId", "validityStartMjdTai" FROM "{ctx.keyspace}"."{table}" ALLOW FILTERING'
-        # This can take some time, make sure we do not timeout.
-        result = ctx.query(query, timeout=3600)
-
-        for row in result:
-            diaObjectId: int = row.diaObjectId
+        columns = ("diaObjectId", "validityStartMjdTai")
+        if since is None:
+            snapshot = ctx.scan_table(table, columns)
+        else:
+            # Primary key columns have no write time, use one of the regular
+            # columns.
+            snapshot = ctx.scan_table_since(table, columns, since, writetime_column="ra")
+        for diaObjectId, validityStartMjdTai in snapshot.rows(("diaObjectId", "validityStartMjdTai")):
             if diaObjectId in last_dia_object_ids:
-                validityStartMjdTai: float = row.validityStartMjdTai
                 if (existing_validity := validity_map.get(diaObjectId)) is not None:
                     validity_map[diaObjectId] = max(existing_validity, validityStartMjdTai)
                 else:
@@ -93,13 +215,15 @@ def _get_validity_start(
     return validity_map
 
 
-def _get_last_dia_object_ids(ctx: Context) -> dict[int, int]:
+def _get_last_dia_object_ids(ctx: Context, since: float | None) -> dict[int, int]:
     """Return all existing diaObjectIds in DiaObjectLast table.
 
     Parameters
     ----------
     ctx
         Migration context.
+    since : `float` or `None`
+        If not `None` then only return records written after this time.
 
     Returns
     -------
@@ -107,12 +231,12 @@ def _get_last_dia_object_ids(ctx: Context) -> dict[int, int]:
         Mapping of diaObjectId to its corresponding partition in DiaObjectLast
         table.
     """
-    _LOG.info("Scanning DiaObjectLast table")
-
-    query = f'SELECT "diaObjectId", apdb_part FROM "{ctx.keyspace}"."DiaObjectLast" ALLOW FILTERING'
-    # This can take some time, make sure we do not timeout.
-    result = ctx.query(query, timeout=3600)
-    return {row[0]: row[1] for row in result}
+    columns = ("diaObjectId", "apdb_part")
+    if since is None:
+        snapshot = ctx.scan_table("DiaObjectLast", columns)
+    else:
+        snapshot = ctx.scan_table_since("DiaObjectLast", columns, since, writetime_column="ra")
+    return dict(snapshot.rows(("diaObjectId", "apdb_part")))
 
 
 def _populate(
@@ -124,15 +248,8 @@ def _populate(
         'SET "validityStartMjdTai" = ? '
         'WHERE apdb_part = ? AND "diaObjectId" = ?'
     )
-    # This code cannot be executed in dry-run mode because of prepare(),
-    # so just print something and return.
-    if ctx.dry_run:
-        count = len(set(last_dia_object_ids) & set(validity_start_map))
-        _LOG.info("Dry-run mode - will update %d records, query: %s", count, update)
-        return
-
     # Prepare UPDATE query.
-    update_stmt = ctx.session.prepare(update)
+    update_stmt = ctx.prepare(update)
 
     # Make batches of 10k updates, it may be worth group by partitions, but
     # it's not clear if it's going to accelerate anything.
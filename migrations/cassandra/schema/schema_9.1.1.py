@@ -106,8 +106,7 @@ def _upgrade_table(
     _LOG.debug("Scanning table %s", table_name)
     select_columns = ctx.qoute_ids(primary_key + columns)
     select_columns_str = ", ".join(select_columns)
-    select = f'SELECT {select_columns_str} FROM "{ctx.keyspace}"."{table_name}" ALLOW FILTERING'
-    result = ctx.query(select, timeout=None)
+    result = ctx.schema.scan(table_name, select_columns_str)
 
     # Collect all PKs by column name for which column value is NULL.
     null_pk_by_column: dict[str, set[tuple]] = defaultdict(set)
@@ -150,7 +149,7 @@ def _upgrade_table(
             insert_columns = ctx.qoute_ids(primary_key) + ctx.qoute_ids(null_pk_by_column)
             insert_columns_str = ", ".join(insert_columns)
             placeholders = ", ".join(["?"] * len(insert_columns))
-            stmt = ctx.session.prepare(
+            stmt = ctx.prepare(
                 f'INSERT INTO "{ctx.keyspace}"."{table_name}" ({insert_columns_str}) VALUES ({placeholders})'
             )
 
@@ -183,7 +182,7 @@ def _upgrade_table(
             insert_columns = ctx.qoute_ids(primary_key) + ctx.qoute_ids([column])
             insert_columns_str = ", ".join(insert_columns)
             placeholders = ", ".join(["?"] * len(insert_columns))
-            stmt = ctx.session.prepare(
+            stmt = ctx.prepare(
                 f'INSERT INTO "{ctx.keyspace}"."{table_name}" ({insert_columns_str}) VALUES ({placeholders})'
             )
 
@@ -97,7 +97,9 @@ def _migrate(do_upgrade: bool, to_revision: str) -> None:
     for table_name, columns in table_columns.items():
         _LOG.info("Updating %d columns in table %s", len(columns), table_name)
         _LOG.debug("Columns: %s", columns)
-        with ctx.batch_alter_table(table_name) as batch_op:
+        # With table-rebuild option table is copied into a new one instead of
+        # rewriting it for each column.
+        with ctx.rebuild_table(table_name) as batch_op:
             for column in columns:
                 batch_op.alter_column(column, type_=column_type)
 
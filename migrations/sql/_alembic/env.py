@@ -1,6 +1,8 @@
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
+from lsst.dax.apdb_migrate.sql.pragmas import pragmas_enabled, sqlite_pragmas
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -55,7 +57,8 @@ def run_migrations_online() -> None:
     connectable = engine_from_config(config_dict, prefix="sqlalchemy.", poolclass=pool.NullPool)
 
     schema = config.get_section_option("dax_apdb_migrate", "schema")
-    with connectable.connect() as connection:
+    enable_pragmas = pragmas_enabled(config.get_section_option("dax_apdb_migrate_options", "sqlite-pragmas"))
+    with connectable.connect() as connection, sqlite_pragmas(connection, enable_pragmas):
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
@@ -44,22 +44,24 @@ def upgrade() -> None:
         has_dia_object_last = inspect.has_table("DiaObjectLast", schema=ctx.schema)
         _LOG.info("has_dia_object_last = %s", has_dia_object_last)
 
-        _rename_decl_columns(ctx, has_dia_object_last)
-        _rename_psf_columns(ctx)
-        _rename_band_underscore(ctx)
-        _rename_dipole(ctx)
-        _rename_band_underscore2(ctx)
-        _rename_filter(ctx)
-        _rename_band_underscore_ssobject(ctx)
-        _add_time_processed(ctx)
-        _rename_radectai(ctx, has_dia_object_last)
-        _rename_totflux(ctx)
-        _rename_diffflux(ctx)
-        _rename_midpointtai(ctx)
-        _drop_prv_procOrder(ctx)
-        _rename_mjdtai(ctx, has_dia_object_last)
-        _rename_spuriousness(ctx)
-        _make_nullable(ctx)
+        # Changes to each table are merged into a single batch.
+        with ctx.coalesce_batches():
+            _rename_decl_columns(ctx, has_dia_object_last)
+            _rename_psf_columns(ctx)
+            _rename_band_underscore(ctx)
+            _rename_dipole(ctx)
+            _rename_band_underscore2(ctx)
+            _rename_filter(ctx)
+            _rename_band_underscore_ssobject(ctx)
+            _add_time_processed(ctx)
+            _rename_radectai(ctx, has_dia_object_last)
+            _rename_totflux(ctx)
+            _rename_diffflux(ctx)
+            _rename_midpointtai(ctx)
+            _drop_prv_procOrder(ctx)
+            _rename_mjdtai(ctx, has_dia_object_last)
+            _rename_spuriousness(ctx)
+            _make_nullable(ctx)
 
         # Last step is to create metadata table.
         _create_metadata_table(ctx)
@@ -101,8 +103,7 @@ def _rename_columns(ctx: Context, table_name: str, column_renames: dict[str, str
 
 def _rename_decl_columns(ctx: Context, has_dia_object_last: bool) -> None:
     """Rename 'decl' columns to 'dec'."""
-    table = ctx.get_table("DiaObject", reload=True)
-    if "decl" not in table.columns:
+    if "decl" not in ctx.get_column_names("DiaObject"):
         _LOG.info("decl columns renaming is not needed")
         return
 
@@ -157,8 +158,7 @@ def _rename_decl_columns(ctx: Context, has_dia_object_last: bool) -> None:
 
 def _rename_psf_columns(ctx: Context) -> None:
     """Rename 'PS' columns to 'Psf'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "psNdata" not in table.columns:
+    if "psNdata" not in ctx.get_column_names("DiaSource"):
         _LOG.info("PSF columns renaming is not needed")
         return
 
@@ -305,8 +305,7 @@ def _rename_psf_columns(ctx: Context) -> None:
 
 def _rename_band_underscore(ctx: Context) -> None:
     """Separate band name with underscore."""
-    table = ctx.get_table("DiaObject", reload=True)
-    if "uPsfFluxMean" not in table.columns:
+    if "uPsfFluxMean" not in ctx.get_column_names("DiaObject"):
         _LOG.info("Band columns renaming is not needed")
         return
 
@@ -432,8 +431,7 @@ def _rename_band_underscore(ctx: Context) -> None:
 
 def _rename_dipole(ctx: Context) -> None:
     """Rename 'dip' columns to 'dipole'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "dipMeanFlux" not in table.columns:
+    if "dipMeanFlux" not in ctx.get_column_names("DiaSource"):
         _LOG.info("Dipole columns renaming is not needed")
         return
 
@@ -475,8 +473,7 @@ def _rename_dipole(ctx: Context) -> None:
 
 def _rename_band_underscore2(ctx: Context) -> None:
     """Separate band name with underscore."""
-    table = ctx.get_table("DiaObject", reload=True)
-    if "uFPFluxMean" not in table.columns:
+    if "uFPFluxMean" not in ctx.get_column_names("DiaObject"):
         _LOG.info("Band columns renaming is not needed")
         return
 
@@ -536,8 +533,7 @@ def _rename_band_underscore2(ctx: Context) -> None:
 
 def _rename_filter(ctx: Context) -> None:
     """Rename 'filterName' columns to 'band'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "filterName" not in table.columns:
+    if "filterName" not in ctx.get_column_names("DiaSource"):
         _LOG.info("filterName columns renaming is not needed")
         return
 
@@ -551,8 +547,7 @@ def _rename_filter(ctx: Context) -> None:
 
 def _rename_band_underscore_ssobject(ctx: Context) -> None:
     """Separate band name with underscore."""
-    table = ctx.get_table("SSObject", reload=True)
-    if "uH" not in table.columns:
+    if "uH" not in ctx.get_column_names("SSObject"):
         _LOG.info("Band columns renaming is not needed")
         return
 
@@ -606,8 +601,7 @@ def _rename_band_underscore_ssobject(ctx: Context) -> None:
 
 def _add_time_processed(ctx: Context) -> None:
     """Add time_processed/time_withdrawn columns."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "time_processed" in table.columns:
+    if "time_processed" in ctx.get_column_names("DiaSource"):
         _LOG.info("Adding time_processed columns is not needed")
         return
 
@@ -623,8 +617,7 @@ def _add_time_processed(ctx: Context) -> None:
 
 def _rename_radectai(ctx: Context, has_dia_object_last: bool) -> None:
     """Rename 'radecTai' columns to 'radecEpoch'."""
-    table = ctx.get_table("DiaObject", reload=True)
-    if "radecTai" not in table.columns:
+    if "radecTai" not in ctx.get_column_names("DiaObject"):
         _LOG.info("radecTai columns renaming is not needed")
         return
 
@@ -639,8 +632,7 @@ def _rename_radectai(ctx: Context, has_dia_object_last: bool) -> None:
 
 def _rename_totflux(ctx: Context) -> None:
     """Rename 'totFlux' columns to 'scienceFlux'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "totFlux" not in table.columns:
+    if "totFlux" not in ctx.get_column_names("DiaSource"):
         _LOG.info("totFlux columns renaming is not needed")
         return
 
@@ -681,8 +673,7 @@ def _rename_totflux(ctx: Context) -> None:
 
 def _rename_diffflux(ctx: Context) -> None:
     """Rename 'diffFlux' columns to 'snapDiffFlux'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "diffFlux" not in table.columns:
+    if "diffFlux" not in ctx.get_column_names("DiaSource"):
         _LOG.info("diffFlux columns renaming is not needed")
         return
 
@@ -696,8 +687,7 @@ def _rename_diffflux(ctx: Context) -> None:
 
 def _rename_midpointtai(ctx: Context) -> None:
     """Rename 'midPointTai' columns to 'midPointMjd'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "midPointTai" not in table.columns:
+    if "midPointTai" not in ctx.get_column_names("DiaSource"):
         _LOG.info("midPointTai columns renaming is not needed")
         return
 
@@ -711,8 +701,7 @@ def _rename_midpointtai(ctx: Context) -> None:
 
 def _drop_prv_procOrder(ctx: Context) -> None:
     """Drop DiaSource.prv_procOrder column."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "prv_procOrder" not in table.columns:
+    if "prv_procOrder" not in ctx.get_column_names("DiaSource"):
         _LOG.info("prv_procOrder column dropping is not needed")
         return
 
@@ -723,8 +712,7 @@ def _drop_prv_procOrder(ctx: Context) -> None:
 
 def _rename_mjdtai(ctx: Context, has_dia_object_last: bool) -> None:
     """Rename MJD columns to have 'MjdTai' suffix."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "midPointMjd" not in table.columns:
+    if "midPointMjd" not in ctx.get_column_names("DiaSource"):
         _LOG.info("totFlux columns renaming is not needed")
         return
 
@@ -751,8 +739,7 @@ def _rename_mjdtai(ctx: Context, has_dia_object_last: bool) -> None:
 
 def _rename_spuriousness(ctx: Context) -> None:
     """Rename 'spuriousness' column to 'reliability'."""
-    table = ctx.get_table("DiaSource", reload=True)
-    if "spuriousness" not in table.columns:
+    if "spuriousness" not in ctx.get_column_names("DiaSource"):
         _LOG.info("spuriousness columns renaming is not needed")
         return
 
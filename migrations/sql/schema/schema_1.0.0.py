@@ -6,6 +6,7 @@ Create Date: 2024-05-06 14:42:13.640471
 """
 
 import logging
+from collections.abc import Iterator
 from typing import Any
 
 import sqlalchemy
@@ -148,21 +149,23 @@ def upgrade() -> None:
     # Make and fill a table mapping ccdVisit to visit+detector
     _make_map_table(ctx, cdVisitIds, packer)
 
-    # Add and fill visit + detector columns
-    _add_visit_detector_columns(ctx)
+    # Schema changes to each table are merged into as few batches as possible.
+    with ctx.coalesce_batches():
+        # Add and fill visit + detector columns
+        _add_visit_detector_columns(ctx)
 
-    # Drop old column and update indices.
-    _drop_ccd_visit(ctx)
+        # Drop old column and update indices.
+        _drop_ccd_visit(ctx)
 
-    # Drop mapping table.
-    _LOG.info("Dropping %s table", ID_MAP_TABLE_NAME)
-    op.drop_table(ID_MAP_TABLE_NAME, schema=ctx.schema)
+        # Drop mapping table.
+        _LOG.info("Dropping %s table", ID_MAP_TABLE_NAME)
+        op.drop_table(ID_MAP_TABLE_NAME, schema=ctx.schema)
 
-    # Add all new flag columns to DiaSource and fill them.
-    _add_flag_columns(ctx)
+        # Add all new flag columns to DiaSource and fill them.
+        _add_flag_columns(ctx)
 
-    # Drop old flags columns from all tables.
-    _drop_flag_columns(ctx)
+        # Drop old flags columns from all tables.
+        _drop_flag_columns(ctx)
 
     # Update metadata version.
     version = revision.split("_")[-1]
@@ -236,36 +239,22 @@ def _make_packer(repo: str, instrument: str) -> Any:
 def _make_map_table(ctx: Context, cdVisitIds: set[int], packer: Any) -> None:
     """Create and fill ccdVisit -> (visit, detector) mapping table."""
     _LOG.info("creating %s table", ID_MAP_TABLE_NAME)
-    op.create_table(
+    # Mapping table can be re-created from scratch, it does not need to be
+    # crash-safe.
+    table = ctx.create_staging_table(
         ID_MAP_TABLE_NAME,
         sqlalchemy.schema.Column("ccdVisitId", sqlalchemy.BigInteger, primary_key=True, autoincrement=False),
         sqlalchemy.schema.Column("visit", sqlalchemy.BigInteger, nullable=False),
         sqlalchemy.schema.Column("detector", sqlalchemy.SmallInteger, nullable=False),
-        schema=ctx.schema,
+        temporary=False,
     )
 
-    table = ctx.get_table(ID_MAP_TABLE_NAME)
-
-    count = 0
-    batch: list[dict[str, Any]] = []
-    for ccdVisitId in cdVisitIds:
-        data_id = packer.unpack(ccdVisitId)
-        visit = data_id["visit"]
-        detector = data_id["detector"]
-        batch.append({"ccdVisitId": ccdVisitId, "visit": visit, "detector": detector})
-
-        if len(batch) >= 10000:
-            op.bulk_insert(table, batch, multiinsert=True)
-            _LOG.debug("inserted %s rows", len(batch))
-            count += len(batch)
-            batch = []
-
-    if batch:
-        op.bulk_insert(table, batch, multiinsert=True)
-        _LOG.debug("inserted %s rows", len(batch))
-        count += len(batch)
-        batch = []
+    def _rows() -> Iterator[tuple[int, int, int]]:
+        for ccdVisitId in cdVisitIds:
+            data_id = packer.unpack(ccdVisitId)
+            yield ccdVisitId, data_id["visit"], data_id["detector"]
 
+    count = ctx.bulk_insert(table, _rows())
     _LOG.info("inserted total %s rows into %s", count, ID_MAP_TABLE_NAME)
 
 
@@ -283,25 +272,14 @@ def _add_visit_detector_columns(ctx: Context) -> None:
             batch_op.add_column(sqlalchemy.Column("visit", sqlalchemy.types.BigInteger, nullable=True))
             batch_op.add_column(sqlalchemy.Column("detector", sqlalchemy.types.SmallInteger, nullable=True))
 
-        # Fill new columns. I could not make SQLAlchemy to generate a
-        # correlated query updating two columns at the same time, so I have to
-        # do it in two scalar queries.
+        # Fill both new columns from mapping table.
         table = ctx.get_table(table_name)
-        subq = sqlalchemy.select(map_table.columns["visit"]).where(
-            map_table.columns["ccdVisitId"] == table.columns["ccdVisitId"]
+        ctx.update_from(
+            table, map_table, on=["ccdVisitId"], values={"visit": "visit", "detector": "detector"}
         )
-        sql = table.update().values(visit=subq.scalar_subquery())
-        ctx.bind.execute(sql)
-        subq = sqlalchemy.select(map_table.columns["detector"]).where(
-            map_table.columns["ccdVisitId"] == table.columns["ccdVisitId"]
-        )
-        sql = table.update().values(detector=subq.scalar_subquery())
-        ctx.bind.execute(sql)
 
         # Change both columns to be NOT NULL
-        with ctx.batch_alter_table(table_name) as batch_op:
-            batch_op.alter_column("visit", nullable=False)
-            batch_op.alter_column("detector", nullable=False)
+        ctx.set_not_null(table_name, ["visit", "detector"])
 
 
 def _drop_ccd_visit(ctx: Context) -> None:
@@ -372,7 +350,9 @@ def _add_flag_columns(ctx: Context) -> None:
         values[column] = (table.columns["flags"].bitwise_and(mask)) != 0
     query = table.update().values(**values)
     _LOG.debug("update query: %s", query)
-    ctx.bind.execute(query)
+    # Every row is updated, indices are re-built after update.
+    with ctx.suspended_indexes("DiaSource"):
+        ctx.bind.execute(query)
 
 
 def _drop_flag_columns(ctx: Context) -> None:
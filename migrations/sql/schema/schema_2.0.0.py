@@ -124,9 +124,7 @@ def upgrade() -> None:
 
     # Make ra/dec columns not null.
     _LOG.info("Making ra/dec columns non-nullable.")
-    with ctx.batch_alter_table("DiaForcedSource", copy_from=fsources) as batch_op:
-        batch_op.alter_column("ra", nullable=False)
-        batch_op.alter_column("dec", nullable=False)
+    ctx.set_not_null("DiaForcedSource", ["ra", "dec"], copy_from=fsources)
 
     # Update metadata version.
     tree, _, version = revision.partition("_")
@@ -44,24 +44,22 @@ def upgrade() -> None:
         _LOG.info("Filling nDiaSources column from DiaSource counts.")
         objects_last = ctx.get_table("DiaObjectLast", reload=True)
         sources = ctx.get_table("DiaSource")
-        subq = (
-            sqlalchemy.select(sqlalchemy.func.count())
-            .select_from(sources)
-            .where(sources.columns["diaObjectId"] == objects_last.columns["diaObjectId"])
+        counts = (
+            sqlalchemy.select(sources.columns["diaObjectId"], sqlalchemy.func.count().label("count"))
+            .group_by(sources.columns["diaObjectId"])
+            .subquery()
         )
-        sql = objects_last.update().values(nDiaSources=subq.scalar_subquery())
-        ctx.bind.execute(sql)
+        ctx.update_from(objects_last, counts, on=["diaObjectId"], values={"nDiaSources": "count"})
         # There may be some objects without sources, set nDiaSources to 0.
         sql = (
             objects_last.update()
             .values(nDiaSources=sqlalchemy.literal(0))
             .where(objects_last.columns["nDiaSources"].is_(None))
         )
-        ctx.bind.execute(sql)
+        ctx.chunked_update(sql)
 
         _LOG.info("Making nDiaSources column non-nullable.")
-        with ctx.batch_alter_table("DiaObjectLast", copy_from=objects_last) as batch_op:
-            batch_op.alter_column("nDiaSources", nullable=False)
+        ctx.set_not_null("DiaObjectLast", ["nDiaSources"], copy_from=objects_last)
 
     # Update metadata version.
     tree, _, version = revision.partition("_")
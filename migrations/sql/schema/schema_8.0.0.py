@@ -261,6 +261,9 @@ def upgrade() -> None:
     Summary of changes:
       - Many columns dropped from DiaObject, DiaSource, and SSSource tables.
       - Few columns added to DiaObject and DiaSource tables.
+
+    On PostgreSQL ``--options table-rebuild=1`` re-creates tables with new
+    columns and copies their data instead of altering them in place.
     """
     with Context(revision) as ctx:
         for table_name in _tables_to_migrate:
@@ -272,7 +275,7 @@ def upgrade() -> None:
                     continue
                 raise
 
-            with ctx.batch_alter_table(table_name, copy_from=table) as batch_op:
+            with ctx.rebuild_table(table_name, copy_from=table) as batch_op:
                 if columns_to_add := _added_columns.get(table_name):
                     _LOG.info("Adding %d columns to table %s", len(columns_to_add), table_name)
                     for column_name, column_type in columns_to_add.items():
@@ -306,7 +309,7 @@ def downgrade() -> None:
                     continue
                 raise
 
-            with ctx.batch_alter_table(table_name, copy_from=table) as batch_op:
+            with ctx.rebuild_table(table_name, copy_from=table) as batch_op:
                 if columns_to_add := _dropped_columns.get(table_name):
                     _LOG.info("Adding %d columns to table %s", len(columns_to_add), table_name)
                     for column_name, column_type in columns_to_add.items():
@@ -8,14 +8,16 @@ Create Date: 2025-08-25 11:38:59.590064
 from __future__ import annotations
 
 import logging
-from collections.abc import Callable
+from collections.abc import Sequence
 from datetime import datetime
-from typing import Any, NamedTuple, overload
+from typing import NamedTuple
 
+import numpy as np
 import sqlalchemy
+from alembic.operations import BatchOperations
 from astropy.time import Time
 from lsst.dax.apdb_migrate.sql.context import Context
-from lsst.utils.iteration import chunk_iterable
+from lsst.dax.apdb_migrate.sql.time_functions import mjd_to_timestamp, timestamp_to_mjd
 
 # revision identifiers, used by Alembic.
 revision = "schema_9.0.0"
@@ -25,6 +27,16 @@ depends_on = None
 
 _LOG = logging.getLogger(__name__)
 
+# Number of rows fetched, converted, and inserted at once.
+_BATCH_SIZE = 10_000
+
+# Number of rows compared with astropy after conversion in SQL.
+_VALIDATION_ROWS = 1000
+
+# Maximum difference between SQL and astropy conversions.
+_MAX_MJD_DIFF = 1e-6 / 86400
+_MAX_TIMESTAMP_DIFF = 1e-6
+
 
 class _Column(NamedTuple):
     """Column name before/after migration and mullable flag."""
@@ -42,25 +54,24 @@ class _Column(NamedTuple):
             # Just in case someone applies downgrade() more than once.
             return self
 
-    @overload
-    def convert_value(self, value: None) -> None: ...
-
-    @overload
-    def convert_value(self, value: datetime) -> float: ...
-
-    @overload
-    def convert_value(self, value: float) -> datetime: ...
-
-    def convert_value(self, value: datetime | float | None) -> datetime | float | None:
-        if value is None:
-            return None
+    def convert_values(self, values: Sequence[datetime | float | None]) -> list[datetime | float | None]:
+        """Convert a batch of values with a single astropy call, `None`
+        values are preserved.
+        """
+        valid = [index for index, value in enumerate(values) if value is not None]
+        if not valid:
+            return list(values)
         if self.new_type is sqlalchemy.types.Double:
-            time = Time(value, format="datetime", scale="tai")
-            return float(time.mjd)
+            timestamps = np.array([values[index] for index in valid], dtype="datetime64[us]")
+            converted = Time(timestamps, format="datetime64", scale="tai").mjd.tolist()
         else:
-            time = Time(value, format="mjd", scale="tai")
-            # This returns naive datetiem, this is how it was done in ApdbSql.
-            return time.datetime
+            mjds = np.array([values[index] for index in valid], dtype=np.float64)
+            # This returns naive datetime, this is how it was done in ApdbSql.
+            converted = Time(mjds, format="mjd", scale="tai").datetime.tolist()
+        result = list(values)
+        for index, value in zip(valid, converted, strict=True):
+            result[index] = value
+        return result
 
 
 class _Index(NamedTuple):
@@ -120,9 +131,12 @@ def upgrade() -> None:
       - Columns have been renamed to have 'MjdTai' suffix.
       - This also means that some indices and PKs need to be recreated.
 
-    The migration is quite slow as it updates big tables. There maybe more
-    optimal way by re-calculating timestamps using SQL functions, but it is
-    backend-specific and not implemented at this point.
+    The migration is quite slow as it updates big tables. With
+    ``--options conversion=sql`` timestamps are re-calculated by the database
+    using SQL functions (PostgreSQL and SQLite only), a sample of converted
+    rows is compared with astropy conversion. On PostgreSQL, with
+    ``--options table-rebuild=1`` each table is also copied into a new one
+    with converted columns instead of updating it.
     """
     with Context(revision) as ctx:
         _migrate_default(ctx, True)
@@ -151,51 +165,67 @@ def _migrate_default(ctx: Context, upgrade: bool) -> None:
         if not upgrade:
             columns = tuple(column.downgrade() for column in columns)
 
+        if ctx.get_mig_option("conversion") == "sql":
+            _rebuild_sql(ctx, table, columns, upgrade)
+            continue
+
         # Create new columns first as nullable.
         with ctx.batch_alter_table(table) as batch_op:
             _LOG.info("Adding new columns: %s", [column.new_name for column in columns])
             for column in columns:
                 batch_op.add_column(sqlalchemy.Column(column.new_name, column.new_type, nullable=True))
 
-        # Populate new columns with data from old ones.
-        if upgrade:
-            pk_columns = OLD_PK_COLUMNS[table]
-        else:
-            pk_columns = NEW_PK_COLUMNS[table]
-        _LOG.info("Populating new columns with data")
-        _populate(ctx, table, columns, column_type, pk_columns, upgrade)
+        # Indices are dropped while data is updated and re-created at the
+        # end, old indices are replaced by new ones.
+        with ctx.suspended_indexes(table) as indices:
+            # Populate new columns with data from old ones.
+            if upgrade:
+                pk_columns = OLD_PK_COLUMNS[table]
+            else:
+                pk_columns = NEW_PK_COLUMNS[table]
+            _LOG.info("Populating new columns with data")
+            _populate(ctx, table, columns, column_type, pk_columns, upgrade)
 
-        # Drop existing indices and columns
-        with ctx.batch_alter_table(table) as batch_op:
-            # May need to drop PK as well.
-            if not set(pk_columns).isdisjoint(column.old_name for column in columns):
-                # Postgres drops PK when the column is dropped, but sqlite
-                # complains that column cannot be dropped if it's in PK. The
-                # workaround is to create PK with new columns, but Postgres
-                # also requires existing PK to be dropped first, and in sqlite
-                # we do not even have name for PK constraint, so it cannot be
-                # dropped explicitly.
-                pk_name = f"{table}_pkey"
-                if ctx.is_postgres:
-                    _LOG.info("Dropping %s constraint", pk_name)
-                    batch_op.drop_constraint(pk_name)
-                _LOG.info("Add %s constraint", pk_name)
-                new_pk_columns = NEW_PK_COLUMNS[table] if upgrade else OLD_PK_COLUMNS[table]
-                batch_op.create_primary_key(pk_name, list(new_pk_columns))
-
-            # Drop indices.
             for old_index, new_index in INDICES.get(table, {}).items():
                 if not upgrade:
                     old_index, new_index = new_index, old_index
-                _LOG.info("Dropping index %s", old_index.name)
-                batch_op.drop_index(old_index.name)
-                _LOG.info("Creating index %s", new_index.name)
-                batch_op.create_index(new_index.name, list(new_index.columns))
+                _LOG.info("Replacing index %s with %s", old_index.name, new_index.name)
+                del indices[old_index.name]
+                indices[new_index.name] = list(new_index.columns)
 
-            # Drop columns.
-            _LOG.info("Dropping columns %s", [column.old_name for column in columns])
-            for column in columns:
-                batch_op.drop_column(column.old_name)
+            # Drop existing columns.
+            with ctx.batch_alter_table(table) as batch_op:
+                _replace_pk(ctx, batch_op, table, columns, upgrade)
+
+                # Drop columns.
+                _LOG.info("Dropping columns %s", [column.old_name for column in columns])
+                for column in columns:
+                    batch_op.drop_column(column.old_name)
+
+
+def _replace_pk(
+    ctx: Context,
+    batch_op: BatchOperations,
+    table_name: str,
+    columns: tuple[_Column, ...],
+    upgrade: bool,
+) -> None:
+    """Replace PK if it includes columns that are dropped."""
+    pk_columns = OLD_PK_COLUMNS[table_name] if upgrade else NEW_PK_COLUMNS[table_name]
+    if set(pk_columns).isdisjoint(column.old_name for column in columns):
+        return
+    # Postgres drops PK when the column is dropped, but sqlite complains that
+    # column cannot be dropped if it's in PK. The workaround is to create PK
+    # with new columns, but Postgres also requires existing PK to be dropped
+    # first, and in sqlite we do not even have name for PK constraint, so it
+    # cannot be dropped explicitly.
+    pk_name = f"{table_name}_pkey"
+    if ctx.is_postgres:
+        _LOG.info("Dropping %s constraint", pk_name)
+        batch_op.drop_constraint(pk_name)
+    _LOG.info("Add %s constraint", pk_name)
+    new_pk_columns = NEW_PK_COLUMNS[table_name] if upgrade else OLD_PK_COLUMNS[table_name]
+    batch_op.create_primary_key(pk_name, list(new_pk_columns))
 
 
 def _populate(
@@ -216,47 +246,80 @@ def _populate(
     tmp_columns = pk_column_defs + [
         sqlalchemy.schema.Column(column.new_name, column_type) for column in columns
     ]
-    tmp_table = sqlalchemy.schema.Table(
-        f"_{table_name}_migration_tmp",
-        ctx.metadata,
-        *tmp_columns,
-        prefixes=["TEMPORARY"],
-        schema=sqlalchemy.schema.BLANK_SCHEMA,
-    )
-    tmp_table.create(ctx.bind)
-
-    # Select all records where timestamp is not None. Hopefully SQL database
-    # does not have too many records and we can fit everything into memory.
+    tmp_table = ctx.create_staging_table(f"_{table_name}_migration_tmp", *tmp_columns)
+
+    # Stream all records in batches, each batch is converted and inserted
+    # into temporary table before fetching the next one.
     select_columns = [table.columns[name] for name in pk_columns]
     select_columns += [table.columns[column.old_name] for column in columns]
     query = sqlalchemy.select(*select_columns).select_from(table)
 
-    column_converters: list[Callable] = [lambda x: x] * len(pk_columns)
-    column_converters += [column.convert_value for column in columns]
-
-    def _convert_row(row: Any) -> tuple:
-        return tuple(converter(value) for converter, value in zip(column_converters, row, strict=True))
-
-    with ctx.reflection_bind() as bind:
-        result = bind.execute(query)
-        rows = [_convert_row(row) for row in result]
-
     count = 0
-    for chunk in chunk_iterable(rows, 10_000):
-        insert = tmp_table.insert().values(chunk)
-        result = ctx.bind.execute(insert)
-        count += result.rowcount
+    with ctx.reflection_bind() as bind:
+        result = bind.execute(query, execution_options={"yield_per": _BATCH_SIZE})
+        for batch in result.partitions():
+            values = [list(row) for row in zip(*batch, strict=True)]
+            for index, column in enumerate(columns, start=len(pk_columns)):
+                values[index] = column.convert_values(values[index])
+            count += ctx.bulk_insert(tmp_table, zip(*values, strict=True))
     _LOG.info("Inserted %s rows into a temporary table for %s", count, table_name)
 
-    pk_where = sqlalchemy.and_(*(tmp_table.columns[name] == table.columns[name] for name in pk_columns))
     if count > 0:
+        _LOG.info("Populating columns %s", [column.new_name for column in columns])
+        ctx.update_from(
+            table, tmp_table, on=pk_columns, values={column.new_name: column.new_name for column in columns}
+        )
+
+
+def _rebuild_sql(ctx: Context, table_name: str, columns: tuple[_Column, ...], upgrade: bool) -> None:
+    """Replace columns with new ones computed using SQL functions for
+    conversion.
+
+    On PostgreSQL the table is copied into a new one with a single query,
+    other backends add new columns and update them with a single query.
+    """
+    table = ctx.get_table(table_name, reload=True)
+    convert = timestamp_to_mjd if upgrade else mjd_to_timestamp
+    values = {column.new_name: convert(table.columns[column.old_name], ctx.dialect) for column in columns}
+
+    # Compare a sample of rows with astropy conversion before old columns
+    # are dropped.
+    select_columns: list[sqlalchemy.sql.ColumnElement] = [
+        table.columns[column.old_name] for column in columns
+    ]
+    select_columns += [sqlalchemy.type_coerce(values[column.new_name], column.new_type) for column in columns]
+    query = sqlalchemy.select(*select_columns).limit(_VALIDATION_ROWS)
+    rows = ctx.bind.execute(query).all()
+    for index, column in enumerate(columns):
+        expected_values = column.convert_values([row[index] for row in rows])
+        for row, expected in zip(rows, expected_values, strict=True):
+            converted = row[len(columns) + index]
+            if expected is None or converted is None:
+                mismatch = expected is not converted
+            elif isinstance(expected, datetime):
+                mismatch = abs((converted - expected).total_seconds()) > _MAX_TIMESTAMP_DIFF
+            else:
+                mismatch = abs(converted - expected) > _MAX_MJD_DIFF
+            if mismatch:
+                raise RuntimeError(
+                    f"SQL conversion of {table_name}.{column.old_name} value {row[index]} "
+                    f"produced {converted}, expected {expected}"
+                )
+    _LOG.info("Validated conversion for %d rows", len(rows))
+
+    with ctx.rebuild_table(table_name, values=values) as batch_op:
+        _LOG.info("Replacing columns %s with %s", [column.old_name for column in columns], list(values))
+        for column in columns:
+            batch_op.add_column(sqlalchemy.Column(column.new_name, column.new_type, nullable=True))
+
+        for old_index, new_index in INDICES.get(table_name, {}).items():
+            if not upgrade:
+                old_index, new_index = new_index, old_index
+            _LOG.info("Replacing index %s with %s", old_index.name, new_index.name)
+            batch_op.drop_index(old_index.name)
+            batch_op.create_index(new_index.name, list(new_index.columns))
+
+        _replace_pk(ctx, batch_op, table_name, columns, upgrade)
+
         for column in columns:
-            _LOG.info("Populating column %s", column.new_name)
-            update = table.update().values(
-                {
-                    column.new_name: sqlalchemy.select(tmp_table.columns[column.new_name])
-                    .where(pk_where)
-                    .scalar_subquery()
-                }
-            )
-            result = bind.execute(update)
+            batch_op.drop_column(column.old_name)
@@ -47,10 +47,8 @@ def upgrade() -> None:
         _populate(ctx)
 
         table = ctx.get_table(table_name, reload=True)
-        with ctx.batch_alter_table(table_name, copy_from=table) as batch_op:
-            # Set it as NOT NULL.
-            _LOG.info("Set column %s NOT NULL", column_name)
-            batch_op.alter_column(column_name, nullable=False)
+        _LOG.info("Set column %s NOT NULL", column_name)
+        ctx.set_not_null(table_name, [column_name], copy_from=table)
 
 
 def downgrade() -> None:
@@ -96,5 +94,5 @@ def _populate(ctx: Context) -> None:
     )
     update = dia_object_last.update().values(validityStartMjdTai=subquery.scalar_subquery())
     _LOG.info("Populating new column with data from DiaObject table.")
-    result = ctx.bind.execute(update)
-    _LOG.info("Updated %d records in DiaObjectLast table.", result.rowcount)
+    count = ctx.chunked_update(update)
+    _LOG.info("Updated %d records in DiaObjectLast table.", count)
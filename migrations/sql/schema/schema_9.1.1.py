@@ -7,7 +7,6 @@ Create Date: 2025-12-04 16:35:32.207801
 
 import logging
 
-from alembic import op
 from lsst.dax.apdb_migrate.sql.context import Context
 
 # revision identifiers, used by Alembic.
@@ -51,14 +50,12 @@ def upgrade() -> None:
                 _LOG.info("Update NULL values in column %s.%s", table_name, column)
                 values = {column: 0}
                 update = table.update().values(**values).where(table.columns[column].is_(None))
-                op.execute(update)
+                ctx.chunked_update(update)
 
         # Change columns to NOT-NULL.
         for table_name, columns in _COLUMNS.items():
-            with ctx.batch_alter_table(table_name, copy_from=table) as batch_op:
-                for column in columns:
-                    _LOG.info("Make column %s.%s non-nullable", table_name, column)
-                    batch_op.alter_column(column, nullable=False)
+            _LOG.info("Make columns %s.%s non-nullable", table_name, columns)
+            ctx.set_not_null(table_name, columns)
 
 
 def downgrade() -> None:
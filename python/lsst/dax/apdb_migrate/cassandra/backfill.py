@@ -0,0 +1,93 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ["BackfillJob"]
+
+import dataclasses
+import json
+from typing import ClassVar
+
+
+@dataclasses.dataclass
+class BackfillJob:
+    """State of a deferred backfill job stored in metadata table.
+
+    Migration scripts that support deferred backfill apply their schema
+    changes, and record a job consisting of a list of work units. Units are
+    opaque strings interpreted by the ``backfill`` function of the migration
+    script, they are processed in the order in which they were recorded.
+    """
+
+    metadataPrefix: ClassVar[str] = "backfill:"
+    """Prefix for metadata keys that store backfill jobs."""
+
+    revision: str
+    """Revision that created this job (`str`)."""
+
+    units: list[str]
+    """All work units in processing order (`list` [`str`])."""
+
+    completed: list[str] = dataclasses.field(default_factory=list)
+    """Work units that were already processed (`list` [`str`])."""
+
+    @property
+    def metadata_key(self) -> str:
+        """Metadata key for this job (`str`)."""
+        return f"{self.metadataPrefix}{self.revision}"
+
+    @property
+    def remaining(self) -> list[str]:
+        """Work units that still need to be processed (`list` [`str`])."""
+        completed = set(self.completed)
+        return [unit for unit in self.units if unit not in completed]
+
+    def to_json(self) -> str:
+        """Return JSON representation of job state, revision is not included
+        as it is a part of metadata key.
+        """
+        return json.dumps({"units": self.units, "completed": self.completed})
+
+    @classmethod
+    def from_metadata(cls, key: str, value: str) -> BackfillJob | None:
+        """Make job instance from a metadata record.
+
+        Parameters
+        ----------
+        key : `str`
+            Metadata key.
+        value : `str`
+            Metadata value.
+
+        Returns
+        -------
+        job : `BackfillJob` or `None`
+            Job instance, or `None` if key is not a backfill job key.
+        """
+        if not key.startswith(cls.metadataPrefix):
+            return None
+        state = json.loads(value)
+        return cls(
+            revision=key[len(cls.metadataPrefix) :],
+            units=state["units"],
+            completed=state["completed"],
+        )
@@ -151,3 +151,129 @@ def downgrade(*args: Any, **kwargs: Any) -> None:
     kwargs["options"] = options
 
     script.migrate_downgrade(*args, **kwargs)
+
+
+@main.command(short_help="Execute deferred backfill jobs.")
+@options.mig_path_exist
+@options.port
+@common_options.dry_run
+@common_options.options
+@click.option(
+    "--max-rate",
+    type=float,
+    default=None,
+    metavar="NUMBER",
+    help="Maximum rate of updates in records per second, no limit by default.",
+)
+@click.option("--revision", default=None, help="Only execute backfill job for this revision.")
+@click.argument("host")
+@click.argument("keyspace")
+def backfill(*args: Any, **kwargs: Any) -> None:
+    """Execute deferred backfill jobs recorded by migration scripts.
+
+    HOST specifies Cassandra host name to connect to.
+    KEYSPACE specifies Cassandra keyspace name.
+
+    Progress is saved after each unit of work, the command can be interrupted
+    and executed again to continue from the last completed unit.
+    """
+    # Convert list of key=value to dict
+    options = {}
+    for option in kwargs["options"]:
+        key, _, value = option.partition("=")
+        options[key] = value
+    kwargs["options"] = options
+
+    script.migrate_backfill(*args, **kwargs)
+
+
+@main.command(short_help="Execute a plan saved by a dry-run upgrade.")
+@options.port
+@common_options.dry_run
+@click.option(
+    "--concurrency",
+    type=int,
+    default=64,
+    metavar="NUMBER",
+    help="Number of concurrent write statements, default is 64.",
+)
+@click.option("--force", is_flag=True, help="Execute the plan even if current versions do not match.")
+@click.argument("host")
+@click.argument("keyspace")
+@click.argument("plan")
+def apply_plan(*args: Any, **kwargs: Any) -> None:
+    """Execute queries from a plan saved by upgrade with --dry-run and
+    cql-plan option.
+
+    HOST specifies Cassandra host name to connect to.
+    KEYSPACE specifies Cassandra keyspace name.
+    PLAN is the name of the plan JSON file.
+    """
+    script.migrate_apply_plan(*args, **kwargs)
+
+
+@main.command(short_help="Measure latency of connection startup.")
+@options.port
+@click.option(
+    "--repeat", type=int, default=5, metavar="NUMBER", help="Number of connections per mode, default is 5."
+)
+@click.argument("host")
+@click.argument("keyspace")
+def benchmark_connect(*args: Any, **kwargs: Any) -> None:
+    """Measure time to connect to Cassandra and read metadata table, for
+    regular and lightweight sessions.
+
+    HOST specifies Cassandra host name to connect to.
+    KEYSPACE specifies Cassandra keyspace name.
+    """
+    script.migrate_benchmark_connect(*args, **kwargs)
+
+
+@main.command(short_help="Dump schema of a keyspace.")
+@options.port
+@click.option("--output", default=None, metavar="PATH", help="Output file name, default is to print JSON.")
+@click.argument("host")
+@click.argument("keyspace")
+def dump_schema(*args: Any, **kwargs: Any) -> None:
+    """Dump schema of all tables in a keyspace in JSON format.
+
+    HOST specifies Cassandra host name to connect to.
+    KEYSPACE specifies Cassandra keyspace name.
+    """
+    script.migrate_dump_schema(*args, **kwargs)
+
+
+@main.command(short_help="Compare schemas of two keyspaces or dumps.")
+@click.option("--host", default=None, help="Cassandra host name, needed if source is a keyspace.")
+@options.port
+@click.argument("source1")
+@click.argument("source2")
+def diff_schema(*args: Any, **kwargs: Any) -> None:
+    """Compare schemas and print differences.
+
+    SOURCE1 and SOURCE2 are either names of JSON files produced by
+    dump-schema command or keyspace names.
+    """
+    script.migrate_diff_schema(*args, **kwargs)
+
+
+@main.command(short_help="Plan upgrade using a saved keyspace snapshot.")
+@options.mig_path_exist
+@common_options.options
+@click.argument("snapshot")
+@click.argument("revision")
+def plan(*args: Any, **kwargs: Any) -> None:
+    """Run upgrade against a saved keyspace snapshot without connecting to
+    Cassandra and print DDL, scanned and written tables for each revision.
+
+    SNAPSHOT is a JSON file produced by dump-schema command.
+    REVISION is a target revision name.
+    """
+    # Convert list of key=value to dict
+    options = {}
+    for option in kwargs["options"]:
+        key, _, value = option.partition("=")
+        options[key] = value
+    kwargs["options"] = options
+
+    script.migrate_plan(*args, **kwargs)
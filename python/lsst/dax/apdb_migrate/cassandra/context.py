@@ -21,43 +21,197 @@
 
 from __future__ import annotations
 
-__all__ = ("Context",)
+__all__ = ("BackfillContext", "Context", "OnlineBackfillDone")
 
+import copy
+import dataclasses
+import hashlib
 import json
 import logging
-from collections.abc import Iterable, Mapping, Sequence
-from contextlib import ExitStack
+import re
+import time
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from contextlib import ExitStack, contextmanager
 from typing import TYPE_CHECKING, Any, Literal
 
 import alembic
+import cassandra.cqltypes
+import cassandra.query
+from cassandra import InvalidRequest
+from cassandra.protocol import ColumnMetadata
 
 from .. import revision
 from .apdb_metadata import ApdbMetadata
+from .backfill import BackfillJob
 from .config import ApdbMigConfigCassandra
+from .offline import OfflineSession
 from .schema import Schema
+from .schema_snapshot import SchemaSnapshot
+from .snapshot_cache import SnapshotCache, TableSnapshot
+from .table_schema import TableSchema
+from .target_schema import TargetSchema
 
 if TYPE_CHECKING:
-    import cassandra.query
     from cassandra.cluster import Session
 
+    from .cql_plan import CqlPlanWriter
+    from .ddl import DdlOperation
+    from .estimates import CostRecorder
+
 _NOT_SET = object()
 
+# Margin in seconds used when selecting time partitions, covers the difference
+# between time scales used for partitioning.
+_TIME_PARTITION_MARGIN = 3600.0
+
+# Default margin in seconds for the difference between clocks of migration
+# host and APDB clients which assign write time.
+_CLOCK_SKEW_MARGIN = 3600.0
+
 _LOG = logging.getLogger(__name__)
 
+# Matches DDL statements that create, modify, or drop tables.
+_TABLE_DDL_RE = re.compile(
+    r'\s*(?:CREATE|ALTER|DROP)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?:(?:"[^"]+"|\w+)\s*\.\s*)?(?:"(?P<quoted>[^"]+)"|(?P<name>\w+))',
+    re.IGNORECASE,
+)
+
+# Matches statements that modify table data.
+_WRITE_RE = re.compile(
+    r'\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+(?:.*?\s)?FROM)\s+(?:(?:"[^"]+"|\w+)\s*\.\s*)?(?:"(?P<quoted>[^"]+)"|(?P<name>\w+))',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Matches column list of INSERT statement.
+_INSERT_COLUMNS_RE = re.compile(r"\s*INSERT\s+INTO\s+[^(]+\((?P<columns>[^)]*)\)", re.IGNORECASE)
+
+# Matches "column = ?" in SET and WHERE clauses.
+_PARAMETER_RE = re.compile(r'(?:"(?P<quoted>[^"]+)"|(?P<name>\w+))\s*=\s*\?')
+
+
+class OnlineBackfillDone(Exception):  # noqa: N818
+    """Exception raised at the end of the backfill phase of an online
+    migration to stop further migrations.
+
+    Parameters
+    ----------
+    revision : `str`
+        Revision which finished its backfill phase.
+    """
+
+    def __init__(self, revision: str):
+        super().__init__(
+            f"Backfill phase for revision {revision} is complete, "
+            "run the same upgrade again to execute catch-up phase."
+        )
+        self.revision = revision
+
 
 class DryRunSession:
     """A replacement for Cassandra session that prints queries instead of
     executing them.
+
+    Parameters
+    ----------
+    session_for_prepare : `cassandra.cluster.Session`
+        Session used to prepare statements.
+    plan : `CqlPlanWriter`, optional
+        If specified, all queries are also added to this plan.
     """
 
-    def __init__(self, session_for_prepare: Session):
+    def __init__(self, session_for_prepare: Session, plan: CqlPlanWriter | None = None):
         self.session_for_prepare = session_for_prepare
+        self.plan = plan
+        # Prepared statements indexed by query ID, batches only keep IDs.
+        self._prepared: dict[bytes, cassandra.query.PreparedStatement] = {}
 
     def execute(self, query: Any, parameters: Any | None = None, timeout: Any = object()) -> Any:
-        _LOG.info("Query: '%s', parameters: %s", query, parameters)
+        if isinstance(query, cassandra.query.BatchStatement):
+            self._execute_batch(query)
+        elif isinstance(query, cassandra.query.PreparedStatement | cassandra.query.BoundStatement):
+            bound = query.bind(parameters) if isinstance(query, cassandra.query.PreparedStatement) else query
+            self.add_prepared(bound.prepared_statement)
+            _LOG.info("Query: '%s'", bound.prepared_statement.query_string)
+            if self.plan is not None:
+                self._add_writes(bound.prepared_statement, [bound.values])
+        else:
+            if isinstance(query, cassandra.query.Statement):
+                query = query.query_string
+            _LOG.info("Query: '%s', parameters: %s", query, parameters)
+            if self.plan is not None:
+                self.plan.add_statement(query, parameters)
+
+    def _execute_batch(self, batch: cassandra.query.BatchStatement) -> None:
+        # Logging each statement of a large batch is slow and unreadable, log
+        # one line for each group of consecutive identical statements.
+        groups: list[tuple[Any, list]] = []
+        for is_prepared, statement, values in batch._statements_and_parameters:
+            key = self._prepared[statement] if is_prepared else statement
+            if groups and groups[-1][0] == key:
+                groups[-1][1].append(values)
+            else:
+                groups.append((key, [values]))
+        for key, rows in groups:
+            if isinstance(key, cassandra.query.PreparedStatement):
+                _LOG.info("Batch query: '%s', %d statements", key.query_string, len(rows))
+                if self.plan is not None:
+                    self._add_writes(key, rows)
+            else:
+                for _ in rows:
+                    _LOG.info("Batch query: '%s'", key)
+                    if self.plan is not None:
+                        self.plan.add_statement(key)
+
+    def _add_writes(self, statement: cassandra.query.PreparedStatement, rows: list) -> None:
+        assert self.plan is not None
+        self.plan.add_writes(statement.query_string, statement.routing_key_indexes, rows)
 
     def prepare(self, query: str) -> Any:
-        return self.session_for_prepare.prepare(query)
+        statement = self.session_for_prepare.prepare(query)
+        self.add_prepared(statement)
+        return statement
+
+    def add_prepared(self, statement: cassandra.query.PreparedStatement) -> None:
+        """Register a statement prepared using a different session, so that
+        it can be found when used in a batch.
+
+        Parameters
+        ----------
+        statement : `cassandra.query.PreparedStatement`
+            Prepared statement.
+        """
+        self._prepared[statement.query_id] = statement
+
+
+class _DryRunSchemaSession:
+    """Session used for schema inspection in dry-run mode.
+
+    Parameters
+    ----------
+    session : `cassandra.cluster.Session`
+        Database session.
+    simulation : `OfflineSession`
+        Simulated schema of the keyspace.
+
+    Notes
+    -----
+    Queries of ``system_schema.columns`` are answered from the simulated
+    schema, which includes changes made by DDL statements that were not
+    executed in dry-run mode. All other queries are executed by the real
+    session.
+    """
+
+    def __init__(self, session: Session, simulation: OfflineSession):
+        self._session = session
+        self._simulation = simulation
+
+    def execute(self, query: Any, parameters: Any | None = None, *args: Any, **kwargs: Any) -> Any:
+        if isinstance(query, str) and "system_schema.columns" in query:
+            return self._simulation.execute(query, parameters)
+        return self._session.execute(query, parameters, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
 
 
 class Context:
@@ -72,6 +226,12 @@ class Context:
         then tree name and version are extracted from the revision.
     version_str : `str`, optional
         Version, must be specified if packed revision name cannot be unpacked.
+    online : `bool`, optional
+        If `True` then migration script supports two-phase online mode, see
+        `online_phase` for details.
+    config : `ApdbMigConfigCassandra`, optional
+        Migration configuration, only needs to be specified when context is
+        used outside of alembic migration, e.g. for deferred backfill.
 
     Notes
     -----
@@ -87,7 +247,20 @@ class Context:
 
     metadataConfigKey = "config:apdb-cassandra.json"
 
-    def __init__(self, revision_or_tree: str, version_str: str | None = None):
+    defaultSnapshotMaxAge = 24 * 3600.0
+    """Default maximum age of cached snapshots in seconds."""
+
+    onlineMetadataPrefix = "online:"
+    """Prefix for metadata keys that keep the state of online migrations."""
+
+    def __init__(
+        self,
+        revision_or_tree: str,
+        version_str: str | None = None,
+        *,
+        online: bool = False,
+        config: ApdbMigConfigCassandra | None = None,
+    ):
         # First make sure that revision string looks reasonable.
         if version_str:
             self._tree = revision_or_tree
@@ -99,37 +272,102 @@ class Context:
             self._version = unpacked_version
             self._tree = unpacked_tree
 
-        config = alembic.context.config
-        assert isinstance(config, ApdbMigConfigCassandra), "Expecting ApdbMigConfigCassandra"
+        # Alembic migration context for the DB being migrated.
+        self.mig_context: alembic.runtime.migration.MigrationContext | None = None
+        if config is None:
+            alembic_config = alembic.context.config
+            assert isinstance(alembic_config, ApdbMigConfigCassandra), "Expecting ApdbMigConfigCassandra"
+            config = alembic_config
+            self.mig_context = alembic.context.get_context()
         self.config = config
 
-        # Alembic migration context for the DB being migrated.
-        self.mig_context = alembic.context.get_context()
         self._query_session: Session | None = None
         self._update_session: Session | DryRunSession | None = None
         assert config.db is not None
         self.db = config.db
         self._stack = ExitStack()
 
+        # Snapshot cache is optional.
+        self._snapshot_cache: SnapshotCache | None = None
+        if cache_path := self.get_mig_option("snapshot-cache"):
+            self._snapshot_cache = SnapshotCache(cache_path)
+
+        self._schema: Schema | None = None
+        self._apdb_config: dict[str, Any] | None = None
+        self._target: TargetSchema | None = None
+
+        self._online = online
+        self._online_phase: Literal["backfill", "catch-up"] | None = None
+        self._online_scan_start: float | None = None
+
     def __enter__(self) -> Context:
         session = self._stack.enter_context(self.db.make_session())
         self._query_session = session
         self._update_session = session
         if self.dry_run:
             # Use query-printing session instead of a real one.
-            self._update_session = DryRunSession(session)
+            self._update_session = DryRunSession(session, self.db.cql_plan)
+            if self.db.dry_run_schema is None:
+                # DDL is not executed in dry-run mode, its effect on schema
+                # is simulated, so that following migrations see it.
+                snapshot = SchemaSnapshot(self.keyspace, TableSchema.from_keyspace(session, self.keyspace))
+                self.db.dry_run_schema = OfflineSession(snapshot)
         else:
             self._update_session = session
+        if self._online:
+            self._start_online_phase()
         return self
 
     def __exit__(self, exc_type: type | None, exc_value: Any, traceback: Any) -> Literal[False]:
         # If it ran to completion store new version number.
         assert self._query_session is not None
         if exc_type is None:
-            self.update_tree_version(self._tree, self._version)
+            if self._online_phase == "backfill":
+                # Remember when the scan started, version is not updated
+                # until catch-up phase is done.
+                self.metadata.insert(
+                    self._online_metadata_key, json.dumps({"scan_start": self._online_scan_start})
+                )
+            else:
+                if self._tree == TargetSchema.tree and (target := self._target_schema()) is not None:
+                    # Final revision has to bring tables to target state even
+                    # if it does not change their columns itself.
+                    self._apply_target_schema(target, None)
+                self.update_tree_version(self._tree, self._version)
+                if self._online_phase == "catch-up":
+                    self.metadata.delete(self._online_metadata_key)
+            if self._cost_recorder is not None:
+                self._cost_recorder.finish_revision(f"{self._tree}_{self._version}")
         self._stack.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self._online_phase == "backfill":
+            raise OnlineBackfillDone(f"{self._tree}_{self._version}")
         return False
 
+    @property
+    def _cost_recorder(self) -> CostRecorder | None:
+        # Recorder is only used in dry-run mode.
+        return self.db.cost_recorder if self.dry_run else None
+
+    @property
+    def _online_metadata_key(self) -> str:
+        return f"{self.onlineMetadataPrefix}{self._tree}_{self._version}"
+
+    def _start_online_phase(self) -> None:
+        """Determine which phase of online migration is executed."""
+        state_json = self.metadata.get(self._online_metadata_key)
+        if state_json is not None:
+            state = json.loads(state_json)
+            self._online_phase = "catch-up"
+            self._online_scan_start = state["scan_start"]
+            _LOG.info(
+                "Executing catch-up phase of online migration, backfill scan started at %s",
+                time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self._online_scan_start)),
+            )
+        elif (self.get_mig_option("online") or "").lower() in ("1", "yes", "true"):
+            self._online_phase = "backfill"
+            self._online_scan_start = time.time()
+            _LOG.info("Executing backfill phase of online migration")
+
     def _check_context(self) -> None:
         if self._query_session is None:
             raise TypeError("Cannot use this object outside context.")
@@ -154,10 +392,52 @@ class Context:
 
     @property
     def schema(self) -> Schema:
-        """Helper instance for schema queries (`Scchema`)."""
+        """Helper instance for schema queries (`Schema`).
+
+        The same instance is returned for the lifetime of the context, it
+        caches keyspace schema which is refreshed by `update` when it executes
+        DDL statements. In dry-run mode the schema includes changes made by
+        DDL statements which were not executed.
+        """
         self._check_context()
         assert self._query_session is not None
-        return Schema(self._query_session, self.keyspace, self.get_apdb_config())
+        if self._schema is None:
+            schema_session: Any = self._query_session
+            if self.db.dry_run_schema is not None:
+                schema_session = _DryRunSchemaSession(self._query_session, self.db.dry_run_schema)
+            self._schema = Schema(
+                schema_session,
+                self.keyspace,
+                self._cached_apdb_config(),
+                cost_recorder=self._cost_recorder,
+            )
+        return self._schema
+
+    @property
+    def online_phase(self) -> Literal["backfill", "catch-up"] | None:
+        """Phase of the online migration, `None` if migration is executed in
+        regular mode.
+
+        Notes
+        -----
+        Online mode is selected with ``--options online=1`` and is only
+        supported by migrations that pass ``online=True`` to the constructor.
+        In online mode the migration runs twice. In the first "backfill" phase
+        the migration does its work while APDB stays live, and records the
+        time when it started scanning the data, tree version is not updated
+        and further migrations are not executed. The second "catch-up" phase
+        is started by the next upgrade, it should only process data written
+        after the backfill scan started (see `scan_table_since`), it runs
+        quickly while APDB is stopped and it updates tree version.
+        """
+        return self._online_phase
+
+    @property
+    def online_scan_start(self) -> float | None:
+        """POSIX time when backfill phase of online migration started, `None`
+        if migration is executed in regular mode (`float` or `None`).
+        """
+        return self._online_scan_start
 
     def get_mig_option(self, option: str) -> str | None:
         """Retrieve option that was passed on the command line.
@@ -241,6 +521,256 @@ class Context:
         else:
             return self._query_session.execute(query, parameters, timeout=timeout)
 
+    def scan_table(
+        self, table_name: str, columns: Iterable[str], *, max_age: float | None = None
+    ) -> TableSnapshot:
+        """Return a snapshot of a projection of the whole table.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table to scan.
+        columns : `~collections.abc.Iterable` [`str`]
+            Names of the columns to return.
+        max_age : `float`, optional
+            Maximum age in seconds of a cached snapshot that can be used
+            instead of scanning the table. If not specified then the value of
+            ``snapshot-max-age`` option is used, or `defaultSnapshotMaxAge` if
+            option is not set.
+
+        Returns
+        -------
+        snapshot : `TableSnapshot`
+            Snapshot of the table, it may include more columns than requested.
+
+        Notes
+        -----
+        Snapshot cache is only used when ``snapshot-cache=PATH`` option is
+        specified on the command line, otherwise the table is always scanned.
+        Snapshots are keyed by the version of the ``schema`` tree, this allows
+        re-running failed migrations without re-scanning the same tables.
+        Tables are scanned with `Schema.scan`, which does not need ALLOW
+        FILTERING.
+        """
+        columns = tuple(columns)
+        schema_version = self.metadata.get("version:schema") or ""
+        if self._snapshot_cache is not None:
+            if max_age is None:
+                max_age_str = self.get_mig_option("snapshot-max-age")
+                max_age = float(max_age_str) if max_age_str else self.defaultSnapshotMaxAge
+            snapshot = self._snapshot_cache.find(
+                self.keyspace, table_name, columns, schema_version, max_age=max_age
+            )
+            if snapshot is not None:
+                _LOG.info(
+                    "Using cached snapshot of table %s, %d rows, age %.0f seconds",
+                    table_name,
+                    len(snapshot),
+                    snapshot.age,
+                )
+                return snapshot
+
+        _LOG.info("Scanning table %s", table_name)
+        scan_time = time.time()
+        column_list = ", ".join(self.qoute_ids(columns))
+        result = self.schema.scan(table_name, column_list)
+        snapshot = TableSnapshot.from_rows(
+            self.keyspace, table_name, columns, schema_version, scan_time, result
+        )
+        _LOG.info("Scanned %d rows from table %s", len(snapshot), table_name)
+
+        if self._snapshot_cache is not None:
+            self._snapshot_cache.store(snapshot)
+        return snapshot
+
+    def time_partition(self, timestamp: float) -> int:
+        """Return time partition number for a given time.
+
+        Parameters
+        ----------
+        timestamp : `float`
+            POSIX time.
+
+        Returns
+        -------
+        partition : `int`
+            Time partition number.
+        """
+        partition_days = self.get_apdb_config().get("time_partition_days")
+        if partition_days is None:
+            raise LookupError("APDB configuration does not define time_partition_days.")
+        # Time partitions in APDB are counted from Unix epoch.
+        days = timestamp / 86400
+        return int(days // partition_days)
+
+    def scan_table_since(
+        self, table_name: str, columns: Iterable[str], since: float, *, writetime_column: str | None = None
+    ) -> TableSnapshot:
+        """Return a snapshot of a projection of the rows written after a
+        given time.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table to scan.
+        columns : `~collections.abc.Iterable` [`str`]
+            Names of the columns to return.
+        since : `float`
+            POSIX time, only rows written at or after this time are returned.
+        writetime_column : `str`, optional
+            Name of the column whose write time is checked, must be a regular
+            (non-key) column. By default first regular column in ``columns``
+            is used.
+
+        Returns
+        -------
+        snapshot : `TableSnapshot`
+            Snapshot of the table, it is never cached.
+
+        Notes
+        -----
+        For per-partition tables (``Table_NNN``) and tables with
+        ``apdb_time_part`` in their partition key, time partitions older than
+        ``since`` are not scanned at all. Write time is checked on the client
+        side, rows with NULL in ``writetime_column`` are always returned.
+        Write time is assigned by APDB clients whose clocks can differ from
+        the clock of this host, ``since`` is shifted back by a margin to
+        account for that, which is one hour by default and can be changed
+        with ``clock-skew`` option (in seconds). Some rows written before
+        ``since`` are returned too, callers have to process them idempotently.
+        """
+        columns = tuple(columns)
+        column_kinds = {column.column_name: column.kind for column in self.schema.table_columns(table_name)}
+        if writetime_column is None:
+            regular_columns = [column for column in columns if column_kinds.get(column) == "regular"]
+            if not regular_columns:
+                raise ValueError(f"No regular columns in the list of columns for table {table_name}")
+            writetime_column = regular_columns[0]
+
+        clock_skew = float(self.get_mig_option("clock-skew") or _CLOCK_SKEW_MARGIN)
+        since -= clock_skew
+
+        time_partitions: range | None = None
+        if (match := re.fullmatch(r".+_(\d+)", table_name)) or column_kinds.get(
+            "apdb_time_part"
+        ) == "partition_key":
+            since_partition = self.time_partition(since - _TIME_PARTITION_MARGIN)
+            if match:
+                if int(match.group(1)) < since_partition:
+                    _LOG.info("Skipping table %s which is older than time %s", table_name, since)
+                    return TableSnapshot.from_rows(self.keyspace, table_name, columns, "", time.time(), [])
+            else:
+                last_partition = self.time_partition(time.time() + _TIME_PARTITION_MARGIN)
+                time_partitions = range(since_partition, last_partition + 1)
+
+        _LOG.info("Scanning table %s for rows written since %s", table_name, since)
+        scan_time = time.time()
+        column_list = ", ".join(self.qoute_ids(columns))
+        select_list = f'{column_list}, WRITETIME("{writetime_column}")'
+        since_usec = int(since * 1_000_000)
+        result = self.schema.scan(table_name, select_list, time_partitions=time_partitions)
+        rows = (tuple(row)[:-1] for row in result if row[-1] is None or row[-1] >= since_usec)
+        schema_version = self.metadata.get("version:schema") or ""
+        snapshot = TableSnapshot.from_rows(
+            self.keyspace, table_name, columns, schema_version, scan_time, rows
+        )
+        _LOG.info("Found %d new rows in table %s", len(snapshot), table_name)
+        return snapshot
+
+    def prepare(self, query: str) -> cassandra.query.PreparedStatement:
+        """Prepare a statement, statements are cached when a session is
+        shared between migrations.
+
+        Parameters
+        ----------
+        query : `str`
+            Query string.
+
+        Returns
+        -------
+        statement : `cassandra.query.PreparedStatement`
+            Prepared statement, it can be used with `query` or `update`.
+
+        Notes
+        -----
+        In dry-run mode write statements that use tables or columns which
+        were created by DDL in the same run cannot be prepared by the
+        database, they are prepared using simulated schema instead, so that
+        their writes can be logged and saved in a plan.
+        """
+        self._check_context()
+        assert self._query_session is not None
+        if self._cost_recorder is not None and (match := _WRITE_RE.match(query)) is not None:
+            table_name = match.group("quoted") or match.group("name").lower()
+            if table_name != self.db.metadata_table_name:
+                self._cost_recorder.record_write(table_name)
+        try:
+            statement = self.db.prepare(self._query_session, query)
+        except InvalidRequest:
+            if not self.dry_run:
+                raise
+            # Statement may use tables or columns that were only created in
+            # dry-run mode.
+            statement = self._prepare_simulated(query)
+        if isinstance(self._update_session, DryRunSession):
+            self._update_session.add_prepared(statement)
+        return statement
+
+    def _prepare_simulated(self, query: str) -> cassandra.query.PreparedStatement:
+        """Make prepared statement for a write query using simulated schema
+        instead of the database.
+
+        Parameters
+        ----------
+        query : `str`
+            Query string of INSERT, UPDATE, or DELETE statement, each
+            parameter has to be a value of a column.
+
+        Returns
+        -------
+        statement : `cassandra.query.PreparedStatement`
+            Prepared statement which can be bound but not executed by a real
+            session.
+        """
+        if (match := _WRITE_RE.match(query)) is None:
+            raise ValueError(f"Query cannot be prepared in dry-run mode: {query}")
+        table_name = match.group("quoted") or match.group("name").lower()
+        if (insert := _INSERT_COLUMNS_RE.match(query)) is not None:
+            names = [name.strip() for name in insert.group("columns").split(",")]
+            names = [name[1:-1] if name.startswith('"') else name.lower() for name in names]
+        else:
+            names = [
+                parameter.group("quoted") or parameter.group("name").lower()
+                for parameter in _PARAMETER_RE.finditer(query)
+            ]
+        if len(names) != query.count("?"):
+            raise ValueError(f"Failed to match parameters to columns in query: {query}")
+
+        columns = {column.column_name: column for column in self.schema.table_columns(table_name)}
+        column_metadata = []
+        for name in names:
+            if (column := columns.get(name)) is None:
+                raise InvalidRequest(f"Column {name} does not exist in table {table_name}")
+            # Only simple types are supported.
+            if (column_type := cassandra.cqltypes._cqltypes.get(column.type)) is None:
+                raise ValueError(f"Type {column.type} of column {name} is not supported in dry-run mode")
+            column_metadata.append(ColumnMetadata(self.keyspace, table_name, name, column_type))
+
+        partition_key = self.schema.partition_key(table_name)
+        routing_key_indexes = None
+        if set(partition_key) <= set(names):
+            routing_key_indexes = [names.index(name) for name in partition_key]
+        return cassandra.query.PreparedStatement(
+            column_metadata,
+            hashlib.md5(query.encode()).digest(),
+            routing_key_indexes,
+            query,
+            self.keyspace,
+            self.db.protocol_version,
+            None,
+            None,
+        )
+
     def update(
         self, query: str | cassandra.query.Statement, parameters: Sequence | Mapping | None = None
     ) -> Any:
@@ -256,19 +786,368 @@ class Context:
         """
         self._check_context()
         assert self._update_session is not None
-        return self._update_session.execute(query, parameters)
+        result = self._update_session.execute(query, parameters)
+        if isinstance(query, str) and (match := _TABLE_DDL_RE.match(query)) is not None:
+            if self.dry_run and self.db.dry_run_schema is not None:
+                self.db.dry_run_schema.execute(query)
+            if self._schema is not None:
+                # Unquoted identifiers are case-insensitive.
+                table_name = match.group("quoted") or match.group("name").lower()
+                self._schema.refresh(table_name)
+        return result
+
+    def execute_ddl(self, statements: Iterable[str], *, concurrency: int | None = None) -> None:
+        """Execute a group of independent schema changes concurrently.
+
+        Parameters
+        ----------
+        statements : `~collections.abc.Iterable` [`str`]
+            DDL statements, they must be independent of each other, e.g. each
+            statement should modify a different table.
+        concurrency : `int`, optional
+            Maximum number of statements executing at the same time, default
+            is taken from ``ddl-concurrency`` option, or 8 if option is not
+            set.
+
+        Notes
+        -----
+        By default the driver waits for schema agreement after every schema
+        change, which takes a significant time for each statement. This method
+        disables that wait while statements are executing and waits for schema
+        agreement just once after all statements in a group finish. Latency of
+        each statement is logged at DEBUG level and the summary at INFO level.
+        """
+        self._check_context()
+        statements = list(statements)
+        if not statements:
+            return
+        if self.dry_run or self.db.offline:
+            for statement in statements:
+                self.update(statement)
+            return
+
+        if concurrency is None:
+            concurrency = int(self.get_mig_option("ddl-concurrency") or 8)
+        concurrency = max(concurrency, 1)
+
+        assert self._query_session is not None
+        cluster = self._query_session.cluster
+        schema_agreement_wait = cluster.max_schema_agreement_wait
+        latencies: list[float] = []
+        group_start = time.time()
+        try:
+            cluster.max_schema_agreement_wait = 0
+            pending: list[tuple[str, float, Any, list[float]]] = []
+            for statement in statements:
+                if len(pending) >= concurrency:
+                    latencies.append(self._wait_ddl(*pending.pop(0)))
+                future = self._query_session.execute_async(statement)
+                # Completion time is recorded by callback, statements do not
+                # necessarily complete in the order of submission.
+                end_time: list[float] = []
+                future.add_callbacks(lambda _, end=end_time: end.append(time.time()), lambda _: None)
+                pending.append((statement, time.time(), future, end_time))
+            for item in pending:
+                latencies.append(self._wait_ddl(*item))
+        finally:
+            cluster.max_schema_agreement_wait = schema_agreement_wait
+
+        agreement_start = time.time()
+        if not cluster.control_connection.wait_for_schema_agreement(wait_time=schema_agreement_wait):
+            _LOG.warning("Schema agreement was not reached in %s seconds", schema_agreement_wait)
+        _LOG.info(
+            "Executed %d DDL statements in %.1f seconds (latency min/max: %.2f/%.2f seconds), "
+            "schema agreement took %.1f seconds",
+            len(statements),
+            time.time() - group_start,
+            min(latencies),
+            max(latencies),
+            time.time() - agreement_start,
+        )
+
+        if self._schema is not None:
+            self._schema.refresh()
+
+    def apply_ddl(self, operations: Iterable[DdlOperation], *, concurrency: int | None = None) -> None:
+        """Execute schema changes that are not applied yet.
+
+        Parameters
+        ----------
+        operations : `~collections.abc.Iterable` [`DdlOperation`]
+            Schema change operations, they must be independent of each other,
+            e.g. each operation should modify a different table.
+        concurrency : `int`, optional
+            Maximum number of statements executing at the same time, passed
+            to `execute_ddl`.
+
+        Notes
+        -----
+        Each operation is compared with the cached schema of the keyspace and
+        only the missing part of the change is executed, operations that are
+        already fully applied are skipped. This makes it possible to re-run
+        a migration that failed in the middle of a sequence of schema changes.
+
+        If ``target-schema`` option is given, operations on tables covered by
+        the target schema are ignored, instead those tables are brought to
+        the target state directly, see `TargetSchema`. Version of the target
+        schema must be the final version of the upgrade, tables are only
+        brought to target state by the migration to that version, on its
+        first call to this method or when it finishes. Migrations to
+        intermediate versions leave these tables unchanged, so that columns
+        they may still need are not dropped.
+        """
+        operations = list(operations)
+        if self._tree == TargetSchema.tree and (target := self._target_schema()) is not None:
+            covered = target.live_tables(self.schema)
+            replaced = [operation for operation in operations if operation.table_name in covered]
+            if replaced:
+                _LOG.info("Replacing %d operations with target schema changes", len(replaced))
+                operations = [operation for operation in operations if operation.table_name not in covered]
+            self._apply_target_schema(target, concurrency)
+        self._apply_operations(operations, concurrency)
+
+    def _apply_target_schema(self, target: TargetSchema, concurrency: int | None) -> None:
+        """Bring tables covered by target schema to target state if this is
+        the migration to target version.
+        """
+        if self._version == target.version:
+            for group in target.operations(self.schema):
+                self._apply_operations(group, concurrency)
+
+    def _apply_operations(self, operations: Iterable[DdlOperation], concurrency: int | None) -> None:
+        """Execute statements for operations that are not applied yet."""
+        statements = []
+        for operation in operations:
+            if (statement := operation.statement(self.schema, self.keyspace)) is None:
+                _LOG.info("Skipping already applied operation: %s", operation)
+            else:
+                _LOG.info("Executing operation: %s", operation)
+                statements.append(statement)
+        self.execute_ddl(statements, concurrency=concurrency)
+
+    def _target_schema(self) -> TargetSchema | None:
+        """Return target schema if ``target-schema`` option is given."""
+        if self._target is None and (path := self.get_mig_option("target-schema")):
+            target = TargetSchema.from_felis(path)
+            if self.mig_context is not None:
+                final_version = self._destination_version(target.tree)
+                if target.version != final_version:
+                    raise ValueError(
+                        f"Version of target schema ({target.version}) does not match final version "
+                        f"of the upgrade ({final_version})."
+                    )
+            _LOG.info("Using target schema from %s, version %s", path, target.version)
+            self._target = target
+        return self._target
+
+    def _destination_version(self, tree: str) -> str | None:
+        """Return version of a tree at the end of the running upgrade, or
+        `None` if upgrade does not include that tree.
+        """
+        assert self.mig_context is not None and self.mig_context.script is not None
+        script = self.mig_context.script
+        destination = script.as_revision_number(self.mig_context.opts.get("destination_rev"))
+        if destination is None:
+            return None
+        for script_revision in script.iterate_revisions(destination, "base"):
+            rev_tree, rev_version = revision.unpack_revision(script_revision.revision)
+            if rev_tree == tree:
+                return rev_version
+        return None
+
+    @staticmethod
+    def _wait_ddl(statement: str, start_time: float, future: Any, end_time: list[float]) -> float:
+        """Wait for DDL statement to complete and return its latency."""
+        future.result()
+        latency = (end_time[0] if end_time else time.time()) - start_time
+        _LOG.debug("DDL statement took %.2f seconds: %s", latency, statement)
+        return latency
+
+    @contextmanager
+    def bulk_load(self, table_schema: TableSchema) -> Iterator[None]:
+        """Create new table with bulk-load options and restore its production
+        options on exit.
+
+        Parameters
+        ----------
+        table_schema : `TableSchema`
+            Schema of the table to create, its ``table_options`` define
+            production options for the table.
+
+        Notes
+        -----
+        Table is created with compaction disabled, so that data written into
+        a new table is not re-compacted many times while loading. Production
+        options are restored only if the block exits without exception, if it
+        fails the statement which restores them is logged as an error, to be
+        executed manually after a failed migration. After restoring options
+        the compaction backlog is
+        logged, it can take some time for compaction to catch up.
+
+        If ``table_options`` do not specify compaction, the table is created
+        with the default compaction of the cluster, which is then read back
+        from ``system_schema.tables``, disabled for loading, and restored
+        exactly. Default compaction is unknown in dry-run mode, compaction is
+        not disabled in that case.
+        """
+        if table_schema.table_options.get("compaction"):
+            _LOG.info("Creating table %s with bulk-load options", table_schema.table_name)
+            self.update(table_schema.make_ddl(bulk_load=True))
+            production_schema: TableSchema | None = table_schema
+        else:
+            _LOG.info("Creating table %s with default compaction", table_schema.table_name)
+            self.update(table_schema.make_ddl())
+            production_schema = None
+            query = "SELECT compaction FROM system_schema.tables WHERE keyspace_name = %s AND table_name = %s"
+            rows = list(self.query(query, (self.keyspace, table_schema.table_name)))
+            if rows and (compaction := rows[0]._asdict().get("compaction")):
+                production_schema = dataclasses.replace(
+                    table_schema, table_options=table_schema.table_options | {"compaction": dict(compaction)}
+                )
+                self.update(production_schema.make_bulk_load_ddl())
+            else:
+                _LOG.info(
+                    "Default compaction of table %s is unknown, it is not disabled", table_schema.table_name
+                )
+        load_start = time.time()
+        try:
+            yield
+        except BaseException:
+            if production_schema is not None:
+                _LOG.error(
+                    "Bulk load into table %s failed, table options need to be restored manually: %s",
+                    table_schema.table_name,
+                    production_schema.make_restore_ddl(),
+                )
+            raise
+        _LOG.info(
+            "Bulk load into table %s took %.1f seconds",
+            table_schema.table_name,
+            time.time() - load_start,
+        )
+        if production_schema is not None:
+            _LOG.info("Restoring options of table %s", table_schema.table_name)
+            self.update(production_schema.make_restore_ddl())
+            self.log_compaction_backlog(table_schema.table_name)
+
+    def log_compaction_backlog(self, table_name: str) -> None:
+        """Log the state of compaction for a table.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+
+        Notes
+        -----
+        Information comes from virtual tables of the node that the query
+        happens to be sent to, so this is only an estimate of the backlog for
+        the whole cluster. Nothing is logged if virtual tables are not
+        supported by the server.
+        """
+        try:
+            pools = self.query(
+                "SELECT active_tasks, pending_tasks FROM system_views.thread_pools WHERE name = %s",
+                ("CompactionExecutor",),
+            )
+            tasks = self.query(
+                "SELECT kind, progress, total FROM system_views.sstable_tasks "
+                "WHERE keyspace_name = %s AND table_name = %s",
+                (self.keyspace, table_name),
+            )
+        except InvalidRequest as exc:
+            _LOG.debug("Failed to query compaction metrics: %s", exc)
+            return
+        for row in pools:
+            _LOG.info(
+                "Compaction executor: %d active tasks, %d pending tasks",
+                row.active_tasks,
+                row.pending_tasks,
+            )
+        remaining = 0
+        count = 0
+        for row in tasks:
+            if row.kind == "compaction":
+                count += 1
+                remaining += row.total - row.progress
+        _LOG.info(
+            "Table %s: %d compaction tasks running, %d bytes remaining to compact",
+            table_name,
+            count,
+            remaining,
+        )
+
+    def add_backfill_job(self, units: Iterable[str]) -> None:
+        """Record deferred backfill job for this revision.
+
+        Parameters
+        ----------
+        units : `~collections.abc.Iterable` [`str`]
+            Work units in the order in which they need to be processed,
+            usually with the most recent data first.
+
+        Notes
+        -----
+        Backfill jobs are executed by ``apdb-migrate-cassandra backfill``
+        command, which calls ``backfill(ctx, unit)`` function of the
+        migration script for each unit. Progress is saved after each unit, so
+        the command can be interrupted and restarted.
+        """
+        job = BackfillJob(revision=f"{self._tree}_{self._version}", units=list(units))
+        _LOG.info("Recording backfill job with %d units", len(job.units))
+        self.metadata.insert(job.metadata_key, job.to_json())
+
+    def _cached_apdb_config(self) -> dict[str, Any]:
+        """Return cached frozen part of APDB config, the returned object must
+        not be modified by caller.
+        """
+        if self._apdb_config is None:
+            config_json = self.metadata.get(self.metadataConfigKey)
+            if not config_json:
+                raise LookupError(f"Cannot find {self.metadataConfigKey} in metadata table.")
+            self._apdb_config = json.loads(config_json)
+        return self._apdb_config
 
     def get_apdb_config(self) -> dict[str, Any]:
-        """Return frozen part of APDB config from metadata."""
-        config_json = self.metadata.get(self.metadataConfigKey)
-        if not config_json:
-            raise LookupError(f"Cannot find {self.metadataConfigKey} in metadata table.")
-        return json.loads(config_json)
+        """Return frozen part of APDB config from metadata.
+
+        Configuration is read from metadata once and cached, the returned
+        object is a copy that can be modified by caller.
+        """
+        return copy.deepcopy(self._cached_apdb_config())
 
     def store_apdb_config(self, config: dict[str, Any]) -> None:
         """Store frozen part of APDB config to metadata."""
         json_str = json.dumps(config)
         self.metadata.insert(self.metadataConfigKey, json_str)
+        if self._apdb_config is None:
+            self._apdb_config = copy.deepcopy(config)
+        else:
+            # Schema instance shares this object, update it in place.
+            self._apdb_config.clear()
+            self._apdb_config.update(copy.deepcopy(config))
+
+    def update_apdb_config(
+        self, updates: dict[str, Any] | None = None, *, deletes: Iterable[str] | None = None
+    ) -> None:
+        """Update frozen part of APDB config in metadata.
+
+        Parameters
+        ----------
+        updates : `dict` [`str`, `~typing.Any`], optional
+            Key-value pairs to update configuration with. Existing key will be
+            overwritten.
+        deletes : `~collections.abc.Iterable` [`str`], optional
+            Keys to remove from configuration. The keys may not exist in the
+            configuration.
+        """
+        config = self.get_apdb_config()
+        if updates:
+            config.update(updates)
+        if deletes:
+            for key in deletes:
+                config.pop(key, None)
+        self.store_apdb_config(config)
 
     def has_replicas(self) -> bool:
         """Return True if replication is enabled."""
@@ -317,3 +1196,70 @@ class Context:
                 f"Existing version for {tree} ({version_str}) "
                 f"is older than requested version ({version_req_str})"
             )
+
+
+class BackfillContext(Context):
+    """Context used for executing deferred backfill jobs.
+
+    Parameters
+    ----------
+    job : `BackfillJob`
+        Backfill job.
+    config : `ApdbMigConfigCassandra`
+        Migration configuration.
+    max_rate : `float`, optional
+        Maximum average rate of updates, in records per second, `None` means
+        no limit.
+
+    Notes
+    -----
+    Unlike regular context this does not update tree version on exit.
+    """
+
+    def __init__(self, job: BackfillJob, config: ApdbMigConfigCassandra, max_rate: float | None = None):
+        super().__init__(job.revision, config=config)
+        self.job = job
+        self._max_rate = max_rate
+        self._start_time = time.time()
+        self._count = 0
+        self.cache: dict[str, Any] = {}
+        """Data that is shared between units within one backfill run
+        (`dict`).
+        """
+
+    def __enter__(self) -> BackfillContext:
+        super().__enter__()
+        return self
+
+    def __exit__(self, exc_type: type | None, exc_value: Any, traceback: Any) -> Literal[False]:
+        self._stack.__exit__(exc_type, exc_value, traceback)
+        return False
+
+    def throttle(self, count: int) -> None:
+        """Account for updated records, sleeping if necessary to keep the
+        rate of updates under the limit.
+
+        Parameters
+        ----------
+        count : `int`
+            Number of records updated since previous call.
+        """
+        self._count += count
+        if self._max_rate and not self.dry_run:
+            delay = self._count / self._max_rate - (time.time() - self._start_time)
+            if delay > 0:
+                time.sleep(delay)
+
+    def complete_unit(self, unit: str) -> None:
+        """Mark work unit as completed and save job state.
+
+        Parameters
+        ----------
+        unit : `str`
+            Completed work unit.
+        """
+        self.job.completed.append(unit)
+        if self.job.remaining:
+            self.metadata.insert(self.job.metadata_key, self.job.to_json())
+        else:
+            self.metadata.delete(self.job.metadata_key)
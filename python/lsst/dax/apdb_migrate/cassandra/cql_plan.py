@@ -0,0 +1,382 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Replayable plan of queries recorded during dry run."""
+
+from __future__ import annotations
+
+__all__ = ["CqlPlan", "CqlPlanWriter", "PlanStep"]
+
+import dataclasses
+import hashlib
+import json
+import os
+import struct
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, BinaryIO, Literal
+
+from cassandra.query import UNSET_VALUE
+
+# Value lengths use the same encoding as Cassandra native protocol, negative
+# lengths are used for null and unset values.
+_LENGTH = struct.Struct(">i")
+_COUNT = struct.Struct(">H")
+_NULL_LENGTH = -1
+_UNSET_LENGTH = -2
+
+
+def _serialize_row(values: Sequence[Any]) -> bytes:
+    """Return serialized values of one statement."""
+    chunks = [_COUNT.pack(len(values))]
+    for value in values:
+        if value is None:
+            chunks.append(_LENGTH.pack(_NULL_LENGTH))
+        elif value is UNSET_VALUE:
+            chunks.append(_LENGTH.pack(_UNSET_LENGTH))
+        else:
+            chunks += [_LENGTH.pack(len(value)), value]
+    return b"".join(chunks)
+
+
+def _read_rows(file: BinaryIO, count: int) -> Iterator[list[Any]]:
+    """Read serialized values of ``count`` statements."""
+    for _ in range(count):
+        (num_values,) = _COUNT.unpack(file.read(_COUNT.size))
+        values: list[Any] = []
+        for _ in range(num_values):
+            (length,) = _LENGTH.unpack(file.read(_LENGTH.size))
+            if length == _NULL_LENGTH:
+                values.append(None)
+            elif length == _UNSET_LENGTH:
+                values.append(UNSET_VALUE)
+            else:
+                values.append(file.read(length))
+        yield values
+
+
+@dataclasses.dataclass
+class PlanStep:
+    """One step of a plan, either a single CQL statement or a group of
+    consecutive writes using the same statement.
+    """
+
+    kind: Literal["cql", "write"]
+    """Type of the step (`str`)."""
+
+    query: str
+    """Query string, writes use prepared statement syntax (`str`)."""
+
+    parameters: list | None = None
+    """Parameters of CQL statement (`list` or `None`)."""
+
+    rows: int = 0
+    """Number of statements executed by a write step (`int`)."""
+
+    partitions: int = 0
+    """Number of distinct partitions updated by a write step (`int`)."""
+
+    data_offset: int | None = None
+    """Offset of serialized parameters in data file, `None` if parameters
+    were not saved (`int` or `None`).
+    """
+
+    data_size: int = 0
+    """Size of serialized parameters in data file (`int`)."""
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return JSON-compatible representation."""
+        if self.kind == "cql":
+            return {"kind": self.kind, "query": self.query, "parameters": self.parameters}
+        return {
+            "kind": self.kind,
+            "query": self.query,
+            "rows": self.rows,
+            "partitions": self.partitions,
+            "data_offset": self.data_offset,
+            "data_size": self.data_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PlanStep:
+        """Make an instance from JSON-compatible representation."""
+        return cls(**data)
+
+
+@dataclasses.dataclass
+class CqlPlan:
+    """Plan of the queries for upgrading a keyspace.
+
+    Notes
+    -----
+    Plan is stored as a JSON file, serialized parameters of write statements
+    can be optionally stored in a separate binary data file. Parameters are
+    stored in the form produced by binding prepared statements, they are
+    sent to Cassandra without conversion when plan is applied. Size and
+    checksum of the data file are stored in the plan, `check_data` verifies
+    that the data file was not replaced or truncated.
+    """
+
+    keyspace: str
+    """Name of the keyspace (`str`)."""
+
+    versions: dict[str, str]
+    """Versions of all trees at the time plan was made
+    (`dict` [`str`, `str`]).
+    """
+
+    steps: list[PlanStep] = dataclasses.field(default_factory=list)
+    """Steps of the plan in execution order (`list` [`PlanStep`])."""
+
+    data_path: str | None = None
+    """Name of the data file, relative to the directory of the plan file
+    when stored in JSON, plan returned from `read` has it resolved
+    (`str` or `None`).
+    """
+
+    data_file_size: int | None = None
+    """Size of the data file in bytes (`int` or `None`)."""
+
+    data_checksum: str | None = None
+    """SHA-256 digest of the data file in hex form (`str` or `None`)."""
+
+    def to_json(self) -> str:
+        """Return JSON representation of the plan."""
+        data = {
+            "keyspace": self.keyspace,
+            "versions": self.versions,
+            "data_path": self.data_path,
+            "data_file_size": self.data_file_size,
+            "data_checksum": self.data_checksum,
+            "steps": [step.to_dict() for step in self.steps],
+        }
+        return json.dumps(data, indent=2)
+
+    @classmethod
+    def from_json(cls, json_str: str) -> CqlPlan:
+        """Make plan from its JSON representation.
+
+        Parameters
+        ----------
+        json_str : `str`
+            JSON string produced by `to_json`.
+
+        Returns
+        -------
+        plan : `CqlPlan`
+            Plan instance.
+        """
+        data = json.loads(json_str)
+        return cls(
+            keyspace=data["keyspace"],
+            versions=data["versions"],
+            steps=[PlanStep.from_dict(step) for step in data["steps"]],
+            data_path=data["data_path"],
+            data_file_size=data.get("data_file_size"),
+            data_checksum=data.get("data_checksum"),
+        )
+
+    @classmethod
+    def read(cls, path: str) -> CqlPlan:
+        """Read plan from a JSON file.
+
+        Parameters
+        ----------
+        path : `str`
+            Name of the plan JSON file.
+
+        Returns
+        -------
+        plan : `CqlPlan`
+            Plan instance, its ``data_path`` is resolved relative to the
+            directory of the plan file.
+        """
+        with open(path) as file:
+            plan = cls.from_json(file.read())
+        if plan.data_path is not None:
+            plan.data_path = os.path.join(os.path.dirname(path), plan.data_path)
+        return plan
+
+    def check_data(self) -> None:
+        """Check that data file matches the plan.
+
+        Raises
+        ------
+        ValueError
+            Raised if data file is missing, or its size or checksum is
+            different from the values recorded in the plan.
+        """
+        if self.data_path is None:
+            return
+        if not os.path.exists(self.data_path):
+            raise ValueError(f"Plan data file {self.data_path} does not exist.")
+        if (
+            self.data_file_size is not None
+            and (size := os.path.getsize(self.data_path)) != self.data_file_size
+        ):
+            raise ValueError(
+                f"Size of plan data file {self.data_path} is {size}, plan expects {self.data_file_size}."
+            )
+        if self.data_checksum is not None:
+            checksum = hashlib.sha256()
+            with open(self.data_path, "rb") as file:
+                while chunk := file.read(1 << 20):
+                    checksum.update(chunk)
+            if checksum.hexdigest() != self.data_checksum:
+                raise ValueError(f"Checksum of plan data file {self.data_path} does not match the plan.")
+
+    def summary(self) -> list[str]:
+        """Return human-readable summary of the plan.
+
+        Returns
+        -------
+        lines : `list` [`str`]
+            One line for each step.
+        """
+        lines = []
+        for step in self.steps:
+            if step.kind == "cql":
+                lines.append(step.query)
+            else:
+                lines.append(f"-- {step.rows} rows in {step.partitions} partitions: {step.query}")
+        return lines
+
+    def read_rows(self, step: PlanStep) -> Iterator[list[Any]]:
+        """Return serialized parameters of a write step.
+
+        Parameters
+        ----------
+        step : `PlanStep`
+            Write step of this plan.
+
+        Returns
+        -------
+        rows : `~collections.abc.Iterator` [`list`]
+            Serialized parameter values for each statement.
+        """
+        if step.data_offset is None or self.data_path is None:
+            raise ValueError(f"Plan does not include parameters for query: {step.query}")
+        with open(self.data_path, "rb") as file:
+            file.seek(step.data_offset)
+            yield from _read_rows(file, step.rows)
+
+
+class CqlPlanWriter:
+    """Collects queries executed in dry run mode into a plan.
+
+    Parameters
+    ----------
+    path : `str`
+        Name of the output JSON file.
+    keyspace : `str`
+        Name of the keyspace.
+    versions : `dict` [`str`, `str`]
+        Current versions of all trees.
+    data_path : `str`, optional
+        Name of the data file for serialized parameters of write statements,
+        if not specified parameters are not saved and plan cannot be applied
+        if it contains write steps. Plan stores it relative to the directory
+        of the plan file.
+
+    Notes
+    -----
+    Consecutive writes using the same statement are merged into a single
+    step, this reduces size of the plan to a small number of steps even when
+    millions of statements are executed.
+    """
+
+    def __init__(self, path: str, keyspace: str, versions: dict[str, str], data_path: str | None = None):
+        self._path = path
+        relative_data_path = None
+        if data_path:
+            relative_data_path = os.path.relpath(data_path, os.path.dirname(os.path.abspath(path)))
+        self.plan = CqlPlan(keyspace=keyspace, versions=versions, data_path=relative_data_path)
+        self._data_file: BinaryIO | None = open(data_path, "wb") if data_path else None
+        self._data_offset = 0
+        self._checksum = hashlib.sha256()
+        # Routing keys of the current write step.
+        self._partitions: set[tuple] = set()
+
+    def __enter__(self) -> CqlPlanWriter:
+        return self
+
+    def __exit__(self, exc_type: type | None, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._data_file is not None:
+            # Incomplete plan is not saved.
+            self._data_file.close()
+
+    def add_statement(self, query: str, parameters: Sequence | None = None) -> None:
+        """Add a CQL statement to the plan.
+
+        Parameters
+        ----------
+        query : `str`
+            Query string.
+        parameters : `~collections.abc.Sequence`, optional
+            Query parameters, they must be JSON-serializable.
+        """
+        self.plan.steps.append(
+            PlanStep(kind="cql", query=query, parameters=list(parameters) if parameters is not None else None)
+        )
+
+    def add_writes(self, query: str, routing_key_indexes: Sequence[int] | None, rows: Iterable[list]) -> None:
+        """Add write statements to the plan.
+
+        Parameters
+        ----------
+        query : `str`
+            Query string of the prepared statement.
+        routing_key_indexes : `~collections.abc.Sequence` [`int`] or `None`
+            Indices of partition key columns in parameters.
+        rows : `~collections.abc.Iterable` [`list`]
+            Serialized parameter values for each statement.
+        """
+        steps = self.plan.steps
+        if not steps or steps[-1].kind != "write" or steps[-1].query != query:
+            steps.append(PlanStep(kind="write", query=query))
+            self._partitions = set()
+            if self._data_file is not None:
+                steps[-1].data_offset = self._data_offset
+        step = steps[-1]
+        for values in rows:
+            step.rows += 1
+            if routing_key_indexes:
+                self._partitions.add(tuple(values[index] for index in routing_key_indexes))
+            if self._data_file is not None:
+                data = _serialize_row(values)
+                self._data_file.write(data)
+                self._checksum.update(data)
+                step.data_size += len(data)
+                self._data_offset += len(data)
+        step.partitions = len(self._partitions)
+
+    def close(self) -> None:
+        """Write the plan to output file."""
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+            self.plan.data_file_size = self._data_offset
+            self.plan.data_checksum = self._checksum.hexdigest()
+        with open(self._path, "w") as file:
+            file.write(self.plan.to_json())
+            file.write("\n")
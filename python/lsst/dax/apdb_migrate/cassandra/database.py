@@ -24,19 +24,25 @@ from __future__ import annotations
 import logging
 from collections.abc import Iterator, Mapping
 from contextlib import contextmanager
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import cassandra.query
 import sqlalchemy
 from cassandra import ConsistencyLevel
 from cassandra.auth import AuthProvider, PlainTextAuthProvider
 from cassandra.cluster import EXEC_PROFILE_DEFAULT, Cluster, ExecutionProfile, Session
-from cassandra.policies import RoundRobinPolicy
+from cassandra.policies import LoadBalancingPolicy, RoundRobinPolicy, WhiteListRoundRobinPolicy
+from cassandra.query import PreparedStatement
 from lsst.utils.db_auth import DbAuth, DbAuthNotFoundError
 
 from .. import revision
 from .apdb_metadata import ApdbMetadata
 
+if TYPE_CHECKING:
+    from .cql_plan import CqlPlanWriter
+    from .estimates import CostRecorder
+    from .offline import OfflineSession
+
 _LOG = logging.getLogger(__name__)
 
 
@@ -64,11 +70,37 @@ class Database:
     metadata_table_name = "metadata"
     """Name of the metadata table holding versions."""
 
+    protocol_version = 5
+    """Version of the native protocol used by sessions (`int`)."""
+
+    offline = False
+    """True if database is simulated without a cluster, see
+    `OfflineDatabase`.
+    """
+
+    cost_recorder: CostRecorder | None = None
+    """Recorder for scanned and written tables used for cost estimation in
+    dry-run mode (`CostRecorder` or `None`).
+    """
+
+    cql_plan: CqlPlanWriter | None = None
+    """Writer for the plan of queries executed in dry-run mode
+    (`CqlPlanWriter` or `None`).
+    """
+
+    dry_run_schema: OfflineSession | None = None
+    """Simulated schema of the keyspace which includes changes made by
+    migrations executed in dry-run mode (`OfflineSession` or `None`).
+    """
+
     def __init__(self, host: str, keyspace: str, port: int | None = None, username: str | None = None):
         self._host = host
         self._keyspace = keyspace
         self._port = port if port is not None else 9042
         self._username = username
+        # Shared session and its prepared statements, see keep_session().
+        self._session: Session | None = None
+        self._prepared: dict[str, PreparedStatement] = {}
 
     @property
     def keyspace(self) -> str:
@@ -85,7 +117,7 @@ class Database:
             version string, and revision ID string/hash.
         """
         versions = {}
-        with self.make_session() as session:
+        with self.make_session(lightweight=True) as session:
             meta = ApdbMetadata(session, self._keyspace)
             for name, value in meta.items():
                 if name.startswith("version:") and value is not None:
@@ -100,14 +132,96 @@ class Database:
         return revisions
 
     @contextmanager
-    def make_session(self) -> Iterator[Session]:
-        """Make Cassandra session."""
+    def keep_session(self) -> Iterator[None]:
+        """Keep a single session open for the duration of the context.
+
+        Notes
+        -----
+        All calls to `make_session` inside this context return the same
+        session instead of connecting to a cluster each time. This is used to
+        avoid repeated cluster discovery when multiple migrations are executed
+        in one run. Prepared statements are cached for the lifetime of the
+        shared session.
+        """
+        if self._session is not None:
+            # Already shared by the outer context.
+            yield
+            return
+        with self._make_session() as session:
+            self._session = session
+            try:
+                yield
+            finally:
+                self._session = None
+                self._prepared.clear()
+
+    @contextmanager
+    def make_session(self, *, lightweight: bool = False) -> Iterator[Session]:
+        """Make Cassandra session, or return shared session if
+        `keep_session` context is active.
+
+        Parameters
+        ----------
+        lightweight : `bool`, optional
+            If `True` then make a session that is only suitable for a small
+            number of simple queries, see notes. Ignored if shared session
+            exists.
+
+        Notes
+        -----
+        Regular session discovers complete cluster topology, loads schema
+        metadata for all keyspaces, and opens connections to all nodes. This
+        takes significant time on large clusters. Lightweight session skips
+        loading of schema and token metadata, and only connects to the host
+        given in constructor. Client-side schema metadata is not used by
+        this package, schema is always read from ``system_schema`` tables.
+        """
+        if self._session is not None:
+            yield self._session
+        else:
+            with self._make_session(lightweight=lightweight) as session:
+                yield session
+
+    def prepare(self, session: Session, query: str) -> PreparedStatement:
+        """Prepare a statement, using cache if session is shared.
+
+        Parameters
+        ----------
+        session : `cassandra.cluster.Session`
+            Session returned from `make_session`.
+        query : `str`
+            Query string.
+
+        Returns
+        -------
+        statement : `cassandra.query.PreparedStatement`
+            Prepared statement.
+        """
+        shared = session is self._session
+        if not shared:
+            return session.prepare(query)
+        if (statement := self._prepared.get(query)) is None:
+            statement = session.prepare(query)
+            self._prepared[query] = statement
+        return statement
+
+    @contextmanager
+    def _make_session(self, *, lightweight: bool = False) -> Iterator[Session]:
+        """Make new Cassandra session."""
+        load_balancing_policy: LoadBalancingPolicy
+        if lightweight:
+            # Only query the contact host.
+            load_balancing_policy = WhiteListRoundRobinPolicy([self._host])
+        else:
+            load_balancing_policy = RoundRobinPolicy()
         cluster = Cluster(
-            execution_profiles=self._make_profiles(),
+            execution_profiles=self._make_profiles(load_balancing_policy),
             contact_points=[self._host],
             port=self._port,
             auth_provider=self._make_auth_provider(),
-            protocol_version=5,
+            protocol_version=self.protocol_version,
+            schema_metadata_enabled=not lightweight,
+            token_metadata_enabled=not lightweight,
         )
         try:
             session = cluster.connect()
@@ -125,8 +239,7 @@ class Database:
             cluster.shutdown()
             del cluster
 
-    def _make_profiles(self) -> Mapping[Any, ExecutionProfile]:
-        loadBalancePolicy = RoundRobinPolicy()
+    def _make_profiles(self, loadBalancePolicy: LoadBalancingPolicy) -> Mapping[Any, ExecutionProfile]:
         # Use a very long timeout just in case our queries are not efficient.
         default_profile = ExecutionProfile(
             consistency_level=ConsistencyLevel.LOCAL_QUORUM,
@@ -0,0 +1,194 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Schema change operations which are only executed if they are not applied
+yet.
+"""
+
+from __future__ import annotations
+
+__all__ = ["AddColumns", "CreateTable", "DdlOperation", "DropColumns", "DropTable"]
+
+import dataclasses
+from collections.abc import Mapping
+from typing import Protocol
+
+from .schema import Schema
+from .table_schema import TableSchema
+
+# Aliases for CQL types as they appear in system_schema.
+_TYPE_ALIASES = {"varchar": "text"}
+
+
+def _normalize_type(column_type: str) -> str:
+    column_type = column_type.lower()
+    return _TYPE_ALIASES.get(column_type, column_type)
+
+
+class DdlOperation(Protocol):
+    """Interface for schema change operations."""
+
+    @property
+    def table_name(self) -> str:
+        """Name of the table modified by this operation (`str`)."""
+        ...
+
+    def statement(self, schema: Schema, keyspace: str) -> str | None:
+        """Return DDL statement which brings schema to the desired state.
+
+        Parameters
+        ----------
+        schema : `Schema`
+            Current schema of the keyspace.
+        keyspace : `str`
+            Name of the keyspace.
+
+        Returns
+        -------
+        statement : `str` or `None`
+            DDL statement, or `None` if the change is already applied.
+
+        Raises
+        ------
+        ValueError
+            Raised if current schema conflicts with the desired change, e.g.
+            column exists but has a different type.
+        """
+        ...
+
+
+@dataclasses.dataclass
+class AddColumns:
+    """Operation adding columns to a table, only missing columns are added."""
+
+    table_name: str
+    """Name of the table (`str`)."""
+
+    columns: Mapping[str, str]
+    """Column types indexed by column name
+    (`~collections.abc.Mapping` [`str`, `str`]).
+    """
+
+    kept_types: Mapping[str, str] = dataclasses.field(default_factory=dict)
+    """Types of existing columns which are accepted instead of the types in
+    `columns`, used for type changes that cannot be applied in Cassandra
+    (`~collections.abc.Mapping` [`str`, `str`]).
+    """
+
+    def statement(self, schema: Schema, keyspace: str) -> str | None:
+        # Docstring inherited.
+        existing = {column.column_name: column for column in schema.table_columns(self.table_name)}
+        additions = []
+        for column_name, column_type in self.columns.items():
+            if (column := existing.get(column_name)) is None:
+                additions.append(f'"{column_name}" {column_type}')
+            elif _normalize_type(column.type) not in {
+                _normalize_type(column_type),
+                _normalize_type(self.kept_types.get(column_name, column_type)),
+            }:
+                raise ValueError(
+                    f"Column {column_name} already exists in table {self.table_name} with type "
+                    f"{column.type}, expected type {column_type}."
+                )
+        if not additions:
+            return None
+        return f'ALTER TABLE "{keyspace}"."{self.table_name}" ADD ({", ".join(additions)})'
+
+    def __str__(self) -> str:
+        return f"add {len(self.columns)} columns to table {self.table_name}"
+
+
+@dataclasses.dataclass
+class DropColumns:
+    """Operation dropping columns from a table, only existing columns are
+    dropped.
+    """
+
+    table_name: str
+    """Name of the table (`str`)."""
+
+    columns: list[str]
+    """Names of the columns to drop (`list` [`str`])."""
+
+    def statement(self, schema: Schema, keyspace: str) -> str | None:
+        # Docstring inherited.
+        existing = {column.column_name for column in schema.table_columns(self.table_name)}
+        drops = [f'"{column_name}"' for column_name in self.columns if column_name in existing]
+        if not drops:
+            return None
+        return f'ALTER TABLE "{keyspace}"."{self.table_name}" DROP ({", ".join(drops)})'
+
+    def __str__(self) -> str:
+        return f"drop {len(self.columns)} columns from table {self.table_name}"
+
+
+@dataclasses.dataclass
+class CreateTable:
+    """Operation creating a table if it does not exist."""
+
+    table_schema: TableSchema
+    """Schema of the table (`TableSchema`)."""
+
+    @property
+    def table_name(self) -> str:
+        """Name of the table (`str`)."""
+        return self.table_schema.table_name
+
+    def statement(self, schema: Schema, keyspace: str) -> str | None:
+        # Docstring inherited.
+        if schema.check_table(self.table_name):
+            # Only check primary key, other columns can be added later.
+            existing = [
+                column.column_name
+                for column in schema.table_columns(self.table_name)
+                if column.is_partitioning or column.is_clustering
+            ]
+            expected = [
+                column.column_name
+                for column in self.table_schema.partitioning_columns + self.table_schema.clustering_columns
+            ]
+            if existing != expected:
+                raise ValueError(
+                    f"Table {self.table_name} already exists with primary key {existing}, "
+                    f"expected primary key {expected}."
+                )
+            return None
+        return self.table_schema.make_ddl()
+
+    def __str__(self) -> str:
+        return f"create table {self.table_name}"
+
+
+@dataclasses.dataclass
+class DropTable:
+    """Operation dropping a table if it exists."""
+
+    table_name: str
+    """Name of the table (`str`)."""
+
+    def statement(self, schema: Schema, keyspace: str) -> str | None:
+        # Docstring inherited.
+        if not schema.check_table(self.table_name):
+            return None
+        return f'DROP TABLE "{keyspace}"."{self.table_name}"'
+
+    def __str__(self) -> str:
+        return f"drop table {self.table_name}"
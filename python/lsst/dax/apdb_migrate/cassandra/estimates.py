@@ -0,0 +1,376 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = [
+    "CostRecorder",
+    "RevisionCost",
+    "TableSample",
+    "TableSize",
+    "estimate_row_size",
+    "load_size_estimates",
+    "sample_table",
+]
+
+import dataclasses
+import logging
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from cassandra.concurrent import execute_concurrent_with_args
+
+from .table_schema import Column, TableSchema
+
+_LOG = logging.getLogger(__name__)
+
+# Size of the whole Murmur3 token ring and its minimum token.
+_TOKEN_RING_SIZE = 2**64
+_MIN_TOKEN = -(2**63)
+
+# Memory used per scanned value in bytes, this includes Python objects that
+# exist while building columnar snapshot and final numpy arrays.
+_SCAN_BYTES_PER_VALUE = 40
+
+# Approximate serialized sizes of CQL types in bytes, variable-length types
+# use typical APDB values.
+_TYPE_SIZES = {
+    "boolean": 1,
+    "tinyint": 1,
+    "smallint": 2,
+    "int": 4,
+    "float": 4,
+    "bigint": 8,
+    "double": 8,
+    "timestamp": 8,
+    "uuid": 16,
+    "timeuuid": 16,
+    "text": 16,
+    "varchar": 16,
+    "ascii": 16,
+    "blob": 64,
+}
+
+# Per-cell and per-row storage overhead in bytes, rough values for Cassandra
+# 4 storage format.
+_CELL_OVERHEAD = 2
+_ROW_OVERHEAD = 16
+
+
+@dataclasses.dataclass
+class TableSize:
+    """Estimated size of a table in the whole cluster."""
+
+    partitions: int
+    """Estimated number of partitions (`int`)."""
+
+    mean_partition_size: int
+    """Mean partition size in bytes (`int`)."""
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated total size of the table data in bytes (`int`)."""
+        return self.partitions * self.mean_partition_size
+
+    def estimate_rows(self, row_size: int) -> int:
+        """Return estimated number of rows in a table.
+
+        Parameters
+        ----------
+        row_size : `int`
+            Estimated size of a row in bytes, see `estimate_row_size`.
+        """
+        if row_size <= 0:
+            return 0
+        return max(self.total_bytes // row_size, self.partitions)
+
+
+def estimate_row_size(columns: Iterable[Column]) -> int:
+    """Return approximate size of a single row in bytes.
+
+    Parameters
+    ----------
+    columns : `~collections.abc.Iterable` [`Column`]
+        Table columns. Partitioning columns are stored once per partition and
+        are not included in a row size.
+    """
+    size = _ROW_OVERHEAD
+    for column in columns:
+        if not column.is_partitioning:
+            size += _TYPE_SIZES.get(column.type.lower(), 8) + _CELL_OVERHEAD
+    return size
+
+
+def load_size_estimates(session: Any, keyspace: str) -> dict[str, TableSize]:
+    """Load size estimates for all tables in a keyspace.
+
+    Parameters
+    ----------
+    session : `cassandra.cluster.Session`
+        Database session.
+    keyspace : `str`
+        Name of the keyspace.
+
+    Returns
+    -------
+    sizes : `dict` [`str`, `TableSize`]
+        Estimated sizes indexed by table name, tables without estimates are
+        not included.
+
+    Notes
+    -----
+    ``system.size_estimates`` table is local to each node and only covers
+    token ranges for which the node is a primary replica. Estimates are
+    extrapolated to the whole token ring using the fraction of the ring
+    covered by the returned ranges.
+    """
+    query = (
+        "SELECT table_name, range_start, range_end, partitions_count, mean_partition_size "
+        "FROM system.size_estimates WHERE keyspace_name = %s"
+    )
+    # Table name mapped to (covered token range, partitions, bytes).
+    totals: dict[str, list[int]] = {}
+    for table_name, range_start, range_end, partitions, mean_size in session.execute(query, (keyspace,)):
+        width = (int(range_end) - int(range_start)) % _TOKEN_RING_SIZE
+        total = totals.setdefault(table_name, [0, 0, 0])
+        total[0] += width
+        total[1] += partitions
+        total[2] += partitions * mean_size
+
+    sizes: dict[str, TableSize] = {}
+    for table_name, (width, partitions, total_bytes) in totals.items():
+        if width == 0 or partitions == 0:
+            continue
+        scale = _TOKEN_RING_SIZE / width
+        sizes[table_name] = TableSize(
+            partitions=round(partitions * scale), mean_partition_size=total_bytes // partitions
+        )
+    return sizes
+
+
+@dataclasses.dataclass
+class TableSample:
+    """Result of reading a sample of table token ranges."""
+
+    rows: int
+    """Number of rows in the sample (`int`)."""
+
+    fraction: float
+    """Fraction of the token ring covered by the sample (`float`)."""
+
+    seconds: float
+    """Time spent reading the sample (`float`)."""
+
+    @property
+    def estimated_rows(self) -> int:
+        """Estimated number of rows in the whole table (`int`)."""
+        return round(self.rows / self.fraction)
+
+    @property
+    def read_rate(self) -> float | None:
+        """Measured read rate in rows per second, `None` if the sample is
+        empty (`float` or `None`).
+        """
+        if self.rows == 0 or self.seconds <= 0:
+            return None
+        return self.rows / self.seconds
+
+
+def sample_table(
+    session: Any,
+    keyspace: str,
+    table_name: str,
+    partition_key: list[str],
+    *,
+    fraction: float = 1 / 256,
+    ranges: int = 16,
+    concurrency: int = 16,
+) -> TableSample:
+    """Read all rows from a sample of token ranges of a table.
+
+    Parameters
+    ----------
+    session : `cassandra.cluster.Session`
+        Database session.
+    keyspace : `str`
+        Name of the keyspace.
+    table_name : `str`
+        Name of the table.
+    partition_key : `list` [`str`]
+        Names of the partition key columns.
+    fraction : `float`, optional
+        Fraction of the token ring to read.
+    ranges : `int`, optional
+        Number of token ranges, evenly spread over the ring.
+    concurrency : `int`, optional
+        Number of concurrent queries, same as used by full table scans.
+
+    Returns
+    -------
+    sample : `TableSample`
+        Number of rows in the sample and time it took to read them.
+    """
+    key = ", ".join(f'"{column}"' for column in partition_key)
+    query = f'SELECT * FROM "{keyspace}"."{table_name}" WHERE token({key}) >= ? AND token({key}) <= ?'
+    statement = session.prepare(query)
+    width = max(int(_TOKEN_RING_SIZE * fraction / ranges), 1)
+    stride = _TOKEN_RING_SIZE // ranges
+    params = [(_MIN_TOKEN + i * stride, _MIN_TOKEN + i * stride + width - 1) for i in range(ranges)]
+
+    start_time = time.time()
+    results = execute_concurrent_with_args(
+        session, statement, params, concurrency=concurrency, execution_profile="read_tuples"
+    )
+    rows = sum(sum(1 for _ in result.result_or_exc) for result in results)
+    seconds = time.time() - start_time
+    return TableSample(rows=rows, fraction=width * ranges / _TOKEN_RING_SIZE, seconds=seconds)
+
+
+@dataclasses.dataclass
+class RevisionCost:
+    """Tables scanned and written by a single revision."""
+
+    revision: str | None = None
+    """Revision name, `None` if revision did not finish (`str` or `None`)."""
+
+    scans: dict[str, int] = dataclasses.field(default_factory=dict)
+    """Number of selected columns for each scanned table
+    (`dict` [`str`, `int`]).
+    """
+
+    writes: set[str] = dataclasses.field(default_factory=set)
+    """Names of the tables that are written (`set` [`str`])."""
+
+
+class CostRecorder:
+    """Collects information about scanned and written tables during dry run
+    and estimates cost of the real migration.
+    """
+
+    def __init__(self) -> None:
+        self.revisions: list[RevisionCost] = [RevisionCost()]
+
+    def record_scan(self, table_name: str, num_columns: int) -> None:
+        """Record a full table scan.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        num_columns : `int`
+            Number of selected columns.
+        """
+        scans = self.revisions[-1].scans
+        scans[table_name] = max(scans.get(table_name, 0), num_columns)
+
+    def record_write(self, table_name: str) -> None:
+        """Record a table that is written by current revision.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        """
+        self.revisions[-1].writes.add(table_name)
+
+    def finish_revision(self, revision: str) -> None:
+        """Mark the end of current revision.
+
+        Parameters
+        ----------
+        revision : `str`
+            Revision name.
+        """
+        self.revisions[-1].revision = revision
+        self.revisions.append(RevisionCost())
+
+    def report(self, session: Any, keyspace: str, *, write_rate: float) -> list[str]:
+        """Estimate duration and memory use of each recorded revision.
+
+        Parameters
+        ----------
+        session : `cassandra.cluster.Session`
+            Database session.
+        keyspace : `str`
+            Name of the keyspace.
+        write_rate : `float`
+            Expected write rate in rows per second.
+
+        Returns
+        -------
+        lines : `list` [`str`]
+            Human-readable report.
+
+        Notes
+        -----
+        Number of rows and read rate for each scanned table are measured by
+        reading a sample of its token ranges. Number of rows written by a
+        revision cannot be known without data, it is estimated by the size of
+        the largest table scanned by the same revision. Memory estimate
+        assumes that all scanned tables are kept in memory at the same time.
+        """
+        tables = TableSchema.from_keyspace(session, keyspace)
+        sizes = load_size_estimates(session, keyspace)
+        samples: dict[str, TableSample] = {}
+        lines: list[str] = []
+        for cost in self.revisions:
+            if not (cost.scans or cost.writes):
+                continue
+            duration = 0.0
+            memory = 0
+            details = []
+            for table_name, num_columns in sorted(cost.scans.items()):
+                if table_name not in samples:
+                    if table_name not in tables:
+                        # Table was dropped by a later revision.
+                        details.append(f"  scan {table_name}: table does not exist, not estimated")
+                        continue
+                    _LOG.info("Sampling table %s", table_name)
+                    partition_key = [column.column_name for column in tables[table_name].partitioning_columns]
+                    samples[table_name] = sample_table(session, keyspace, table_name, partition_key)
+                sample = samples[table_name]
+                rows = sample.estimated_rows
+                memory += rows * num_columns * _SCAN_BYTES_PER_VALUE
+                scan = f"  scan {table_name}: ~{rows} rows"
+                if table_name in sizes:
+                    scan += f" in ~{sizes[table_name].partitions} partitions"
+                if (read_rate := sample.read_rate) is not None:
+                    seconds = rows / read_rate
+                    duration += seconds
+                    scan += f", ~{seconds:.0f} s at {read_rate:.0f} rows/s"
+                details.append(scan)
+            max_rows = max(
+                (samples[name].estimated_rows for name in cost.scans if name in samples), default=0
+            )
+            for table_name in sorted(cost.writes):
+                seconds = max_rows / write_rate
+                duration += seconds
+                details.append(
+                    f"  write {table_name}: up to ~{max_rows} rows, "
+                    f"~{seconds:.0f} s at {write_rate:.0f} rows/s"
+                )
+            lines.append(
+                f"Revision {cost.revision or '(not completed)'}: estimated duration {duration / 60:.1f} min, "
+                f"peak memory {memory / 2**30:.2f} GiB"
+            )
+            lines += details
+        return lines
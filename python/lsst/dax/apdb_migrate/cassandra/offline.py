@@ -0,0 +1,386 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Simulation of Cassandra database for offline planning of migrations."""
+
+from __future__ import annotations
+
+__all__ = ["OfflineDatabase", "OfflineSession", "OfflineStep"]
+
+import collections
+import concurrent.futures
+import copy
+import dataclasses
+import logging
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import cassandra.query
+from cassandra import InvalidRequest
+
+from .database import Database
+from .schema_snapshot import SchemaSnapshot
+from .table_schema import Column, TableSchema
+
+_LOG = logging.getLogger(__name__)
+
+# Regular expression for quoted or unquoted identifier.
+_ID = r'(?:"[^"]+"|\w+)'
+
+_DDL_RE = re.compile(
+    rf"\s*(?P<verb>CREATE|ALTER|DROP)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?:{_ID}\s*\.\s*)?"
+    rf"(?P<table>{_ID})\s*(?P<rest>.*)",
+    re.IGNORECASE | re.DOTALL,
+)
+_ALTER_RE = re.compile(r"(?P<op>ADD|DROP)\s*(?P<columns>.*)", re.IGNORECASE | re.DOTALL)
+_SELECT_RE = re.compile(
+    rf"\s*SELECT\s.*?\sFROM\s+(?:(?P<keyspace>{_ID})\s*\.\s*)?(?P<table>{_ID})", re.I | re.S
+)
+_WRITE_RE = re.compile(
+    rf"\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+(?:.*?\s)?FROM)\s+(?:{_ID}\s*\.\s*)?(?P<table>{_ID})", re.I | re.S
+)
+
+
+def _unquote(name: str) -> str:
+    """Return identifier name, unquoted identifiers are case-insensitive."""
+    if name.startswith('"'):
+        return name[1:-1]
+    return name.lower()
+
+
+def _split_top_level(text: str) -> list[str]:
+    """Split text on commas which are not enclosed in parentheses."""
+    items = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char in "(<":
+            depth += 1
+        elif char in ")>":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(text[start:i].strip())
+            start = i + 1
+    items.append(text[start:].strip())
+    return [item for item in items if item]
+
+
+def _enclosed(text: str) -> tuple[str, str]:
+    """Return contents of the leading parenthesized group and the rest."""
+    text = text.strip()
+    assert text.startswith("("), "Expected parenthesized expression"
+    depth = 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return text[1:i], text[i + 1 :]
+    raise ValueError(f"Unbalanced parentheses in: {text}")
+
+
+@dataclasses.dataclass
+class OfflineStep:
+    """Record of operations executed by a single migration step."""
+
+    revision: str | None = None
+    """Revision that was applied by this step, `None` if step did not finish
+    (`str` or `None`).
+    """
+
+    ddl: list[str] = dataclasses.field(default_factory=list)
+    """DDL statements executed by this step (`list` [`str`])."""
+
+    scans: collections.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+    """Number of queries executed for each scanned table
+    (`collections.Counter` [`str`]).
+    """
+
+    writes: collections.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+    """Number of write statements executed for each table
+    (`collections.Counter` [`str`]).
+    """
+
+    prepared_writes: set[str] = dataclasses.field(default_factory=set)
+    """Tables for which write statements were prepared (`set` [`str`]).
+    Without data in offline mode these statements are usually not executed,
+    but the real migration will execute them for every selected row.
+    """
+
+
+class _OfflineFuture:
+    """Minimal implementation of `cassandra.cluster.ResponseFuture` which is
+    sufficient for `cassandra.concurrent` functions.
+    """
+
+    has_more_pages = False
+    _col_names = None
+    _col_types = None
+
+    def __init__(self, rows: list, executor: concurrent.futures.Executor):
+        self._rows = rows
+        self._executor = executor
+
+    def add_callbacks(
+        self,
+        callback: Any,
+        errback: Any,
+        callback_args: tuple = (),
+        callback_kwargs: dict | None = None,
+        errback_args: tuple = (),
+        errback_kwargs: dict | None = None,
+    ) -> None:
+        # Callbacks are called asynchronously, like real driver does.
+        self._executor.submit(callback, self._rows, *callback_args, **(callback_kwargs or {}))
+
+    def clear_callbacks(self) -> None:
+        pass
+
+    def result(self) -> list:
+        return self._rows
+
+
+class OfflineSession:
+    """Replacement for Cassandra session which simulates the database using
+    a schema snapshot.
+
+    Parameters
+    ----------
+    snapshot : `SchemaSnapshot`
+        Snapshot of the keyspace, it is not modified.
+
+    Notes
+    -----
+    Schema changes and metadata updates are applied to a copy of the snapshot,
+    so that subsequent migrations see the results of previous ones. Tables
+    have no data, all data queries return empty results. Executed queries are
+    recorded in a sequence of `OfflineStep` instances, a new step starts after
+    a version is updated in the metadata table.
+    """
+
+    def __init__(self, snapshot: SchemaSnapshot):
+        self.snapshot = copy.deepcopy(snapshot)
+        self.steps: list[OfflineStep] = [OfflineStep()]
+        # Used by cassandra.concurrent to limit recursion depth.
+        self._executor = concurrent.futures.ThreadPoolExecutor(1)
+
+    @property
+    def _step(self) -> OfflineStep:
+        return self.steps[-1]
+
+    def prepare(self, query: str) -> cassandra.query.SimpleStatement:
+        """Return a statement that can be executed by this session, and
+        used with `cassandra.query.BatchStatement`.
+        """
+        if (match := _WRITE_RE.match(query)) is not None:
+            self._step.prepared_writes.add(_unquote(match.group("table")))
+        return cassandra.query.SimpleStatement(query.replace("?", "%s"))
+
+    def submit(self, fn: Any, *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def execute_async(self, query: Any, parameters: Any = None, *args: Any, **kwargs: Any) -> _OfflineFuture:
+        return _OfflineFuture(self.execute(query, parameters), self._executor)
+
+    def execute(self, query: Any, parameters: Any = None, *args: Any, **kwargs: Any) -> list:
+        if isinstance(query, cassandra.query.BatchStatement):
+            for _, statement, _ in query._statements_and_parameters:
+                self._write(statement)
+            return []
+        if isinstance(query, cassandra.query.Statement):
+            query = query.query_string
+        return self._execute(query, parameters)
+
+    def _execute(self, query: str, parameters: Any) -> list:
+        if "system_schema.columns" in query:
+            return self._columns(parameters)
+        elif "system_schema.tables" in query:
+            return self._tables(parameters)
+        elif "system.size_estimates" in query or "system_views." in query:
+            return []
+        elif (match := _DDL_RE.match(query)) is not None:
+            self._ddl(query, match)
+            self._step.ddl.append(query.strip())
+            return []
+        elif (match := _SELECT_RE.match(query)) is not None:
+            table_name = _unquote(match.group("table"))
+            if table_name == "metadata":
+                return self._select_metadata(query, parameters)
+            self._step.scans[table_name] += 1
+            return []
+        elif _WRITE_RE.match(query) is not None:
+            self._write(query, parameters)
+            return []
+        raise ValueError(f"Query is not supported in offline mode: {query}")
+
+    def _columns(self, parameters: Any) -> list:
+        """Return rows from system_schema.columns."""
+        table_names = [parameters[1]] if len(parameters) > 1 else list(self.snapshot.tables)
+        return [
+            (
+                table_name,
+                column.column_name,
+                column.type,
+                column.kind,
+                column.position,
+                column.clustering_order,
+            )
+            for table_name in table_names
+            if (table := self.snapshot.tables.get(table_name)) is not None
+            for column in table.columns
+        ]
+
+    def _tables(self, parameters: Any) -> list:
+        """Return rows from system_schema.tables."""
+        table_names = [parameters[1]] if len(parameters) > 1 else list(self.snapshot.tables)
+        rows = []
+        for table_name in table_names:
+            if (table := self.snapshot.tables.get(table_name)) is None:
+                continue
+            values = dict(keyspace_name=self.snapshot.keyspace, table_name=table_name, **table.table_options)
+            row_type = collections.namedtuple("Row", list(values))  # type: ignore[misc]
+            rows.append(row_type(**values))
+        return rows
+
+    def _select_metadata(self, query: str, parameters: Any) -> list:
+        """Return rows from metadata table."""
+        metadata = self.snapshot.metadata
+        if len(parameters) > 1:
+            value = metadata.get(parameters[1])
+            return [] if value is None else [(value,)]
+        return list(metadata.items())
+
+    def _write(self, query: str, parameters: Any = None) -> None:
+        """Record or apply write query."""
+        match = _WRITE_RE.match(query)
+        if match is None:
+            raise ValueError(f"Unexpected statement in a batch: {query}")
+        table_name = _unquote(match.group("table"))
+        if table_name != "metadata":
+            self._step.writes[table_name] += 1
+            return
+        if query.lstrip().upper().startswith("INSERT"):
+            _, name, value = parameters
+            self.snapshot.metadata[name] = value
+            if name.startswith("version:"):
+                # Version update finishes a migration step.
+                self._step.revision = f"{name.partition(':')[2]}_{value}"
+                self.steps.append(OfflineStep())
+        else:
+            self.snapshot.metadata.pop(parameters[1], None)
+
+    def _ddl(self, query: str, match: re.Match) -> None:
+        """Apply DDL statement to the snapshot."""
+        table_name = _unquote(match.group("table"))
+        verb = match.group("verb").upper()
+        tables = self.snapshot.tables
+        if verb == "CREATE":
+            if table_name not in tables:
+                tables[table_name] = self._parse_create(table_name, match.group("rest"))
+            elif not re.search(r"IF\s+NOT\s+EXISTS", query, re.IGNORECASE):
+                raise InvalidRequest(f"Table {table_name} already exists")
+            return
+        if table_name not in tables:
+            if verb == "DROP" and re.search(r"IF\s+EXISTS", query, re.IGNORECASE):
+                return
+            raise InvalidRequest(f"Table {table_name} does not exist")
+        if verb == "DROP":
+            del tables[table_name]
+        elif (alter := _ALTER_RE.match(match.group("rest"))) is not None:
+            table = tables[table_name]
+            existing = {column.column_name for column in table.columns}
+            columns_str = alter.group("columns").strip()
+            if columns_str.startswith("("):
+                columns_str, _ = _enclosed(columns_str)
+            if alter.group("op").upper() == "ADD":
+                for column_def in _split_top_level(columns_str):
+                    name, _, column_type = column_def.partition(" ")
+                    if _unquote(name) in existing:
+                        raise InvalidRequest(f"Column {name} already exists in table {table_name}")
+                    table.columns.append(Column(_unquote(name), column_type.strip().lower(), "regular"))
+            else:
+                drops = {_unquote(name) for name in _split_top_level(columns_str)}
+                if missing := drops - existing:
+                    raise InvalidRequest(f"Columns {sorted(missing)} do not exist in table {table_name}")
+                table.columns = [column for column in table.columns if column.column_name not in drops]
+
+    def _parse_create(self, table_name: str, definition: str) -> TableSchema:
+        """Make table schema from CREATE TABLE statement."""
+        body, rest = _enclosed(definition)
+        columns: dict[str, Column] = {}
+        key: list[str] = []
+        for item in _split_top_level(body):
+            if item.upper().startswith("PRIMARY KEY"):
+                key_str, _ = _enclosed(item[len("PRIMARY KEY") :])
+                key = _split_top_level(key_str)
+                continue
+            name, _, column_type = item.partition(" ")
+            column_type = column_type.strip()
+            if column_type.upper().endswith("PRIMARY KEY"):
+                column_type = column_type[: -len("PRIMARY KEY")].strip()
+                key = [name]
+            columns[_unquote(name)] = Column(_unquote(name), column_type.lower(), "regular")
+
+        if key:
+            partition_key = _split_top_level(_enclosed(key[0])[0]) if key[0].startswith("(") else key[:1]
+            for position, name in enumerate(partition_key):
+                columns[_unquote(name)].kind = "partition_key"
+                columns[_unquote(name)].position = position
+            for position, name in enumerate(key[1:]):
+                columns[_unquote(name)].kind = "clustering"
+                columns[_unquote(name)].position = position
+                columns[_unquote(name)].clustering_order = "asc"
+        if (
+            order := re.search(r"CLUSTERING\s+ORDER\s+BY\s*(\(.*)", rest, re.IGNORECASE | re.DOTALL)
+        ) is not None:
+            for item in _split_top_level(_enclosed(order.group(1))[0]):
+                name, _, direction = item.partition(" ")
+                columns[_unquote(name)].clustering_order = direction.strip().lower()
+
+        table_columns = list(columns.values())
+        Column.order_columns(table_columns)
+        return TableSchema(
+            keyspace=self.snapshot.keyspace, table_name=table_name, columns=table_columns, table_options={}
+        )
+
+
+class OfflineDatabase(Database):
+    """Database which is simulated by a schema snapshot.
+
+    Parameters
+    ----------
+    snapshot : `SchemaSnapshot`
+        Snapshot of the keyspace.
+    """
+
+    offline = True
+
+    def __init__(self, snapshot: SchemaSnapshot):
+        super().__init__("offline", snapshot.keyspace)
+        self.session = OfflineSession(snapshot)
+
+    @contextmanager
+    def _make_session(self, *, lightweight: bool = False) -> Iterator[Any]:
+        # Docstring inherited.
+        yield self.session
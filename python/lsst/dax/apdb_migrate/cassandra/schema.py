@@ -23,7 +23,35 @@ from __future__ import annotations
 
 __all__ = ["Schema"]
 
-from typing import Any, Protocol
+import dataclasses
+import itertools
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING, Any, Protocol, cast
+
+from cassandra.concurrent import execute_concurrent_with_args
+
+from .apdb_metadata import ApdbMetadata
+from .table_schema import Column
+
+if TYPE_CHECKING:
+    from .estimates import CostRecorder
+
+_LOG = logging.getLogger(__name__)
+
+# Ranges of pixel indices for each supported pixelization type, as a function
+# of pixelization level.
+_PIXEL_RANGES = {
+    "htm": lambda level: range(8 << 2 * level, 16 << 2 * level),
+    "q3c": lambda level: range(0, 6 << 2 * level),
+    "mq3c": lambda level: range(10 << 2 * level, 16 << 2 * level),
+}
+
+# Range of tokens for Murmur3Partitioner.
+_MIN_TOKEN = -(2**63)
+_MAX_TOKEN = 2**63 - 1
 
 
 class Session(Protocol):
@@ -33,9 +61,11 @@ class Session(Protocol):
 
     def execute(self, query: Any, parameters: Any) -> Any: ...
 
+    def prepare(self, query: str) -> Any: ...
+
 
 class Schema:
-    """Class with methods for schema inspection.
+    """Class with methods for schema inspection and table scans.
 
     Parameters
     ----------
@@ -45,12 +75,107 @@ class Schema:
         Name of Cassandra keyspace containing metadata table.
     apdb_config : `dict`
         Frozen part of APDB config from metadata.
+    cost_recorder : `CostRecorder`, optional
+        If specified, all table scans are recorded for cost estimation.
+
+    Notes
+    -----
+    Definitions of all tables in a keyspace are loaded with a single query on
+    first use and are cached. Code that modifies tables has to call `refresh`
+    after executing DDL, `Context.update` does that automatically.
     """
 
-    def __init__(self, session: Session, keyspace: str, apdb_config: dict[str, Any]):
+    _columns_query = (
+        "SELECT table_name, column_name, type, kind, position, clustering_order "
+        "FROM system_schema.columns WHERE keyspace_name = %s"
+    )
+
+    def __init__(
+        self,
+        session: Session,
+        keyspace: str,
+        apdb_config: dict[str, Any],
+        *,
+        cost_recorder: CostRecorder | None = None,
+    ):
         self._session = session
         self._keyspace = keyspace
         self._config = apdb_config
+        self._cost_recorder = cost_recorder
+        # Table name mapped to a list of its columns.
+        self._tables: dict[str, list[Column]] | None = None
+        # Table names indexed by schema kind and partition number, partition
+        # is None for non-partitioned tables.
+        self._by_kind: dict[str, dict[int | None, str]] | None = None
+
+    def _load(self) -> dict[str, list[Column]]:
+        """Return cached table definitions, loading them if needed."""
+        if self._tables is None:
+            tables: dict[str, list[Column]] = defaultdict(list)
+            for row in self._session.execute(self._columns_query, (self._keyspace,)):
+                tables[row[0]].append(Column(*row[1:]))
+            for columns in tables.values():
+                Column.order_columns(columns)
+            self._tables = dict(tables)
+            self._by_kind = None
+        return self._tables
+
+    def _index(self) -> dict[str, dict[int | None, str]]:
+        """Return tables indexed by schema kind and partition."""
+        if self._by_kind is None:
+            by_kind: dict[str, dict[int | None, str]] = defaultdict(dict)
+            for table in self._load():
+                kind, _, part = table.partition("_")
+                if part.isdigit():
+                    by_kind[kind][int(part)] = table
+                else:
+                    by_kind[table][None] = table
+            self._by_kind = dict(by_kind)
+        return self._by_kind
+
+    def refresh(self, table_name: str | None = None) -> None:
+        """Refresh cached definition of a table after executing DDL.
+
+        Parameters
+        ----------
+        table_name : `str`, optional
+            Name of the table that was created, altered, or dropped. If `None`
+            then all cached definitions are discarded.
+        """
+        if table_name is None or self._tables is None:
+            self._tables = None
+        else:
+            query = self._columns_query + " AND table_name = %s"
+            columns = [Column(*row[1:]) for row in self._session.execute(query, (self._keyspace, table_name))]
+            if columns:
+                Column.order_columns(columns)
+                self._tables[table_name] = columns
+            else:
+                self._tables.pop(table_name, None)
+        self._by_kind = None
+
+    def table_columns(self, table_name: str) -> list[Column]:
+        """Return definitions of all columns in a table.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+
+        Returns
+        -------
+        columns : `list` [`Column`]
+            Copies of column definitions, ordered by their kind and position.
+
+        Raises
+        ------
+        LookupError
+            Raised if table does not exist.
+        """
+        columns = self._load().get(table_name)
+        if columns is None:
+            raise LookupError(f"Table {table_name} does not exist in keyspace {self._keyspace}.")
+        return [dataclasses.replace(column) for column in columns]
 
     @property
     def _has_replicas(self) -> bool:
@@ -68,9 +193,7 @@ class Schema:
         items : `list` [`str`]
             List of table names.
         """
-        query = "SELECT table_name FROM system_schema.tables WHERE keyspace_name = %s"
-        result = self._session.execute(query, (self._keyspace,))
-        return [row[0] for row in result.all()]
+        return list(self._load())
 
     def check_table(self, table_name: str) -> bool:
         """Check whether a table exists.
@@ -85,9 +208,7 @@ class Schema:
         exists : `bool`
             True returned if table exists.
         """
-        query = "SELECT table_name FROM system_schema.tables WHERE keyspace_name = %s AND table_name = %s"
-        result = self._session.execute(query, (self._keyspace, table_name))
-        return result.one() is not None
+        return table_name in self._load()
 
     def tables_for_schema(
         self, schema_kind: str, *, include_replica: bool = True, include_obj_last: bool = False
@@ -114,7 +235,7 @@ class Schema:
         has_replicas = self._has_replicas
         has_partitioned_tables = self._has_partitioned_tables
 
-        all_tables = set(self.all_tables())
+        all_tables = self._load()
         check_tables = []
         check_partitions = False
         if schema_kind in ("DiaObject", "DiaSource", "DiaForcedSource"):
@@ -130,10 +251,7 @@ class Schema:
 
         result = [table for table in check_tables if table in all_tables]
         if check_partitions:
-            for table in all_tables:
-                kind, _, part = table.partition("_")
-                if kind == schema_kind and part.isdigit():
-                    result.append(table)
+            result += self.partitioned_tables(schema_kind)
 
         return result
 
@@ -154,14 +272,8 @@ class Schema:
         if not self._has_partitioned_tables:
             return []
 
-        all_tables = set(self.all_tables())
-        result = []
-        for table in all_tables:
-            kind, _, part = table.partition("_")
-            if kind == table_name and part.isdigit():
-                result.append(table)
-
-        return result
+        tables = self._index().get(table_name, {})
+        return [tables[part] for part in sorted(part for part in tables if part is not None)]
 
     def replica_tables(self, table_name: str) -> list[str]:
         """Return list of replica tables for given table name.
@@ -182,6 +294,208 @@ class Schema:
         if not self._has_replicas:
             return []
 
-        all_tables = set(self.all_tables())
+        all_tables = self._load()
         check_tables = [f"{table_name}Chunks", f"{table_name}Chunks2"]
         return [table for table in check_tables if table in all_tables]
+
+    def partition_key(self, table_name: str) -> list[str]:
+        """Return names of the partition key columns of a table.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+
+        Returns
+        -------
+        columns : `list` [`str`]
+            Names of the partition key columns in the order of their position.
+        """
+        columns = self._load().get(table_name, [])
+        # Columns are already ordered by position.
+        return [column.column_name for column in columns if column.is_partitioning]
+
+    def partition_values(
+        self,
+        table_name: str,
+        *,
+        time_partitions: Iterable[int] | None = None,
+        max_count: int | None = None,
+    ) -> list[tuple] | None:
+        """Enumerate all possible values of partition key of a table.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        time_partitions : `~collections.abc.Iterable` [`int`], optional
+            Time partitions to include for tables with ``apdb_time_part``
+            column in partition key, by default the range of partitions from
+            metadata is used.
+        max_count : `int`, optional
+            Maximum number of partitions to return, `None` is returned if
+            the number of partitions exceeds this number.
+
+        Returns
+        -------
+        values : `list` [`tuple`] or `None`
+            Values of partition key columns, one tuple per partition, in the
+            order of columns returned from `partition_key`. `None` is returned
+            if values of some partition column cannot be enumerated.
+
+        Notes
+        -----
+        Values are enumerated using the frozen APDB configuration (spatial
+        pixelization and number of replica sub-chunks) and metadata (range of
+        time partitions and replica chunks). Some of the enumerated partitions
+        may not exist in the table.
+        """
+        column_values: list[Sequence] = []
+        count = 1
+        for column in self.partition_key(table_name):
+            values = self._partition_column_values(column, time_partitions)
+            if values is None:
+                return None
+            count *= len(values)
+            if max_count is not None and count > max_count:
+                return None
+            column_values.append(values)
+        return list(itertools.product(*column_values))
+
+    def time_partition_range(self) -> range | None:
+        """Return the range of existing time partitions.
+
+        Returns
+        -------
+        partitions : `range` or `None`
+            Range of time partition numbers from metadata, `None` if metadata
+            does not define it.
+        """
+        metadata = ApdbMetadata(self._session, self._keyspace)
+        if (range_json := metadata.get("config:time-partition-range.json")) is None:
+            return None
+        time_range = json.loads(range_json)
+        return range(time_range["start"], time_range["end"] + 1)
+
+    def _partition_column_values(
+        self, column: str, time_partitions: Iterable[int] | None
+    ) -> Sequence[int] | None:
+        """Return all possible values of a partition column, or `None` if
+        values cannot be enumerated.
+        """
+        if column == "apdb_part":
+            pixelization = self._config.get("part_pixelization")
+            level = self._config.get("part_pix_level")
+            if pixelization not in _PIXEL_RANGES or level is None:
+                return None
+            return _PIXEL_RANGES[pixelization](level)
+        elif column == "apdb_time_part":
+            if time_partitions is not None:
+                return list(time_partitions)
+            return self.time_partition_range()
+        elif column == "apdb_replica_chunk":
+            if not self.check_table("ApdbReplicaChunks"):
+                return None
+            query = (
+                f'SELECT apdb_replica_chunk FROM "{self._keyspace}"."ApdbReplicaChunks" WHERE partition = 0'
+            )
+            return [row[0] for row in self._session.execute(query, None)]
+        elif column == "apdb_replica_subchunk":
+            if (sub_chunk_count := self._config.get("replica_sub_chunk_count")) is None:
+                return None
+            return range(sub_chunk_count)
+        return None
+
+    def scan(
+        self,
+        table_name: str,
+        select_list: str,
+        *,
+        time_partitions: Iterable[int] | None = None,
+        partitions: Sequence[tuple] | None = None,
+        max_partitions: int = 10_000,
+        token_ranges: int = 1024,
+        concurrency: int = 16,
+    ) -> Iterator[tuple]:
+        """Return all rows from a table without using ALLOW FILTERING.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        select_list : `str`
+            Select list of the query, e.g. quoted column names separated by
+            commas.
+        time_partitions : `~collections.abc.Iterable` [`int`], optional
+            If specified and table has ``apdb_time_part`` column in partition
+            key, then only scan these time partitions.
+        partitions : `~collections.abc.Sequence` [`tuple`], optional
+            Values of partition key columns (in the order returned from
+            `partition_key`) for partitions to scan. If specified, then only
+            these partitions are queried, ``time_partitions`` is ignored.
+        max_partitions : `int`, optional
+            Maximum number of partitions for which single-partition queries
+            are used, token range scan is used for larger tables.
+        token_ranges : `int`, optional
+            Number of ranges for token range scan.
+        concurrency : `int`, optional
+            Number of concurrent queries.
+
+        Yields
+        ------
+        row : `tuple`
+            Rows returned from the query.
+
+        Notes
+        -----
+        If all partitions of a table can be enumerated (see
+        `partition_values`) and their number is not too large, then each
+        partition is queried separately. Otherwise the whole token ring is
+        split into ranges which are queried separately, in that case
+        ``time_partitions`` do not reduce the amount of data read from the
+        database, rows from other time partitions are discarded on the client
+        side. In both cases queries are executed concurrently.
+        """
+        if time_partitions is not None:
+            time_partitions = list(time_partitions)
+        if self._cost_recorder is not None:
+            self._cost_recorder.record_scan(table_name, select_list.count(",") + 1)
+        partition_key = self.partition_key(table_name)
+        where = " AND ".join(f'"{column}" = ?' for column in partition_key)
+        time_filter: set[int] | None = None
+        params: Sequence[tuple] | None = partitions
+        if params is None:
+            params = self.partition_values(
+                table_name, time_partitions=time_partitions, max_count=max_partitions
+            )
+        if params is not None:
+            _LOG.info("Scanning %d partitions of table %s", len(params), table_name)
+        else:
+            key = ", ".join(f'"{column}"' for column in partition_key)
+            where = f"token({key}) >= ? AND token({key}) <= ?"
+            step = (_MAX_TOKEN - _MIN_TOKEN) // token_ranges + 1
+            bounds = [_MIN_TOKEN + i * step for i in range(token_ranges)] + [_MAX_TOKEN + 1]
+            params = [(start, end - 1) for start, end in itertools.pairwise(bounds)]
+            if time_partitions is not None and "apdb_time_part" in partition_key:
+                # Restricting part of partition key would need filtering on
+                # the server, rows from other time partitions are dropped on
+                # the client instead.
+                time_filter = set(time_partitions)
+                select_list += ", apdb_time_part"
+            _LOG.info("Scanning %d token ranges of table %s", len(params), table_name)
+
+        query = f'SELECT {select_list} FROM "{self._keyspace}"."{table_name}" WHERE {where}'
+        statement = self._session.prepare(query)
+        results = execute_concurrent_with_args(
+            cast(Any, self._session),
+            statement,
+            params,
+            concurrency=concurrency,
+            results_generator=True,
+            execution_profile="read_tuples",
+        )
+        for result in results:
+            if time_filter is None:
+                yield from result.result_or_exc
+            else:
+                yield from (row[:-1] for row in result.result_or_exc if row[-1] in time_filter)
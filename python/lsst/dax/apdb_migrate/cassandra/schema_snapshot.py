@@ -0,0 +1,149 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ["SchemaSnapshot"]
+
+import dataclasses
+import json
+from typing import Any
+
+from .apdb_metadata import ApdbMetadata
+from .estimates import TableSize, load_size_estimates
+from .table_schema import TableSchema
+
+
+@dataclasses.dataclass
+class SchemaSnapshot:
+    """Snapshot of the schema of all tables in a keyspace.
+
+    Snapshot also includes contents of APDB metadata table and table size
+    estimates, which are needed to plan migrations offline.
+    """
+
+    keyspace: str
+    """Name of the keyspace (`str`)."""
+
+    tables: dict[str, TableSchema]
+    """Table schemas indexed by table name (`dict` [`str`, `TableSchema`])."""
+
+    metadata: dict[str, str] = dataclasses.field(default_factory=dict)
+    """Contents of APDB metadata table (`dict` [`str`, `str`])."""
+
+    sizes: dict[str, TableSize] = dataclasses.field(default_factory=dict)
+    """Estimated table sizes indexed by table name
+    (`dict` [`str`, `TableSize`]).
+    """
+
+    @classmethod
+    def from_keyspace(cls, session: Any, keyspace: str) -> SchemaSnapshot:
+        """Make snapshot of existing keyspace.
+
+        Parameters
+        ----------
+        session : `cassandra.cluster.Session`
+            Database session, it has to return rows as named tuples.
+        keyspace : `str`
+            Name of the keyspace.
+        """
+        tables = TableSchema.from_keyspace(session, keyspace)
+        metadata: dict[str, str] = {}
+        if "metadata" in tables:
+            metadata = {
+                key: value for key, value in ApdbMetadata(session, keyspace).items() if value is not None
+            }
+        sizes = load_size_estimates(session, keyspace)
+        return cls(keyspace=keyspace, tables=tables, metadata=metadata, sizes=sizes)
+
+    def to_json(self) -> str:
+        """Return JSON representation of the snapshot."""
+        data = {
+            "keyspace": self.keyspace,
+            "tables": [self.tables[table_name].to_dict() for table_name in sorted(self.tables)],
+            "metadata": self.metadata,
+            "sizes": {table_name: dataclasses.asdict(size) for table_name, size in self.sizes.items()},
+        }
+        return json.dumps(data, indent=2)
+
+    @classmethod
+    def from_json(cls, json_str: str) -> SchemaSnapshot:
+        """Make snapshot from its JSON representation.
+
+        Parameters
+        ----------
+        json_str : `str`
+            JSON string returned from `to_json`.
+        """
+        data = json.loads(json_str)
+        tables = [TableSchema.from_dict(table) for table in data["tables"]]
+        return cls(
+            keyspace=data["keyspace"],
+            tables={table.table_name: table for table in tables},
+            metadata=data.get("metadata", {}),
+            sizes={table_name: TableSize(**size) for table_name, size in data.get("sizes", {}).items()},
+        )
+
+    def diff(self, other: SchemaSnapshot) -> list[str]:
+        """Compare two snapshots.
+
+        Parameters
+        ----------
+        other : `SchemaSnapshot`
+            Snapshot to compare with, it is considered as a newer version.
+
+        Returns
+        -------
+        differences : `list` [`str`]
+            Human-readable descriptions of differences, empty if schemas are
+            identical. Keyspace names, metadata, and size estimates are not
+            compared.
+        """
+        differences: list[str] = []
+        for table_name in sorted(self.tables.keys() - other.tables.keys()):
+            differences.append(f"table={table_name} removed")
+        for table_name in sorted(other.tables.keys() - self.tables.keys()):
+            differences.append(f"table={table_name} added")
+
+        for table_name in sorted(self.tables.keys() & other.tables.keys()):
+            # Compare JSON-compatible representations to ignore differences in
+            # types of option values.
+            table1 = self.tables[table_name].to_dict()
+            table2 = other.tables[table_name].to_dict()
+
+            columns1 = {column["column_name"]: column for column in table1["columns"]}
+            columns2 = {column["column_name"]: column for column in table2["columns"]}
+            for column in sorted(columns1.keys() - columns2.keys()):
+                differences.append(f"table={table_name} column={column} removed")
+            for column in sorted(columns2.keys() - columns1.keys()):
+                differences.append(f"table={table_name} column={column} added")
+            for column in sorted(columns1.keys() & columns2.keys()):
+                for key, value1 in columns1[column].items():
+                    if (value2 := columns2[column][key]) != value1:
+                        differences.append(f"table={table_name} column={column} {key}: {value1} -> {value2}")
+
+            options1 = table1["table_options"]
+            options2 = table2["table_options"]
+            for option in sorted(options1.keys() | options2.keys()):
+                if (value1 := options1.get(option)) != (value2 := options2.get(option)):
+                    differences.append(f"table={table_name} option={option}: {value1} -> {value2}")
+
+        return differences
@@ -19,6 +19,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from .migrate_apply_plan import migrate_apply_plan
+from .migrate_backfill import migrate_backfill
+from .migrate_benchmark_connect import migrate_benchmark_connect
 from .migrate_current import migrate_current
+from .migrate_diff_schema import migrate_diff_schema
 from .migrate_downgrade import migrate_downgrade
+from .migrate_dump_schema import migrate_dump_schema
+from .migrate_plan import migrate_plan
 from .migrate_upgrade import migrate_upgrade
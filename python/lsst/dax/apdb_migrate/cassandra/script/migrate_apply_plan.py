@@ -0,0 +1,109 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Execute a plan saved by a dry-run upgrade."""
+
+from __future__ import annotations
+
+import logging
+import time
+
+import cassandra.query
+from cassandra.concurrent import execute_concurrent
+
+from .. import database
+from ..cql_plan import CqlPlan
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_apply_plan(
+    host: str, port: int | None, keyspace: str, plan: str, concurrency: int, force: bool, dry_run: bool
+) -> None:
+    """Execute a plan saved by a dry-run upgrade.
+
+    Parameters
+    ----------
+    host : `str`
+        Name of the Cassandra host to connect to.
+    port : `int`, optional
+        Port number.
+    keyspace : `str`
+        Cassandra keyspace name.
+    plan : `str`
+        Name of the plan JSON file, data file is looked up relative to its
+        directory.
+    concurrency : `int`
+        Number of concurrent write statements.
+    force : `bool`
+        If True then execute the plan even if current versions in the
+        database do not match versions at the time plan was made.
+    dry_run : `bool`
+        If True then only print summary of the plan.
+    """
+    cql_plan = CqlPlan.read(plan)
+    if dry_run:
+        for line in cql_plan.summary():
+            print(line)
+        return
+    if cql_plan.keyspace != keyspace:
+        raise ValueError(f"Plan was made for keyspace {cql_plan.keyspace}, not {keyspace}.")
+    if any(step.kind == "write" and step.data_offset is None for step in cql_plan.steps):
+        raise ValueError("Plan does not include parameters of write statements, it cannot be applied.")
+    cql_plan.check_data()
+
+    db = database.Database(host, keyspace, port)
+    versions = {tree: version for tree, (version, _) in db.tree_versions().items()}
+    if versions != cql_plan.versions:
+        message = f"Current versions {versions} do not match plan versions {cql_plan.versions}."
+        if not force:
+            raise ValueError(message)
+        _LOG.warning("%s", message)
+
+    with db.make_session() as session:
+        for step in cql_plan.steps:
+            if step.kind == "cql":
+                _LOG.info("Executing: %s", step.query)
+                session.execute(step.query, step.parameters)
+                continue
+
+            _LOG.info("Executing %d statements: %s", step.rows, step.query)
+            start_time = time.time()
+            prepared = session.prepare(step.query)
+            statements = ((_bind(prepared, values), None) for values in cql_plan.read_rows(step))
+            results = execute_concurrent(
+                session,
+                statements,
+                concurrency=concurrency,
+                raise_on_first_error=True,
+                results_generator=True,
+            )
+            for _ in results:
+                pass
+            _LOG.info("Executed %d statements in %.3f seconds", step.rows, time.time() - start_time)
+
+
+def _bind(prepared: cassandra.query.PreparedStatement, values: list) -> cassandra.query.BoundStatement:
+    """Make bound statement from serialized values, values are used as is."""
+    bound = cassandra.query.BoundStatement(prepared)
+    bound.values = values
+    return bound
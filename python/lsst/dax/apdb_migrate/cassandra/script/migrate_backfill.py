@@ -0,0 +1,120 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Execute deferred backfill jobs."""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from alembic.script import ScriptDirectory
+
+from .. import config, database
+from ..apdb_metadata import ApdbMetadata
+from ..backfill import BackfillJob
+from ..context import BackfillContext
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_backfill(
+    host: str,
+    port: int | None,
+    keyspace: str,
+    mig_path: str,
+    dry_run: bool,
+    options: dict[str, str] | None,
+    max_rate: float | None,
+    revision: str | None,
+) -> None:
+    """Execute deferred backfill jobs.
+
+    Parameters
+    ----------
+    host : `str`
+        Name of the Cassandra host to connect to.
+    port : `int`, optional
+        Port number.
+    keyspace : `str`
+        Cassandra keyspace name.
+    mig_path : `str`
+        Filesystem path to location of revisions.
+    dry_run : `bool`
+        If True dump queries instead of executing them on a database.
+    options : `dict` or `None`
+        Additional key:value options specified on command line.
+    max_rate : `float` or `None`
+        Maximum rate of updates in records per second.
+    revision : `str` or `None`
+        If specified then only execute job for this revision.
+    """
+    db = database.Database(host, keyspace, port)
+
+    cfg = config.ApdbMigConfigCassandra.from_mig_path(
+        mig_path, db=db, migration_options=options, dry_run=dry_run
+    )
+
+    # Use the same session for all jobs.
+    with db.keep_session():
+        _run_jobs(db, cfg, max_rate, revision)
+
+
+def _run_jobs(
+    db: database.Database, cfg: config.ApdbMigConfigCassandra, max_rate: float | None, revision: str | None
+) -> None:
+    """Find and execute pending backfill jobs."""
+    # Find all pending jobs.
+    jobs: list[BackfillJob] = []
+    with db.make_session() as session:
+        metadata = ApdbMetadata(session, db.keyspace)
+        for key, value in metadata.items():
+            if value is not None and (job := BackfillJob.from_metadata(key, value)) is not None:
+                if revision is None or job.revision == revision:
+                    jobs.append(job)
+    if not jobs:
+        _LOG.info("No pending backfill jobs found.")
+        return
+
+    script_info = ScriptDirectory.from_config(cfg)
+    for job in sorted(jobs, key=lambda job: job.revision):
+        script = script_info.get_revision(job.revision)
+        if script is None or not hasattr(script.module, "backfill"):
+            raise LookupError(f"Migration script for revision {job.revision} does not support backfill.")
+
+        remaining = job.remaining
+        _LOG.info(
+            "Executing backfill job for revision %s, %d units remaining out of %d",
+            job.revision,
+            len(remaining),
+            len(job.units),
+        )
+        with BackfillContext(job, cfg, max_rate) as ctx:
+            for unit in remaining:
+                start_time = time.time()
+                script.module.backfill(ctx, unit)
+                ctx.complete_unit(unit)
+                _LOG.info(
+                    "Completed unit %s in %.1f seconds, %d units remaining",
+                    unit,
+                    time.time() - start_time,
+                    len(job.remaining),
+                )
@@ -0,0 +1,79 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measure latency of Cassandra connection startup."""
+
+from __future__ import annotations
+
+import logging
+import statistics
+import time
+
+from .. import database
+from ..apdb_metadata import ApdbMetadata
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_benchmark_connect(host: str, port: int | None, keyspace: str, repeat: int) -> None:
+    """Measure time to connect and read metadata table for regular and
+    lightweight sessions.
+
+    Parameters
+    ----------
+    host : `str`
+        Name of the Cassandra host to connect to.
+    port : `int`, optional
+        Port number.
+    keyspace : `str`
+        Cassandra keyspace name.
+    repeat : `int`
+        Number of connections for each session type.
+    """
+    db = database.Database(host, keyspace, port)
+    print(f"session      connect    query      total  (median of {repeat} runs, seconds)")
+    for lightweight in (False, True):
+        connect_times: list[float] = []
+        query_times: list[float] = []
+        total_times: list[float] = []
+        for _ in range(repeat):
+            start_time = time.time()
+            with db.make_session(lightweight=lightweight) as session:
+                connect_time = time.time()
+                ApdbMetadata(session, keyspace).items()
+                query_time = time.time()
+            end_time = time.time()
+            connect_times.append(connect_time - start_time)
+            query_times.append(query_time - connect_time)
+            total_times.append(end_time - start_time)
+            _LOG.debug(
+                "lightweight=%s: connect %.3f, query %.3f, total %.3f",
+                lightweight,
+                connect_times[-1],
+                query_times[-1],
+                total_times[-1],
+            )
+        mode = "lightweight" if lightweight else "regular"
+        print(
+            f"{mode:11s} {statistics.median(connect_times):8.3f} {statistics.median(query_times):8.3f} "
+            f"{statistics.median(total_times):10.3f}"
+        )
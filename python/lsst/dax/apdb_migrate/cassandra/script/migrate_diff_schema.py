@@ -0,0 +1,74 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare schemas of two keyspaces or snapshots."""
+
+from __future__ import annotations
+
+import logging
+import os
+
+from .. import database
+from ..schema_snapshot import SchemaSnapshot
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_diff_schema(source1: str, source2: str, host: str | None, port: int | None) -> None:
+    """Compare schemas of two keyspaces or snapshots and print differences.
+
+    Parameters
+    ----------
+    source1 : `str`
+        Name of JSON file produced by ``dump-schema`` command or name of a
+        keyspace.
+    source2 : `str`
+        Name of JSON file produced by ``dump-schema`` command or name of a
+        keyspace, this is considered to be a newer schema.
+    host : `str`, optional
+        Name of the Cassandra host to connect to, needed if either of the
+        sources is a keyspace.
+    port : `int`, optional
+        Port number.
+    """
+    snapshot1 = _load_snapshot(source1, host, port)
+    snapshot2 = _load_snapshot(source2, host, port)
+
+    differences = snapshot1.diff(snapshot2)
+    if differences:
+        for difference in differences:
+            print(difference)
+    else:
+        print("Schemas are identical.")
+
+
+def _load_snapshot(source: str, host: str | None, port: int | None) -> SchemaSnapshot:
+    """Read snapshot from a file or make it from a keyspace."""
+    if os.path.exists(source):
+        with open(source) as file:
+            return SchemaSnapshot.from_json(file.read())
+    if host is None:
+        raise ValueError(f"File {source} does not exist, host name is needed to read keyspace schema.")
+    db = database.Database(host, source, port)
+    with db.make_session(lightweight=True) as session:
+        snapshot = SchemaSnapshot.from_keyspace(session, source)
+    _LOG.info("Loaded schema for %d tables from keyspace %s", len(snapshot.tables), source)
+    return snapshot
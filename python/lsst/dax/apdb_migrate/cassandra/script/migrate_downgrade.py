@@ -58,10 +58,15 @@ def migrate_downgrade(
     options : `dict` or `None`
         Additional key:value options specified on command line
     """
+    if options and "target-schema" in options:
+        raise ValueError("target-schema option can only be used for upgrades.")
+
     db = database.Database(host, keyspace, port)
 
     cfg = config.ApdbMigConfigCassandra.from_mig_path(
         mig_path, db=db, migration_options=options, dry_run=dry_run
     )
 
-    command.downgrade(cfg, revision)
+    # Use the same session for all migrations.
+    with db.keep_session():
+        command.downgrade(cfg, revision)
@@ -0,0 +1,63 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Dump schema of a keyspace to JSON file."""
+
+from __future__ import annotations
+
+import logging
+import sys
+
+from .. import database
+from ..schema_snapshot import SchemaSnapshot
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_dump_schema(host: str, port: int | None, keyspace: str, output: str | None) -> None:
+    """Dump schema of a keyspace to JSON file.
+
+    Parameters
+    ----------
+    host : `str`
+        Name of the Cassandra host to connect to.
+    port : `int`, optional
+        Port number.
+    keyspace : `str`
+        Cassandra keyspace name.
+    output : `str`, optional
+        Name of the output file, if not specified then JSON is printed to
+        standard output.
+    """
+    db = database.Database(host, keyspace, port)
+
+    with db.make_session(lightweight=True) as session:
+        snapshot = SchemaSnapshot.from_keyspace(session, keyspace)
+    _LOG.info("Loaded schema for %d tables", len(snapshot.tables))
+
+    json_str = snapshot.to_json()
+    if output:
+        with open(output, "w") as file:
+            file.write(json_str)
+            file.write("\n")
+    else:
+        sys.stdout.write(json_str)
+        sys.stdout.write("\n")
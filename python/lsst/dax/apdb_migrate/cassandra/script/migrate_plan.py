@@ -0,0 +1,104 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Plan upgrade using a saved keyspace snapshot."""
+
+from __future__ import annotations
+
+import logging
+
+from alembic import command
+
+from .. import config
+from ..context import OnlineBackfillDone
+from ..estimates import estimate_row_size
+from ..offline import OfflineDatabase, OfflineStep
+from ..schema_snapshot import SchemaSnapshot
+
+_LOG = logging.getLogger(__name__)
+
+
+def migrate_plan(snapshot: str, revision: str, mig_path: str, options: dict[str, str] | None) -> None:
+    """Run upgrade against a saved keyspace snapshot and print the plan.
+
+    Parameters
+    ----------
+    snapshot : `str`
+        Name of JSON file produced by ``dump-schema`` command.
+    revision : `str`
+        Target revision.
+    mig_path : `str`
+        Filesystem path to location of revisions.
+    options : `dict` or `None`
+        Additional key:value options specified on command line
+    """
+    with open(snapshot) as file:
+        keyspace_snapshot = SchemaSnapshot.from_json(file.read())
+    db = OfflineDatabase(keyspace_snapshot)
+
+    cfg = config.ApdbMigConfigCassandra.from_mig_path(mig_path, db=db, migration_options=options)
+
+    try:
+        with db.keep_session():
+            command.upgrade(cfg, revision)
+    except OnlineBackfillDone as exc:
+        _LOG.info("%s", exc)
+
+    # Row estimates use table definitions from the original snapshot.
+    row_estimates: dict[str, int] = {}
+    for table_name, size in keyspace_snapshot.sizes.items():
+        if (table := keyspace_snapshot.tables.get(table_name)) is not None:
+            row_estimates[table_name] = size.estimate_rows(estimate_row_size(table.columns))
+
+    for step in db.session.steps:
+        _print_step(step, row_estimates)
+
+
+def _print_step(step: OfflineStep, row_estimates: dict[str, int]) -> None:
+    """Print summary of a single migration step."""
+    if not (step.revision or step.ddl or step.scans or step.writes or step.prepared_writes):
+        return
+
+    def _rows(table_name: str) -> str:
+        rows = row_estimates.get(table_name)
+        return "unknown number of rows" if rows is None else f"~{rows} rows"
+
+    print(f"Revision {step.revision or '(not completed)'}:")
+    if step.ddl:
+        print("  DDL:")
+        for statement in step.ddl:
+            print("    " + statement.replace("\n", "\n    ") + ";")
+    if step.scans:
+        print("  Scanned tables:")
+        for table_name, count in sorted(step.scans.items()):
+            print(f"    {table_name}: {_rows(table_name)}, {count} queries")
+    # Data-dependent writes are estimated by the size of the largest scanned
+    # table.
+    scanned_rows = [row_estimates[table_name] for table_name in step.scans if table_name in row_estimates]
+    write_estimate = f"up to ~{max(scanned_rows)} rows" if scanned_rows else "unknown number of rows"
+    written = sorted(step.prepared_writes | set(step.writes))
+    if written:
+        print("  Written tables:")
+        for table_name in written:
+            if table_name in step.prepared_writes:
+                print(f"    {table_name}: {write_estimate}")
+            else:
+                print(f"    {table_name}: {step.writes[table_name]} statements")
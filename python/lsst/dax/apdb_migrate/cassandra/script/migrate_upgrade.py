@@ -23,12 +23,21 @@ from __future__ import annotations
 
 import logging
 
+from contextlib import ExitStack
+
 from alembic import command
 
 from .. import config, database
+from ..context import OnlineBackfillDone
+from ..cql_plan import CqlPlanWriter
+from ..estimates import CostRecorder
 
 _LOG = logging.getLogger(__name__)
 
+# Default write rate in rows per second used for cost estimates, can be
+# overridden with ``write-rate`` option.
+_DEFAULT_WRITE_RATE = 10_000.0
+
 
 def migrate_upgrade(
     host: str,
@@ -54,14 +63,49 @@ def migrate_upgrade(
     mig_path : `str`
         Filesystem path to location of revisions.
     dry_run : `bool`
-        If True dump queries instead of executing migration on a database.
+        If True dump queries instead of executing migration on a database,
+        and print estimated duration and memory use of each revision.
     options : `dict` or `None`
         Additional key:value options specified on command line
+
+    Notes
+    -----
+    In dry-run mode ``cql-plan=PATH`` option saves all queries in a JSON
+    file which can be reviewed and executed with `migrate_apply_plan`.
+    Parameters of write statements are only saved if ``cql-plan-data=PATH``
+    option is also given.
     """
     db = database.Database(host, keyspace, port)
+    if dry_run:
+        db.cost_recorder = CostRecorder()
 
     cfg = config.ApdbMigConfigCassandra.from_mig_path(
         mig_path, db=db, migration_options=options, dry_run=dry_run
     )
 
-    command.upgrade(cfg, revision)
+    # Use the same session for all migrations.
+    with ExitStack() as stack:
+        stack.enter_context(db.keep_session())
+        if dry_run and options and (plan_path := options.get("cql-plan")):
+            versions = {tree: version for tree, (version, _) in db.tree_versions().items()}
+            db.cql_plan = stack.enter_context(
+                CqlPlanWriter(plan_path, keyspace, versions, data_path=options.get("cql-plan-data"))
+            )
+        try:
+            command.upgrade(cfg, revision)
+        except OnlineBackfillDone as exc:
+            # This is not an error, just a signal to stop after backfill phase.
+            _LOG.info("%s", exc)
+        if db.cost_recorder is not None:
+            _print_cost(db, db.cost_recorder, options)
+
+
+def _print_cost(db: database.Database, recorder: CostRecorder, options: dict[str, str] | None) -> None:
+    """Print cost estimates collected during dry run."""
+    write_rate = float((options or {}).get("write-rate", _DEFAULT_WRITE_RATE))
+    with db.make_session() as session:
+        lines = recorder.report(session, db.keyspace, write_rate=write_rate)
+    if lines:
+        print("Estimated cost of migration:")
+        for line in lines:
+            print(line)
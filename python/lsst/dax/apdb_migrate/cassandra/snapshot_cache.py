@@ -0,0 +1,326 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ["SnapshotCache", "TableSnapshot"]
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Iterable, Iterator
+
+import numpy
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class TableSnapshot:
+    """Columnar snapshot of a projection of a Cassandra table.
+
+    Values of each column are stored as a numpy array, NULL values are
+    represented by a separate boolean mask array.
+    """
+
+    keyspace: str
+    """Name of the keyspace (`str`)."""
+
+    table_name: str
+    """Name of the table (`str`)."""
+
+    columns: tuple[str, ...]
+    """Names of the columns in the projection (`tuple` [`str`])."""
+
+    schema_version: str
+    """Version of the ``schema`` tree at the time of the scan (`str`)."""
+
+    scan_time: float
+    """POSIX time when the scan was started (`float`)."""
+
+    data: dict[str, numpy.ndarray]
+    """Column values indexed by column name (`dict`)."""
+
+    masks: dict[str, numpy.ndarray]
+    """Masks for NULL values indexed by column name, only includes columns
+    that have NULL values (`dict`).
+    """
+
+    @classmethod
+    def from_rows(
+        cls,
+        keyspace: str,
+        table_name: str,
+        columns: Iterable[str],
+        schema_version: str,
+        scan_time: float,
+        rows: Iterable[tuple],
+    ) -> TableSnapshot:
+        """Make snapshot from a sequence of rows.
+
+        Parameters
+        ----------
+        keyspace : `str`
+            Name of the keyspace.
+        table_name : `str`
+            Name of the table.
+        columns : `~collections.abc.Iterable` [`str`]
+            Names of the columns, must match the order of values in rows.
+        schema_version : `str`
+            Version of the ``schema`` tree.
+        scan_time : `float`
+            POSIX time when the scan was started.
+        rows : `~collections.abc.Iterable` [`tuple`]
+            Rows returned from a query.
+
+        Returns
+        -------
+        snapshot : `TableSnapshot`
+            New snapshot instance.
+
+        Raises
+        ------
+        TypeError
+            Raised if column type cannot be stored in a columnar format.
+        """
+        columns = tuple(columns)
+        values: list[list] = [[] for _ in columns]
+        for row in rows:
+            for column_values, value in zip(values, row, strict=True):
+                column_values.append(value)
+
+        data: dict[str, numpy.ndarray] = {}
+        masks: dict[str, numpy.ndarray] = {}
+        for column, column_values in zip(columns, values, strict=True):
+            mask = numpy.array([value is None for value in column_values], dtype=bool)
+            if mask.any():
+                # Replace NULLs with a value of the same type as the first
+                # non-NULL value.
+                fill = next((value for value in column_values if value is not None), 0)
+                fill = type(fill)()
+                column_values = [fill if value is None else value for value in column_values]
+                masks[column] = mask
+            array = numpy.array(column_values)
+            if array.dtype.kind not in "biufU":
+                raise TypeError(f"Column {column} has unsupported data type for snapshot: {array.dtype}")
+            data[column] = array
+
+        return cls(
+            keyspace=keyspace,
+            table_name=table_name,
+            columns=columns,
+            schema_version=schema_version,
+            scan_time=scan_time,
+            data=data,
+            masks=masks,
+        )
+
+    def __len__(self) -> int:
+        if not self.columns:
+            return 0
+        return len(self.data[self.columns[0]])
+
+    @property
+    def age(self) -> float:
+        """Age of the snapshot in seconds (`float`)."""
+        return time.time() - self.scan_time
+
+    def select(self, selection: numpy.ndarray) -> TableSnapshot:
+        """Return snapshot with a subset of rows.
+
+        Parameters
+        ----------
+        selection : `numpy.ndarray`
+            Boolean mask or array of indices of the rows to select.
+
+        Returns
+        -------
+        snapshot : `TableSnapshot`
+            New snapshot instance, its attributes are the same as for this
+            snapshot.
+        """
+        return dataclasses.replace(
+            self,
+            data={column: array[selection] for column, array in self.data.items()},
+            masks={column: mask[selection] for column, mask in self.masks.items()},
+        )
+
+    def rows(self, columns: Iterable[str] | None = None) -> Iterator[tuple]:
+        """Iterate over rows in a snapshot.
+
+        Parameters
+        ----------
+        columns : `~collections.abc.Iterable` [`str`], optional
+            Names of the columns to return, by default all columns in the
+            snapshot are returned.
+
+        Yields
+        ------
+        row : `tuple`
+            Values for one row, NULL values are returned as `None`.
+        """
+        columns = self.columns if columns is None else tuple(columns)
+        column_values = []
+        for column in columns:
+            values = self.data[column].tolist()
+            if (mask := self.masks.get(column)) is not None:
+                values = [None if masked else value for value, masked in zip(values, mask.tolist())]
+            column_values.append(values)
+        yield from zip(*column_values)
+
+
+class SnapshotCache:
+    """Local cache of table snapshots.
+
+    Parameters
+    ----------
+    path : `str`
+        Location of a folder with cached snapshots, will be created if does not
+        exist.
+
+    Notes
+    -----
+    Snapshots are keyed by keyspace, table name, set of columns in the
+    projection and the version of the ``schema`` tree. Each snapshot is
+    stored as a pair of files, a ``.npz`` file with column data and a ``.json``
+    file with snapshot attributes. A snapshot which includes more columns than
+    requested can be used to satisfy the request.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _key(keyspace: str, table_name: str, columns: Iterable[str], schema_version: str) -> str:
+        """Return file name stem for a snapshot."""
+        key = json.dumps([keyspace, table_name, sorted(columns), schema_version])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def find(
+        self,
+        keyspace: str,
+        table_name: str,
+        columns: Iterable[str],
+        schema_version: str,
+        max_age: float | None = None,
+    ) -> TableSnapshot | None:
+        """Find a snapshot in the cache.
+
+        Parameters
+        ----------
+        keyspace : `str`
+            Name of the keyspace.
+        table_name : `str`
+            Name of the table.
+        columns : `~collections.abc.Iterable` [`str`]
+            Names of the columns in the projection.
+        schema_version : `str`
+            Version of the ``schema`` tree.
+        max_age : `float`, optional
+            Maximum age of the snapshot in seconds, if not specified then
+            snapshot of any age is returned.
+
+        Returns
+        -------
+        snapshot : `TableSnapshot` or `None`
+            Snapshot found in the cache, `None` if there is no matching
+            snapshot. Returned snapshot may contain more columns than
+            requested.
+        """
+        columns = set(columns)
+        best: dict | None = None
+        for file_name in os.listdir(self._path):
+            if not file_name.endswith(".json"):
+                continue
+            with open(os.path.join(self._path, file_name)) as file:
+                attributes = json.load(file)
+            if (
+                attributes["keyspace"] != keyspace
+                or attributes["table_name"] != table_name
+                or attributes["schema_version"] != schema_version
+                or not columns.issubset(attributes["columns"])
+            ):
+                continue
+            if max_age is not None and time.time() - attributes["scan_time"] > max_age:
+                continue
+            if best is None or attributes["scan_time"] > best["scan_time"]:
+                best = attributes
+
+        if best is None:
+            return None
+
+        stem = self._key(keyspace, table_name, best["columns"], schema_version)
+        data: dict[str, numpy.ndarray] = {}
+        masks: dict[str, numpy.ndarray] = {}
+        with numpy.load(os.path.join(self._path, f"{stem}.npz")) as arrays:
+            for index, column in enumerate(best["columns"]):
+                data[column] = arrays[f"data_{index}"]
+                if (mask_key := f"mask_{index}") in arrays:
+                    masks[column] = arrays[mask_key]
+        _LOG.debug("Found cached snapshot %s for table %s", stem, table_name)
+
+        return TableSnapshot(
+            keyspace=keyspace,
+            table_name=table_name,
+            columns=tuple(best["columns"]),
+            schema_version=schema_version,
+            scan_time=best["scan_time"],
+            data=data,
+            masks=masks,
+        )
+
+    def store(self, snapshot: TableSnapshot) -> None:
+        """Save snapshot to the cache.
+
+        Parameters
+        ----------
+        snapshot : `TableSnapshot`
+            Snapshot to save, replaces existing snapshot with the same key.
+        """
+        stem = self._key(snapshot.keyspace, snapshot.table_name, snapshot.columns, snapshot.schema_version)
+        arrays: dict[str, numpy.ndarray] = {}
+        for index, column in enumerate(snapshot.columns):
+            arrays[f"data_{index}"] = snapshot.data[column]
+            if (mask := snapshot.masks.get(column)) is not None:
+                arrays[f"mask_{index}"] = mask
+        attributes = {
+            "keyspace": snapshot.keyspace,
+            "table_name": snapshot.table_name,
+            "columns": list(snapshot.columns),
+            "schema_version": snapshot.schema_version,
+            "scan_time": snapshot.scan_time,
+            "rows": len(snapshot),
+        }
+
+        # Write data file first and then attributes, both are written to a
+        # temporary file and renamed to avoid partial files.
+        with tempfile.NamedTemporaryFile(dir=self._path, suffix=".npz", delete=False) as data_file:
+            numpy.savez(data_file, **arrays)  # type: ignore[arg-type]
+        os.replace(data_file.name, os.path.join(self._path, f"{stem}.npz"))
+        with tempfile.NamedTemporaryFile("w", dir=self._path, suffix=".tmp", delete=False) as json_file:
+            json.dump(attributes, json_file)
+        os.replace(json_file.name, os.path.join(self._path, f"{stem}.json"))
+        _LOG.debug("Stored snapshot %s for table %s, %d rows", stem, snapshot.table_name, len(snapshot))
@@ -24,9 +24,26 @@ from __future__ import annotations
 __all__ = ("Column", "TableSchema")
 
 import dataclasses
-from typing import Any, NamedTuple, cast
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, NamedTuple, cast
 
-from .context import Context
+if TYPE_CHECKING:
+    from .context import Context
+
+# Columns of system_schema.tables that are not table options.
+_NON_OPTION_KEYS = ("keyspace_name", "table_name", "id", "memtable", "flags")
+
+
+def _json_value(value: Any) -> Any:
+    """Convert option value to JSON-compatible representation."""
+    if isinstance(value, Mapping):
+        return {str(key): _json_value(item) for key, item in value.items()}
+    elif isinstance(value, bytes):
+        return value.hex()
+    elif isinstance(value, (set, frozenset)):
+        return sorted(_json_value(item) for item in value)
+    return value
 
 
 @dataclasses.dataclass
@@ -82,19 +99,9 @@ class TableSchema:
     @classmethod
     def from_table(cls, ctx: Context, table_name: str) -> TableSchema:
         """Contruct table schema from its database definition."""
-        # Get the list of columns from existing table.
-        query = (
-            "select column_name, type, kind, position, clustering_order "
-            "from system_schema.columns "
-            "where keyspace_name = %s and table_name=%s"
-        )
-        # Rows are returned as namedtuples.
-        columns: list[Column] = []
-        for row in cast(NamedTuple, ctx.query(query, (ctx.keyspace, table_name))):
-            columns.append(Column(**row._asdict()))
-
-        # Sort all columns.
-        Column.order_columns(columns)
+        # Get the list of columns from cached keyspace schema, they are
+        # already ordered.
+        columns = ctx.schema.table_columns(table_name)
 
         # Query table options.
         query = "select * from system_schema.tables where keyspace_name = %s and table_name = %s"
@@ -102,7 +109,7 @@ class TableSchema:
         options_tuple = cast(NamedTuple, rows[0])
         table_options = options_tuple._asdict()
         # Drop some keys that cannot appear in DDL.
-        for key in ("keyspace_name", "table_name", "id", "memtable", "flags"):
+        for key in _NON_OPTION_KEYS:
             table_options.pop(key, None)
 
         return TableSchema(
@@ -112,6 +119,83 @@ class TableSchema:
             table_options=table_options,
         )
 
+    @classmethod
+    def from_keyspace(cls, session: Any, keyspace: str) -> dict[str, TableSchema]:
+        """Construct schemas for all tables in a keyspace.
+
+        Parameters
+        ----------
+        session : `cassandra.cluster.Session`
+            Database session, it has to return rows as named tuples.
+        keyspace : `str`
+            Name of the keyspace.
+
+        Returns
+        -------
+        schemas : `dict` [`str`, `TableSchema`]
+            Table schemas indexed by table name.
+
+        Notes
+        -----
+        This method executes just two queries irrespective of the number of
+        tables in a keyspace.
+        """
+        query = (
+            "select table_name, column_name, type, kind, position, clustering_order "
+            "from system_schema.columns where keyspace_name = %s"
+        )
+        columns: dict[str, list[Column]] = defaultdict(list)
+        for row in session.execute(query, (keyspace,)):
+            columns[row[0]].append(Column(*row[1:]))
+
+        query = "select * from system_schema.tables where keyspace_name = %s"
+        schemas: dict[str, TableSchema] = {}
+        for row in session.execute(query, (keyspace,)):
+            table_options = row._asdict()
+            table_name = table_options["table_name"]
+            for key in _NON_OPTION_KEYS:
+                table_options.pop(key, None)
+            table_columns = columns[table_name]
+            Column.order_columns(table_columns)
+            schemas[table_name] = TableSchema(
+                keyspace=keyspace,
+                table_name=table_name,
+                columns=table_columns,
+                table_options=table_options,
+            )
+        return schemas
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return JSON-compatible representation of the table schema.
+
+        Notes
+        -----
+        Map-valued options are converted to dictionaries and blobs to
+        hexadecimal strings.
+        """
+        return {
+            "keyspace": self.keyspace,
+            "table_name": self.table_name,
+            "columns": [dataclasses.asdict(column) for column in self.columns],
+            "table_options": _json_value(self.table_options),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> TableSchema:
+        """Make table schema from its representation returned by `to_dict`.
+
+        Parameters
+        ----------
+        data : `~collections.abc.Mapping`
+            Table schema representation.
+        """
+        return cls(
+            keyspace=data["keyspace"],
+            table_name=data["table_name"],
+            columns=[Column(**column) for column in data["columns"]],
+            table_options=dict(data["table_options"]),
+        )
+
     @property
     def partitioning_columns(self) -> list[Column]:
         """Ordered list of columns in partitiong key (`list`[`Column`])."""
@@ -126,8 +210,44 @@ class TableSchema:
         columns.sort(key=lambda column: column.position)
         return columns
 
-    def make_ddl(self) -> str:
-        """Return DDL for the table as a string."""
+    def bulk_load_options(self) -> dict[str, Any]:
+        """Return table options used while the table is being bulk-loaded.
+
+        Returns
+        -------
+        options : `dict` [`str`, `~typing.Any`]
+            Options that replace production options during bulk load. Only
+            options that differ from production options are included.
+
+        Raises
+        ------
+        ValueError
+            Raised if production options do not specify compaction.
+
+        Notes
+        -----
+        Compaction is disabled during bulk load, the compaction strategy and
+        its other parameters are kept so that once compaction is re-enabled
+        it runs the same strategy as in production. Default strategy depends
+        on cluster configuration, so production options have to specify it
+        explicitly.
+        """
+        if not (compaction := self.table_options.get("compaction")):
+            raise ValueError(f"Compaction is not specified in options of table {self.table_name}.")
+        compaction = dict(compaction)
+        compaction["enabled"] = "false"
+        return {"compaction": compaction}
+
+    def make_ddl(self, *, bulk_load: bool = False) -> str:
+        """Return DDL for the table as a string.
+
+        Parameters
+        ----------
+        bulk_load : `bool`, optional
+            If `True` then table is created with options returned from
+            `bulk_load_options`, `make_restore_ddl` returns statement to
+            restore production options after loading is done.
+        """
         # Order columns again in case column list has changed.
         Column.order_columns(self.columns)
 
@@ -161,8 +281,11 @@ class TableSchema:
             "dclocal_read_repair_chance",
             "read_repair_chance",
         }
+        table_options = self.table_options
+        if bulk_load:
+            table_options = table_options | self.bulk_load_options()
         options = []
-        for option_name, option_value in self.table_options.items():
+        for option_name, option_value in table_options.items():
             if option_name not in skip_options and option_value is not None:
                 options.append(f"{option_name} = {_quote(option_value)}")
 
@@ -174,7 +297,33 @@ class TableSchema:
             order_clause = ", ".join(column_order)
             options.append(f"CLUSTERING ORDER BY ({order_clause})")
 
-        options_str = "\n    AND ".join(options)
-        table_def = f"{table_def} WITH {options_str}"
+        if options:
+            options_str = "\n    AND ".join(options)
+            table_def = f"{table_def} WITH {options_str}"
 
         return table_def
+
+    def make_bulk_load_ddl(self) -> str:
+        """Return ALTER TABLE statement that replaces production options of
+        existing table with options returned from `bulk_load_options`.
+        """
+        options_str = " AND ".join(
+            f"{option_name} = {option_value}"
+            for option_name, option_value in self.bulk_load_options().items()
+        )
+        return f'ALTER TABLE "{self.keyspace}"."{self.table_name}" WITH {options_str}'
+
+    def make_restore_ddl(self) -> str:
+        """Return ALTER TABLE statement that restores production options
+        after the table was created with ``make_ddl(bulk_load=True)`` or
+        altered with `make_bulk_load_ddl`.
+        """
+        options = []
+        for option_name in self.bulk_load_options():
+            option_value = self.table_options[option_name]
+            if option_name == "compaction":
+                option_value = dict(option_value)
+                option_value.setdefault("enabled", "true")
+            options.append(f"{option_name} = {option_value}")
+        options_str = " AND ".join(options)
+        return f'ALTER TABLE "{self.keyspace}"."{self.table_name}" WITH {options_str}'
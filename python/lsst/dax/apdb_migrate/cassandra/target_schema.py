@@ -0,0 +1,172 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ["TargetSchema"]
+
+import dataclasses
+from typing import Any, ClassVar
+
+import yaml
+
+from .ddl import AddColumns, DdlOperation, DropColumns
+from .schema import Schema
+
+# Mapping of felis data types to CQL types, same as used by dax_apdb.
+_FELIS_TYPES = {
+    "boolean": "BOOLEAN",
+    "byte": "TINYINT",
+    "short": "SMALLINT",
+    "int": "INT",
+    "long": "BIGINT",
+    "float": "FLOAT",
+    "double": "DOUBLE",
+    "char": "TEXT",
+    "string": "TEXT",
+    "unicode": "TEXT",
+    "text": "TEXT",
+    "binary": "BLOB",
+    "timestamp": "TIMESTAMP",
+}
+
+# Columns with this prefix are added by APDB itself and are never dropped.
+_APDB_COLUMN_PREFIX = "apdb_"
+
+# Types of existing columns which are kept when schema changes their type,
+# Cassandra cannot change column types. Indexed by table name and column
+# name.
+_KEPT_COLUMN_TYPES = {
+    # schema_8.0.0 changed type to INT.
+    "DiaSource": {"bboxSize": "BIGINT"},
+}
+
+
+@dataclasses.dataclass
+class TargetSchema:
+    """Desired final state of the APDB tables.
+
+    Each table in the target schema defines the schema of all tables of the
+    same kind in the keyspace, i.e. time-partitioned and replica tables.
+    Tables that are not in the target schema (e.g. ``DiaObjectLast``) are not
+    affected.
+    """
+
+    tables: dict[str, dict[str, str]]
+    """Column types indexed by table name and column name
+    (`dict` [`str`, `dict` [`str`, `str`]]).
+    """
+
+    version: str | None = None
+    """Schema version, if known (`str` or `None`)."""
+
+    tree: ClassVar[str] = "schema"
+    """Name of the revision tree whose versions correspond to schema versions
+    (`str`).
+    """
+
+    @classmethod
+    def from_felis(cls, path: str) -> TargetSchema:
+        """Read target schema from felis YAML file.
+
+        Parameters
+        ----------
+        path : `str`
+            Path to YAML file.
+        """
+        with open(path) as file:
+            data: dict[str, Any] = yaml.safe_load(file)
+
+        tables: dict[str, dict[str, str]] = {}
+        for table in data["tables"]:
+            columns: dict[str, str] = {}
+            for column in table["columns"]:
+                datatype = column["datatype"]
+                if (cql_type := _FELIS_TYPES.get(datatype)) is None:
+                    raise ValueError(
+                        f"Unsupported data type {datatype} for column {table['name']}.{column['name']}"
+                    )
+                columns[column["name"]] = cql_type
+            tables[table["name"]] = columns
+
+        version = data.get("version")
+        if isinstance(version, dict):
+            version = version.get("current")
+        return cls(tables=tables, version=version)
+
+    def live_tables(self, schema: Schema) -> dict[str, str]:
+        """Return existing tables covered by the target schema.
+
+        Parameters
+        ----------
+        schema : `Schema`
+            Current schema of the keyspace.
+
+        Returns
+        -------
+        tables : `dict` [`str`, `str`]
+            Mapping of existing table names to the names of their tables in
+            the target schema.
+        """
+        return {
+            live_table: table_name
+            for table_name in self.tables
+            for live_table in schema.tables_for_schema(table_name)
+        }
+
+    def operations(self, schema: Schema) -> tuple[list[DdlOperation], list[DdlOperation]]:
+        """Return operations that bring existing tables to target state.
+
+        Parameters
+        ----------
+        schema : `Schema`
+            Current schema of the keyspace.
+
+        Returns
+        -------
+        additions : `list` [`DdlOperation`]
+            Operations adding missing columns.
+        drops : `list` [`DdlOperation`]
+            Operations dropping regular columns that are not in the target
+            schema, columns used by APDB internally are not dropped.
+
+        Notes
+        -----
+        Each list contains at most one operation per table, so that operations
+        in a list can be executed concurrently. Existing columns whose type
+        was changed by a schema version keep their type if Cassandra cannot
+        change it, e.g. ``DiaSource.bboxSize`` stays BIGINT.
+        """
+        additions: list[DdlOperation] = []
+        drops: list[DdlOperation] = []
+        for live_table, table_name in self.live_tables(schema).items():
+            target_columns = self.tables[table_name]
+            additions.append(AddColumns(live_table, target_columns, _KEPT_COLUMN_TYPES.get(table_name, {})))
+            extra_columns = [
+                column.column_name
+                for column in schema.table_columns(live_table)
+                if column.kind == "regular"
+                and column.column_name not in target_columns
+                and not column.column_name.startswith(_APDB_COLUMN_PREFIX)
+            ]
+            if extra_columns:
+                drops.append(DropColumns(live_table, extra_columns))
+        return additions, drops
@@ -0,0 +1,159 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ["BatchQueue"]
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import alembic.operations
+import sqlalchemy
+
+
+class BatchQueue:
+    """Batch operations on a single table which are recorded for execution
+    at a later time.
+
+    Parameters
+    ----------
+    table_name : `str`
+        Name of the table.
+    batch_kwargs : `dict` [`str`, `~typing.Any`]
+        Keyword arguments for ``batch_alter_table`` method.
+
+    Notes
+    -----
+    Instances of this class are returned from
+    `~lsst.dax.apdb_migrate.sql.context.Context.batch_alter_table` in place of
+    alembic `~alembic.operations.BatchOperations` when operations are
+    coalesced. Methods of this class have the same signatures as
+    `~alembic.operations.BatchOperations` methods. Operations are replayed
+    either one by one as regular alembic operations, or in a single
+    ``batch_alter_table`` block, which on SQLite means a single re-creation of
+    the table. In the latter case alembic refers to columns using their
+    original names, so the names of the renamed columns are translated back
+    to original names for replay.
+    """
+
+    def __init__(self, table_name: str, batch_kwargs: dict[str, Any]):
+        self.table_name = table_name
+        self.batch_kwargs = batch_kwargs
+        # Each operation is stored with its original arguments and with
+        # arguments for replay in a batch.
+        self._operations: list[tuple[str, tuple, dict[str, Any], tuple]] = []
+        # Maps current column name to its original name, only for renamed
+        # columns.
+        self._renamed: dict[str, str] = {}
+        self._added: list[str] = []
+        self._dropped: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    @property
+    def operations(self) -> list[tuple[str, tuple, dict[str, Any]]]:
+        """Recorded operations with their original arguments, as tuples of
+        method name, positional and keyword arguments
+        (`list` [`tuple`]).
+        """
+        return [(name, args, kwargs) for name, args, kwargs, _ in self._operations]
+
+    def _original(self, column_name: str) -> str:
+        """Return original name for a column."""
+        return self._renamed.get(column_name, column_name)
+
+    def _originals(self, column_names: Iterable[str]) -> list[str]:
+        """Return original names for a list of columns."""
+        return [self._original(name) for name in column_names]
+
+    def add_column(self, column: sqlalchemy.schema.Column, **kwargs: Any) -> None:
+        self._operations.append(("add_column", (column,), kwargs, (column,)))
+        self._added.append(column.name)
+
+    def drop_column(self, column_name: str, **kwargs: Any) -> None:
+        original = self._original(column_name)
+        self._operations.append(("drop_column", (column_name,), kwargs, (original,)))
+        self._renamed.pop(column_name, None)
+        self._dropped.add(original)
+
+    def alter_column(self, column_name: str, **kwargs: Any) -> None:
+        original = self._original(column_name)
+        self._operations.append(("alter_column", (column_name,), kwargs, (original,)))
+        if (new_name := kwargs.get("new_column_name")) is not None:
+            self._renamed.pop(column_name, None)
+            self._renamed[new_name] = original
+
+    def create_index(self, index_name: str, columns: Iterable[str], **kwargs: Any) -> None:
+        columns = list(columns)
+        self._operations.append(
+            ("create_index", (index_name, columns), kwargs, (index_name, self._originals(columns)))
+        )
+
+    def create_primary_key(self, constraint_name: str, columns: Iterable[str], **kwargs: Any) -> None:
+        columns = list(columns)
+        self._operations.append(
+            (
+                "create_primary_key",
+                (constraint_name, columns),
+                kwargs,
+                (constraint_name, self._originals(columns)),
+            )
+        )
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        # Other operations do not use column names, record them as they are.
+        if name.startswith("_") or not hasattr(alembic.operations.BatchOperations, name):
+            raise AttributeError(name)
+
+        def _record(*args: Any, **kwargs: Any) -> None:
+            self._operations.append((name, args, kwargs, args))
+
+        return _record
+
+    def column_names(self, column_names: Iterable[str]) -> list[str]:
+        """Return column names after applying recorded operations.
+
+        Parameters
+        ----------
+        column_names : `~collections.abc.Iterable` [`str`]
+            Names of the columns in the table before any recorded operation.
+
+        Returns
+        -------
+        column_names : `list` [`str`]
+            Names of the columns after applying recorded operations.
+        """
+        current = {original: name for name, original in self._renamed.items()}
+        names = [*column_names, *self._added]
+        return [current.get(name, name) for name in names if name not in self._dropped]
+
+    def apply(self, batch_op: alembic.operations.BatchOperations) -> None:
+        """Execute all recorded operations in a batch.
+
+        Parameters
+        ----------
+        batch_op : `alembic.operations.BatchOperations`
+            Batch operations instance.
+        """
+        for name, _, kwargs, batch_args in self._operations:
+            getattr(batch_op, name)(*batch_args, **kwargs)
@@ -24,15 +24,109 @@ from __future__ import annotations
 __all__ = ("Context",)
 
 import contextlib
-from collections.abc import Iterator
-from typing import Any, Literal
+import io
+import logging
+import math
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from datetime import datetime
+from typing import Any, Literal, NamedTuple, cast
 
 import alembic
 import alembic.operations
+import numpy as np
 import sqlalchemy
+from lsst.utils.iteration import chunk_iterable
 
 from .. import revision
 from .apdb_metadata import ApdbMetadata
+from .batch_queue import BatchQueue
+from .pragmas import pragmas_enabled, sqlite_pragmas
+
+_LOG = logging.getLogger(__name__)
+
+# Number of rows sent to database in one COPY or executemany call.
+_BULK_BATCH_SIZE = 100_000
+
+# Limits for chunk size of chunked updates.
+_MIN_CHUNK_SIZE = 1_000
+_MAX_CHUNK_SIZE = 1_000_000
+
+# SQLite versions that support DROP COLUMN and RENAME COLUMN.
+_SQLITE_DROP_COLUMN_VERSION = (3, 35)
+_SQLITE_RENAME_COLUMN_VERSION = (3, 25)
+
+# Options of alter_column that are compatible with in-place rename.
+_SQLITE_RENAME_KWARGS = {"new_column_name", "existing_type", "existing_nullable", "existing_server_default"}
+
+# Options of alter_column supported by table rebuild.
+_REBUILD_ALTER_KWARGS = {
+    "new_column_name",
+    "type_",
+    "nullable",
+    "server_default",
+    "existing_type",
+    "existing_nullable",
+    "existing_server_default",
+}
+
+# Characters that need escaping in COPY text format.
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value: Any) -> str:
+    """Convert a value to COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        return repr(value)
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_text(rows: Iterable[Sequence[Any]]) -> str:
+    """Convert rows to COPY text format."""
+    return "".join("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+
+
+def _array_rows(arrays: Mapping[str, np.ndarray]) -> Iterator[tuple]:
+    """Convert column arrays to rows of Python values, masked values are
+    converted to `None`.
+    """
+    return zip(*(array.tolist() for array in arrays.values()), strict=True)
+
+
+def _without_copy_from(kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Return batch keyword arguments excluding ``copy_from``."""
+    return {key: value for key, value in kwargs.items() if key != "copy_from"}
+
+
+class _RebuildColumn(NamedTuple):
+    """Definition of a column in a rebuilt table."""
+
+    source: sqlalchemy.sql.ColumnElement | None
+    """Expression for column value, `None` if column is filled with its
+    default value.
+    """
+
+    type: Any
+    """Column type."""
+
+    nullable: bool
+    """Nullable flag."""
+
+    server_default: Any
+    """Argument for column server default."""
+
+    comment: str | None
+    """Column comment."""
 
 
 class Context:
@@ -76,6 +170,8 @@ class Context:
         self.metadata = sqlalchemy.schema.MetaData(schema=self.schema)
         # APDB metadata interface.
         self.apdb_meta = ApdbMetadata(self.bind, self.schema)
+        # Queued batch operations per table, None when not coalescing.
+        self._batch_queues: dict[str, BatchQueue] | None = None
 
     def __enter__(self) -> Context:
         """Enter the context."""
@@ -100,6 +196,7 @@ class Context:
         table : `sqlalchemy.Table`
             Table object.
         """
+        self.flush_batches(table_name)
         if reload:
             for table in self.metadata.tables.values():
                 if table.name == table_name:
@@ -134,9 +231,943 @@ class Context:
         """Context manager for batch operations.
 
         This is a shortcut for alembic method, is main purpose is not to forget
-        to pass schema name.
+        to pass schema name. Inside `coalesce_batches` block operations are
+        queued instead of being executed immediately. On SQLite operations
+        which can be done in place with ``ALTER TABLE`` avoid re-creating the
+        table.
+        """
+        if not self.is_sqlite:
+            return alembic.op.batch_alter_table(table, schema=self.schema, **kwargs)
+        if self._batch_queues is None:
+            return self._sqlite_batch(BatchQueue(table, kwargs))
+
+        queue = self._batch_queues.get(table)
+        if queue is not None and _without_copy_from(queue.batch_kwargs) != _without_copy_from(kwargs):
+            # Different batch options cannot be merged.
+            self.flush_batches(table)
+            queue = None
+        if queue is None:
+            queue = self._batch_queues[table] = BatchQueue(table, kwargs)
+        elif "copy_from" not in queue.batch_kwargs and "copy_from" in kwargs:
+            # Tables are not updated yet, so copy_from still matches database.
+            queue.batch_kwargs["copy_from"] = kwargs["copy_from"]
+        return contextlib.nullcontext(cast(alembic.operations.BatchOperations, queue))
+
+    def set_not_null(
+        self, table_name: str, columns: Sequence[str], *, commit: bool | None = None, **kwargs: Any
+    ) -> None:
+        """Add NOT NULL constraint to table columns.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        columns : `~collections.abc.Sequence` [`str`]
+            Names of the columns.
+        commit : `bool`, optional
+            If `True` then on PostgreSQL a temporary check constraint is used
+            and each step is committed separately. If `None` (default) then
+            this is done when ``chunk-commit`` option is set to true value.
+        **kwargs
+            Additional keyword arguments for `batch_alter_table`, used when
+            columns are altered directly.
+
+        Notes
+        -----
+        On PostgreSQL ``SET NOT NULL`` scans the whole table while holding an
+        exclusive lock. To avoid that, a ``CHECK (column IS NOT NULL)``
+        constraint is added as ``NOT VALID`` first, and then validated, which
+        scans the table without blocking reads and writes. ``SET NOT NULL``
+        can then use validated constraint instead of a scan, and temporary
+        constraint is dropped. Locks are only released at commit, so this is
+        only useful when steps are committed separately, in that case changes
+        made by migration before this call are committed too. Without commits
+        columns are altered directly, like on other backends.
+        """
+        if self.is_postgres and commit is None:
+            commit = (self.get_mig_option("chunk-commit") or "").lower() in ("1", "yes", "true")
+        if not (self.is_postgres and commit):
+            with self.batch_alter_table(table_name, **kwargs) as batch_op:
+                for column in columns:
+                    batch_op.alter_column(column, nullable=False)
+            return
+
+        preparer = self.bind.dialect.identifier_preparer
+        full_table_name = preparer.quote(table_name)
+        if self.schema:
+            full_table_name = f"{preparer.quote_schema(self.schema)}.{full_table_name}"
+        checks = {column: f"{column}_not_null_tmp" for column in columns}
+
+        with self.mig_context.autocommit_block() if commit else contextlib.nullcontext():
+            for column, check in checks.items():
+                _LOG.info("Adding constraint %s to table %s", check, table_name)
+                alembic.op.create_check_constraint(
+                    check,
+                    table_name,
+                    sqlalchemy.column(column).is_not(None),
+                    schema=self.schema,
+                    postgresql_not_valid=True,
+                )
+            for check in checks.values():
+                _LOG.info("Validating constraint %s", check)
+                start_time = time.monotonic()
+                alembic.op.execute(
+                    f"ALTER TABLE {full_table_name} VALIDATE CONSTRAINT {preparer.quote(check)}"
+                )
+                _LOG.info("Validated constraint %s in %.1f sec", check, time.monotonic() - start_time)
+            for column in columns:
+                _LOG.info("Making column %s.%s non-nullable", table_name, column)
+                alembic.op.alter_column(table_name, column, nullable=False, schema=self.schema)
+            for check in checks.values():
+                alembic.op.drop_constraint(check, table_name, type_="check", schema=self.schema)
+
+    @contextlib.contextmanager
+    def suspended_indexes(
+        self, table_name: str, *, keep: Iterable[str] = (), concurrently: bool | None = None
+    ) -> Iterator[dict[str, list[str]]]:
+        """Context manager which drops table indices on entry and re-creates
+        them on exit.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        keep : `~collections.abc.Iterable` [`str`], optional
+            Names of the indices which should not be dropped, e.g. because
+            they are needed for efficient queries inside the context.
+        concurrently : `bool`, optional
+            If `True` then indices are created on PostgreSQL using
+            ``CREATE INDEX CONCURRENTLY``. If `None` (default) then concurrent
+            creation is used when ``concurrent-indexes`` option is set to true
+            value. Ignored for other backends.
+
+        Yields
+        ------
+        indices : `dict` [`str`, `list` [`str`]]
+            Dropped indices, mapping index name to the list of its columns.
+            Indices in this mapping are created on exit, it can be updated to
+            replace some indices.
+
+        Notes
+        -----
+        Only non-unique indices are dropped, unique indices are needed to
+        enforce constraints. Definitions of dropped indices are logged as a
+        warning. Indices are not re-created if an exception is raised inside
+        the context, as the transaction may be aborted; if dropping was
+        already committed (e.g. with ``chunk-commit`` option) they need to be
+        created manually. Concurrent index creation cannot run in a
+        transaction, so all changes made by migration before that are
+        committed.
+        """
+        self.flush_batches(table_name)
+        keep = set(keep)
+        with self.reflection_bind() as bind:
+            inspector = sqlalchemy.inspect(bind)
+            indices = {
+                index["name"]: [str(column) for column in index["column_names"]]
+                for index in inspector.get_indexes(table_name, self.schema)
+                if index["name"]
+                and not index["unique"]
+                and index["name"] not in keep
+                # Skip expression-based indices.
+                and None not in index["column_names"]
+            }
+        if indices:
+            # Index definitions are needed to re-create them manually if
+            # migration fails after dropped indices were committed.
+            _LOG.warning(
+                "Dropping indices of table %s, they are re-created when data update finishes: %s",
+                table_name,
+                ", ".join(f"{index_name} ({', '.join(columns)})" for index_name, columns in indices.items()),
+            )
+        for index_name in indices:
+            _LOG.info("Dropping index %s", index_name)
+            alembic.op.drop_index(index_name, table_name=table_name, schema=self.schema)
+
+        try:
+            yield indices
+        except BaseException:
+            if indices:
+                _LOG.error(
+                    "Indices of table %s were not re-created, they may need to be created manually: %s",
+                    table_name,
+                    ", ".join(indices),
+                )
+            raise
+
+        self.flush_batches(table_name)
+        kwargs: dict[str, Any] = {}
+        if self.is_postgres:
+            if concurrently is None:
+                concurrently = (self.get_mig_option("concurrent-indexes") or "").lower() in (
+                    "1",
+                    "yes",
+                    "true",
+                )
+            if concurrently:
+                kwargs["postgresql_concurrently"] = True
+        with self.mig_context.autocommit_block() if kwargs else contextlib.nullcontext():
+            start_time = time.monotonic()
+            for index_name, columns in indices.items():
+                index_start_time = time.monotonic()
+                alembic.op.create_index(index_name, table_name, columns, schema=self.schema, **kwargs)
+                _LOG.info("Created index %s in %.1f sec", index_name, time.monotonic() - index_start_time)
+        _LOG.info(
+            "Created %d indices for table %s in %.1f sec",
+            len(indices),
+            table_name,
+            time.monotonic() - start_time,
+        )
+
+    @contextlib.contextmanager
+    def rebuild_table(
+        self,
+        table_name: str,
+        *,
+        values: Mapping[str, sqlalchemy.sql.ColumnElement] | None = None,
+        rebuild: bool | None = None,
+        **kwargs: Any,
+    ) -> Iterator[alembic.operations.BatchOperations]:
+        """Context manager for batch operations which can be executed on
+        PostgreSQL by copying the table into a new one.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        values : `~collections.abc.Mapping`, optional
+            Values for the columns added inside the block, maps the name of
+            added column to SQL expression which uses columns of the table
+            returned by `get_table`.
+        rebuild : `bool`, optional
+            If `True` then table is rebuilt, otherwise operations are executed
+            in place, like with `batch_alter_table`. If `None` (default) then
+            table is rebuilt when ``table-rebuild`` option is set to true
+            value. Ignored for backends other than PostgreSQL.
+        **kwargs
+            Additional keyword arguments for `batch_alter_table`, used when
+            table is not rebuilt.
+
+        Yields
+        ------
+        batch_op : `alembic.operations.BatchOperations`
+            Object which records batch operations. Supported operations are
+            ``add_column``, ``drop_column``, ``alter_column`` (rename, type,
+            nullability, and server default), ``create_index``,
+            ``drop_index``, ``create_primary_key``, and ``drop_constraint``
+            for primary key.
+
+        Notes
+        -----
+        Changing many columns in place on PostgreSQL may rewrite the table
+        several times and leaves dead tuples behind. When table is rebuilt, a
+        new table is created with the new layout and filled with a single
+        ``INSERT ... SELECT`` query which also computes new values and column
+        types. Primary key and indices are built after the data is copied.
+        Then the old table is dropped and new table, its primary key, and
+        indices are renamed. All of this happens in the migration
+        transaction, and the old table is locked in ``SHARE`` mode for the
+        whole duration, so it can be read but not updated by other clients.
+
+        Table and column comments and index options are copied to new table,
+        but privileges granted on the old table are lost, and tables which
+        have dependent views cannot be dropped. Rebuilding needs enough disk
+        space for a copy of the table. Tables with constraints other than
+        primary key cannot be rebuilt.
+
+        When table is not rebuilt, columns which have ``values`` are added
+        first, then updated, and remaining operations are executed after
+        that.
+        """
+        table = self.get_table(table_name)
+        queue = BatchQueue(table_name, kwargs)
+        yield cast(alembic.operations.BatchOperations, queue)
+
+        values = dict(values or {})
+        added = {args[0].name for name, args, _ in queue.operations if name == "add_column"}
+        if unknown := set(values) - added:
+            raise ValueError(f"Values are provided for columns which are not added: {sorted(unknown)}")
+
+        if self.is_postgres:
+            if rebuild is None:
+                rebuild = (self.get_mig_option("table-rebuild") or "").lower() in ("1", "yes", "true")
+            if rebuild:
+                self._rebuild_postgres(table, queue, values)
+                return
+        self._rebuild_in_place(table, queue, values)
+
+    def _rebuild_layout(
+        self,
+        table: sqlalchemy.schema.Table,
+        queue: BatchQueue,
+        values: Mapping[str, sqlalchemy.sql.ColumnElement],
+    ) -> tuple[dict[str, _RebuildColumn], tuple[str, list[str]] | None, dict[str, tuple[list[str], dict]]]:
+        """Apply recorded operations to the table definition and return
+        columns, primary key, and indices of the rebuilt table. Indices are
+        returned as a list of columns and keyword arguments for
+        ``create_index``.
+        """
+        for constraint in table.constraints:
+            if not isinstance(constraint, sqlalchemy.schema.PrimaryKeyConstraint):
+                raise NotImplementedError(f"Table {table.name} has constraints, it cannot be rebuilt.")
+
+        def _server_default(column: sqlalchemy.schema.Column) -> Any:
+            default = column.server_default
+            return default.arg if isinstance(default, sqlalchemy.schema.DefaultClause) else None
+
+        columns = {
+            column.name: _RebuildColumn(
+                column, column.type, bool(column.nullable), _server_default(column), column.comment
+            )
+            for column in table.columns
+        }
+        primary_key: tuple[str, list[str]] | None = None
+        if table.primary_key.columns:
+            primary_key = (
+                str(table.primary_key.name or f"{table.name}_pkey"),
+                [column.name for column in table.primary_key.columns],
+            )
+        indices: dict[str, tuple[list[str], dict]] = {}
+        for index in table.indexes:
+            if len(index.columns) != len(index.expressions):
+                raise NotImplementedError(f"Expression-based index {index.name} cannot be rebuilt.")
+            indices[str(index.name)] = (
+                [column.name for column in index.columns],
+                {"unique": bool(index.unique), **index.dialect_kwargs},
+            )
+
+        for name, args, kwargs in queue.operations:
+            if name == "add_column":
+                column = args[0]
+                columns[column.name] = _RebuildColumn(
+                    values.get(column.name),
+                    column.type,
+                    bool(column.nullable),
+                    _server_default(column),
+                    column.comment,
+                )
+            elif name == "drop_column":
+                column_name = args[0]
+                del columns[column_name]
+                # Like in PostgreSQL, dropping a column drops its PK and
+                # indices.
+                if primary_key is not None and column_name in primary_key[1]:
+                    primary_key = None
+                indices = {key: value for key, value in indices.items() if column_name not in value[0]}
+            elif name == "alter_column" and set(kwargs) <= _REBUILD_ALTER_KWARGS:
+                column_name = args[0]
+                column = columns[column_name]
+                if "type_" in kwargs:
+                    source = column.source
+                    if source is not None:
+                        source = sqlalchemy.cast(source, kwargs["type_"])
+                    column = column._replace(source=source, type=kwargs["type_"])
+                if "nullable" in kwargs:
+                    column = column._replace(nullable=kwargs["nullable"])
+                if "server_default" in kwargs:
+                    column = column._replace(server_default=kwargs["server_default"])
+                new_name = kwargs.get("new_column_name") or column_name
+                columns = {
+                    (new_name if key == column_name else key): (column if key == column_name else value)
+                    for key, value in columns.items()
+                }
+                if primary_key is not None:
+                    primary_key = (
+                        primary_key[0],
+                        [new_name if key == column_name else key for key in primary_key[1]],
+                    )
+                indices = {
+                    index_name: ([new_name if key == column_name else key for key in index_columns], options)
+                    for index_name, (index_columns, options) in indices.items()
+                }
+            elif name == "create_index" and all(
+                key == "unique" or key.startswith("postgresql_") for key in kwargs
+            ):
+                indices[args[0]] = (list(args[1]), kwargs)
+            elif name == "drop_index":
+                del indices[args[0]]
+            elif name == "create_primary_key":
+                primary_key = (args[0], list(args[1]))
+            elif name == "drop_constraint" and primary_key is not None and args[0] == primary_key[0]:
+                primary_key = None
+            else:
+                raise NotImplementedError(f"Operation {name}{args} is not supported for table rebuild.")
+
+        return columns, primary_key, indices
+
+    def _rebuild_postgres(
+        self,
+        table: sqlalchemy.schema.Table,
+        queue: BatchQueue,
+        values: Mapping[str, sqlalchemy.sql.ColumnElement],
+    ) -> None:
+        """Rebuild PostgreSQL table by copying its data into a new table."""
+        columns, primary_key, indices = self._rebuild_layout(table, queue, values)
+        table_name = table.name
+        new_table_name = f"{table_name}_rebuild"
+        # Names of PK and indices on new table must differ from existing
+        # names, they are renamed when old table is dropped.
+        tmp_pk_name = f"{new_table_name}_pkey"
+        tmp_index_names = {index_name: f"{new_table_name}_idx{i}" for i, index_name in enumerate(indices)}
+
+        preparer = self.bind.dialect.identifier_preparer
+        schema_prefix = f"{preparer.quote_schema(self.schema)}." if self.schema else ""
+
+        start_time = time.monotonic()
+        # Data must not change while it is copied and until the table is
+        # replaced, reading is still allowed.
+        alembic.op.execute(f"LOCK TABLE {schema_prefix}{preparer.quote(table_name)} IN SHARE MODE")
+        # Table may remain from interrupted migration.
+        alembic.op.drop_table(new_table_name, schema=self.schema, if_exists=True)
+        _LOG.info("Creating table %s with %d columns", new_table_name, len(columns))
+        new_table = alembic.op.create_table(
+            new_table_name,
+            *[
+                sqlalchemy.schema.Column(
+                    name,
+                    column.type,
+                    nullable=column.nullable,
+                    server_default=column.server_default,
+                    comment=column.comment,
+                )
+                for name, column in columns.items()
+            ],
+            schema=self.schema,
+            comment=table.comment,
+        )
+        sources = {name: column.source for name, column in columns.items() if column.source is not None}
+        query = sqlalchemy.select(*sources.values()).select_from(table)
+        step_start_time = time.monotonic()
+        alembic.op.execute(new_table.insert().from_select(list(sources), query))
+        _LOG.info("Copied data to table %s in %.1f sec", new_table_name, time.monotonic() - step_start_time)
+
+        if primary_key is not None:
+            step_start_time = time.monotonic()
+            alembic.op.create_primary_key(tmp_pk_name, new_table_name, primary_key[1], schema=self.schema)
+            _LOG.info(
+                "Created primary key %s in %.1f sec", primary_key[0], time.monotonic() - step_start_time
+            )
+        for index_name, (index_columns, options) in indices.items():
+            step_start_time = time.monotonic()
+            alembic.op.create_index(
+                tmp_index_names[index_name], new_table_name, index_columns, schema=self.schema, **options
+            )
+            _LOG.info("Created index %s in %.1f sec", index_name, time.monotonic() - step_start_time)
+
+        # Swap tables, these are quick catalog updates.
+        _LOG.info("Replacing table %s with %s", table_name, new_table_name)
+        alembic.op.drop_table(table_name, schema=self.schema)
+        alembic.op.rename_table(new_table_name, table_name, schema=self.schema)
+        if primary_key is not None:
+            alembic.op.execute(
+                f"ALTER TABLE {schema_prefix}{preparer.quote(table_name)} "
+                f"RENAME CONSTRAINT {preparer.quote(tmp_pk_name)} TO {preparer.quote(primary_key[0])}"
+            )
+        for index_name, tmp_index_name in tmp_index_names.items():
+            alembic.op.execute(
+                f"ALTER INDEX {schema_prefix}{preparer.quote(tmp_index_name)} "
+                f"RENAME TO {preparer.quote(index_name)}"
+            )
+        self.metadata.remove(table)
+        _LOG.info("Rebuilt table %s in %.1f sec", table_name, time.monotonic() - start_time)
+
+    def _rebuild_in_place(
+        self,
+        table: sqlalchemy.schema.Table,
+        queue: BatchQueue,
+        values: Mapping[str, sqlalchemy.sql.ColumnElement],
+    ) -> None:
+        """Execute operations recorded by `rebuild_table` using batch
+        operations, updating added columns in between.
         """
-        return alembic.op.batch_alter_table(table, schema=self.schema, **kwargs)
+        operations = queue.operations
+        batch_kwargs = queue.batch_kwargs
+        if values:
+            # Table is modified, so copy_from does not match it after this.
+            batch_kwargs = _without_copy_from(batch_kwargs)
+            with self.batch_alter_table(table.name, **batch_kwargs) as batch_op:
+                for name, args, kwargs in operations:
+                    if name == "add_column" and args[0].name in values:
+                        batch_op.add_column(*args, **kwargs)
+                        table.append_column(sqlalchemy.schema.Column(args[0].name, args[0].type))
+            self.flush_batches(table.name)
+            _LOG.info("Updating columns %s in table %s", list(values), table.name)
+            with self.sqlite_pragmas():
+                self.bind.execute(table.update().values(values))
+            operations = [
+                (name, args, kwargs)
+                for name, args, kwargs in operations
+                if not (name == "add_column" and args[0].name in values)
+            ]
+
+        with self.batch_alter_table(table.name, **batch_kwargs) as batch_op:
+            for name, args, kwargs in operations:
+                getattr(batch_op, name)(*args, **kwargs)
+        self.metadata.remove(table)
+
+    @contextlib.contextmanager
+    def coalesce_batches(self) -> Iterator[None]:
+        """Context manager which merges batch operations on the same table.
+
+        Notes
+        -----
+        On SQLite each ``batch_alter_table`` block re-creates the table and
+        copies all its data. Inside this context batch operations are queued
+        per table and executed as one ``batch_alter_table`` block when the
+        context exits, when `flush_batches` is called, or before data in the
+        table is accessed via methods of this class (`get_table`,
+        `update_from`, `chunked_update`, `bulk_insert`). Migration scripts
+        that execute queries directly must call `flush_batches` first, and
+        should use `get_column_names` to check table columns.
+
+        On other backends batch operations are not queued, as they are
+        executed as individual ALTER statements.
+        """
+        if not self.is_sqlite or self._batch_queues is not None:
+            yield
+            return
+        self._batch_queues = {}
+        try:
+            yield
+            self.flush_batches()
+        finally:
+            self._batch_queues = None
+
+    def flush_batches(self, *table_names: str) -> None:
+        """Execute queued batch operations.
+
+        Parameters
+        ----------
+        *table_names : `str`
+            Names of the tables for which to execute operations, if not
+            specified then operations for all tables are executed.
+        """
+        if not self._batch_queues:
+            return
+        for table_name in table_names or list(self._batch_queues):
+            if (queue := self._batch_queues.pop(table_name, None)) is not None:
+                self._execute_batch(queue)
+
+    @contextlib.contextmanager
+    def _sqlite_batch(self, queue: BatchQueue) -> Iterator[alembic.operations.BatchOperations]:
+        """Record batch operations and execute them on exit."""
+        yield cast(alembic.operations.BatchOperations, queue)
+        self._execute_batch(queue)
+
+    def _execute_batch(self, queue: BatchQueue) -> None:
+        """Execute queued batch operations, in place if possible."""
+        if not queue:
+            return
+        with self.sqlite_pragmas():
+            if self._can_alter_in_place(queue):
+                _LOG.info(
+                    "Executing %d queued batch operations for table %s in place", len(queue), queue.table_name
+                )
+                for name, args, kwargs in queue.operations:
+                    if name == "create_index":
+                        alembic.op.create_index(
+                            args[0], queue.table_name, args[1], schema=self.schema, **kwargs
+                        )
+                    elif name == "drop_index":
+                        alembic.op.drop_index(
+                            args[0], table_name=queue.table_name, schema=self.schema, **kwargs
+                        )
+                    else:
+                        getattr(alembic.op, name)(queue.table_name, *args, schema=self.schema, **kwargs)
+            else:
+                _LOG.info("Executing %d queued batch operations for table %s", len(queue), queue.table_name)
+                with alembic.op.batch_alter_table(
+                    queue.table_name, schema=self.schema, **queue.batch_kwargs
+                ) as op:
+                    queue.apply(op)
+
+    def _can_alter_in_place(self, queue: BatchQueue) -> bool:
+        """Check that all queued operations can be executed on SQLite with
+        ``ALTER TABLE`` without re-creating the table.
+        """
+        if queue.batch_kwargs.get("recreate", "auto") != "auto":
+            return False
+        version = self.bind.dialect.server_version_info or (0,)
+        with self.reflection_bind() as bind:
+            inspector = sqlalchemy.inspect(bind)
+            # Columns that cannot be dropped by SQLite.
+            fixed = set(inspector.get_pk_constraint(queue.table_name, self.schema)["constrained_columns"])
+            for fk in inspector.get_foreign_keys(queue.table_name, self.schema):
+                fixed.update(fk["constrained_columns"])
+            for unique in inspector.get_unique_constraints(queue.table_name, self.schema):
+                fixed.update(unique["column_names"])
+            indices = {
+                index["name"]: list(index["column_names"])
+                for index in inspector.get_indexes(queue.table_name, self.schema)
+            }
+
+        for name, args, kwargs in queue.operations:
+            if name == "add_column":
+                column = args[0]
+                default = column.server_default
+                if column.primary_key or column.unique or (not column.nullable and default is None):
+                    return False
+                if default is not None and not (
+                    isinstance(default, sqlalchemy.schema.DefaultClause) and isinstance(default.arg, str)
+                ):
+                    return False
+            elif name == "drop_column":
+                column_name = args[0]
+                if version < _SQLITE_DROP_COLUMN_VERSION or column_name in fixed:
+                    return False
+                if any(column_name in columns for columns in indices.values()):
+                    return False
+            elif name == "alter_column":
+                if version < _SQLITE_RENAME_COLUMN_VERSION or "new_column_name" not in kwargs:
+                    return False
+                if not set(kwargs) <= _SQLITE_RENAME_KWARGS:
+                    return False
+                old_name, new_name = args[0], kwargs["new_column_name"]
+                if old_name in fixed:
+                    fixed.remove(old_name)
+                    fixed.add(new_name)
+                for columns in indices.values():
+                    columns[:] = [new_name if column == old_name else column for column in columns]
+            elif name == "create_index":
+                indices[args[0]] = list(args[1])
+            elif name == "drop_index":
+                indices.pop(args[0], None)
+            else:
+                return False
+        return True
+
+    @contextlib.contextmanager
+    def sqlite_pragmas(self) -> Iterator[None]:
+        """Context manager which configures SQLite connection for bulk data
+        operations.
+
+        Notes
+        -----
+        Migration environment applies the same profile to the whole
+        connection before alembic starts a transaction, in that case this
+        method does nothing. Otherwise see `.pragmas.sqlite_pragmas`, inside
+        a transaction only some settings can be changed. Profile can be
+        disabled with ``sqlite-pragmas=0`` option. This method does nothing
+        for other backends.
+        """
+        with sqlite_pragmas(self.bind, pragmas_enabled(self.get_mig_option("sqlite-pragmas"))):
+            yield
+
+    def get_column_names(self, table_name: str) -> list[str]:
+        """Return names of the table columns, including effects of queued
+        batch operations.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+
+        Returns
+        -------
+        column_names : `list` [`str`]
+            Names of the columns.
+        """
+        with self.reflection_bind() as bind:
+            inspector = sqlalchemy.inspect(bind)
+            column_names = [column["name"] for column in inspector.get_columns(table_name, self.schema)]
+        if self._batch_queues and (queue := self._batch_queues.get(table_name)) is not None:
+            column_names = queue.column_names(column_names)
+        return column_names
+
+    def create_staging_table(
+        self, table_name: str, *columns: sqlalchemy.schema.Column, temporary: bool = True
+    ) -> sqlalchemy.schema.Table:
+        """Create a table for intermediate data used by migration.
+
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the table.
+        *columns : `sqlalchemy.schema.Column`
+            Table columns.
+        temporary : `bool`, optional
+            If `True` then temporary table is created, it is only visible to
+            the migration connection and is dropped automatically. Otherwise
+            table is created in migrated schema, on PostgreSQL it is created
+            as UNLOGGED table, and it has to be dropped by migration.
+
+        Returns
+        -------
+        table : `sqlalchemy.schema.Table`
+            Created table.
+
+        Notes
+        -----
+        Neither temporary nor UNLOGGED tables are written to write-ahead log
+        on PostgreSQL, so they are cheap to fill, but their contents is lost
+        after a crash. They should only be used for data that can be
+        re-created by re-running the migration.
+        """
+        if temporary:
+            table = sqlalchemy.schema.Table(
+                table_name,
+                self.metadata,
+                *columns,
+                prefixes=["TEMPORARY"],
+                schema=sqlalchemy.schema.BLANK_SCHEMA,
+            )
+        else:
+            prefixes = ["UNLOGGED"] if self.is_postgres else []
+            table = sqlalchemy.schema.Table(
+                table_name, self.metadata, *columns, prefixes=prefixes, schema=self.schema
+            )
+        table.create(self.bind)
+        return table
+
+    def bulk_insert(
+        self,
+        table: sqlalchemy.schema.Table,
+        rows: Iterable[Sequence[Any]] | Mapping[str, np.ndarray],
+        *,
+        columns: Sequence[str] | None = None,
+    ) -> int:
+        """Insert large number of rows into a table.
+
+        Parameters
+        ----------
+        table : `sqlalchemy.schema.Table`
+            Table to insert into.
+        rows : `~collections.abc.Iterable` or `~collections.abc.Mapping`
+            Either an iterable of rows, each row is a sequence of values in
+            the order of ``columns``, or a mapping of column name to a NumPy
+            array of column values. Masked values in masked arrays are
+            inserted as NULL.
+        columns : `~collections.abc.Sequence` [`str`], optional
+            Names of the columns matching values in ``rows``. If not
+            specified then mapping keys or all table columns are used.
+
+        Returns
+        -------
+        count : `int`
+            Number of inserted rows.
+
+        Notes
+        -----
+        On PostgreSQL with psycopg2 or psycopg drivers rows are loaded with
+        ``COPY FROM STDIN``, on other backends rows are inserted using
+        ``executemany``. In both cases data is sent in batches, all within
+        the migration transaction.
+        """
+        self.flush_batches(table.name)
+        if isinstance(rows, Mapping):
+            if columns is None:
+                columns = list(rows)
+            rows = _array_rows(rows)
+        elif columns is None:
+            columns = [column.name for column in table.columns]
+
+        copy = self._copy_function(table, columns)
+        count = 0
+        with self.sqlite_pragmas():
+            for batch in chunk_iterable(rows, _BULK_BATCH_SIZE):
+                if copy is not None:
+                    copy(batch)
+                else:
+                    self.bind.execute(table.insert(), [dict(zip(columns, row, strict=True)) for row in batch])
+                count += len(batch)
+                _LOG.debug("Inserted %d rows into %s", count, table.name)
+        return count
+
+    def update_from(
+        self,
+        target: sqlalchemy.schema.Table,
+        source: sqlalchemy.sql.FromClause,
+        *,
+        on: Sequence[str] | Mapping[str, str],
+        values: Mapping[str, str | sqlalchemy.sql.ColumnElement],
+    ) -> int:
+        """Update columns of a table from matching rows of another table or
+        subquery.
+
+        Parameters
+        ----------
+        target : `sqlalchemy.schema.Table`
+            Table to update.
+        source : `sqlalchemy.sql.FromClause`
+            Table or subquery providing new values, it must have at most one
+            row matching each target row.
+        on : `~collections.abc.Sequence` [`str`] or \
+                `~collections.abc.Mapping` [`str`, `str`]
+            Columns used to match rows, either a list of column names which
+            are the same in both tables, or a mapping of target column name
+            to source column name.
+        values : `~collections.abc.Mapping`
+            Mapping of target column name to either source column name or an
+            expression which can use source columns.
+
+        Returns
+        -------
+        count : `int`
+            Number of updated rows.
+
+        Notes
+        -----
+        All columns are updated with a single ``UPDATE ... FROM`` statement,
+        which databases usually execute as a single join of two tables. Rows
+        in target table that have no match in source are not updated. On
+        SQLite older than 3.33, which does not support ``UPDATE ... FROM``,
+        an equivalent statement with correlated subqueries is used.
+        """
+        self.flush_batches(*(table.name for table in (target, source) if isinstance(table, sqlalchemy.Table)))
+        if not isinstance(on, Mapping):
+            on = {name: name for name in on}
+        on_clause = sqlalchemy.and_(
+            *(target.columns[name] == source.columns[source_name] for name, source_name in on.items())
+        )
+        exprs = {
+            name: source.columns[value] if isinstance(value, str) else value for name, value in values.items()
+        }
+
+        if self.is_sqlite and (self.bind.dialect.server_version_info or (0,)) < (3, 33):
+            # Each subquery is correlated to target table, EXISTS makes sure
+            # that rows without a match are not updated.
+            exprs = {
+                name: sqlalchemy.select(expr).where(on_clause).correlate_except(source).scalar_subquery()
+                for name, expr in exprs.items()
+            }
+            on_clause = sqlalchemy.exists().where(on_clause).correlate_except(source)
+
+        with self.sqlite_pragmas():
+            result = self.bind.execute(target.update().values(exprs).where(on_clause))
+        _LOG.debug("Updated %d rows in %s", result.rowcount, target.name)
+        return result.rowcount
+
+    def chunked_update(
+        self,
+        update: sqlalchemy.sql.Update,
+        *,
+        key: str | None = None,
+        chunk_size: int = 10_000,
+        target_seconds: float = 1.0,
+        commit: bool | None = None,
+    ) -> int:
+        """Execute UPDATE statement in chunks of consecutive key values.
+
+        Parameters
+        ----------
+        update : `sqlalchemy.sql.Update`
+            Update statement, it can have its own WHERE clause, which is
+            combined with the key range of each chunk.
+        key : `str`, optional
+            Name of the column used to split the table into chunks, must be
+            indexed. By default the first primary key column is used.
+        chunk_size : `int`, optional
+            Initial number of key values in one chunk.
+        target_seconds : `float`, optional
+            Desired execution time of a single chunk, chunk size is adjusted
+            after each chunk to approach this time.
+        commit : `bool`, optional
+            If `True` then each chunk is committed separately. If `None`
+            (default) then chunks are committed when ``chunk-commit`` option
+            is set to true value.
+
+        Returns
+        -------
+        count : `int`
+            Total number of updated rows.
+
+        Notes
+        -----
+        Key boundaries are found by walking key column index in order, which
+        keeps each chunk cheap to locate regardless of the table size. When
+        chunks are committed, the changes made by migration script before this
+        call are committed too, and the update has to be idempotent as the
+        migration may be interrupted and re-started after some chunks were
+        committed.
+        """
+        table = update.table
+        assert isinstance(table, sqlalchemy.schema.Table), "Update must be for a single table"
+        self.flush_batches(table.name)
+        if key is None:
+            key_column = list(table.primary_key.columns)[0]
+        else:
+            key_column = table.columns[key]
+        if commit is None:
+            commit = (self.get_mig_option("chunk-commit") or "").lower() in ("1", "yes", "true")
+
+        with (
+            self.mig_context.autocommit_block() if commit else contextlib.nullcontext(),
+            self.sqlite_pragmas(),
+        ):
+            count = 0
+            n_chunks = 0
+            start_time = time.monotonic()
+            last: Any = None
+            while True:
+                # Find upper boundary of the chunk.
+                query = sqlalchemy.select(key_column).order_by(key_column).offset(chunk_size - 1).limit(1)
+                if last is not None:
+                    query = query.where(key_column > last)
+                upper = self.bind.execute(query).scalar()
+
+                where = []
+                if last is not None:
+                    where.append(key_column > last)
+                if upper is not None:
+                    where.append(key_column <= upper)
+                chunk_start = time.monotonic()
+                result = self.bind.execute(update.where(*where))
+                chunk_time = time.monotonic() - chunk_start
+                count += result.rowcount
+                n_chunks += 1
+                _LOG.debug(
+                    "Updated %d rows in %s chunk %d (size=%d, %.3f sec)",
+                    result.rowcount,
+                    table.name,
+                    n_chunks,
+                    chunk_size,
+                    chunk_time,
+                )
+                if upper is None:
+                    break
+                last = upper
+
+                # Tune chunk size, but not by more than factor 2 at once.
+                factor = min(max(target_seconds / max(chunk_time, 1e-3), 0.5), 2.0)
+                chunk_size = min(max(int(chunk_size * factor), _MIN_CHUNK_SIZE), _MAX_CHUNK_SIZE)
+
+        _LOG.info(
+            "Updated %d rows in %s using %d chunks in %.1f sec",
+            count,
+            table.name,
+            n_chunks,
+            time.monotonic() - start_time,
+        )
+        return count
+
+    def _copy_function(
+        self, table: sqlalchemy.schema.Table, columns: Sequence[str]
+    ) -> Callable[[Sequence[Sequence[Any]]], None] | None:
+        """Return function that loads rows with COPY, or `None` if COPY is
+        not supported.
+        """
+        if not self.is_postgres:
+            return None
+        preparer = self.bind.dialect.identifier_preparer
+        column_list = ", ".join(preparer.quote(column) for column in columns)
+        sql = f"COPY {preparer.format_table(table)} ({column_list}) FROM STDIN"
+        dbapi_connection: Any = self.bind.connection.dbapi_connection
+        driver = self.bind.dialect.driver
+
+        def _copy_psycopg2(batch: Sequence[Sequence[Any]]) -> None:
+            with dbapi_connection.cursor() as cursor:
+                cursor.copy_expert(sql, io.StringIO(_copy_text(batch)))
+
+        def _copy_psycopg(batch: Sequence[Sequence[Any]]) -> None:
+            with dbapi_connection.cursor() as cursor, cursor.copy(sql) as copy:
+                for row in batch:
+                    copy.write_row(row)
+
+        if driver == "psycopg2":
+            return _copy_psycopg2
+        elif driver == "psycopg":
+            return _copy_psycopg
+        return None
 
     @contextlib.contextmanager
     def reflection_bind(self) -> Iterator[sqlalchemy.engine.Connection]:
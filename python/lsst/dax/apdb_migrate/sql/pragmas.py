@@ -0,0 +1,128 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""SQLite connection settings for bulk data operations."""
+
+from __future__ import annotations
+
+__all__ = ["pragmas_enabled", "sqlite_pragmas"]
+
+import contextlib
+import logging
+from collections.abc import Iterator
+from typing import Any
+
+import sqlalchemy
+
+_LOG = logging.getLogger(__name__)
+
+# SQLite settings used during bulk data operations.
+_SQLITE_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": "-262144",
+    "temp_store": "MEMORY",
+}
+
+# Key in connection info dictionary, present when profile is in effect.
+_ACTIVE_KEY = "apdb_migrate_sqlite_pragmas"
+
+
+def pragmas_enabled(option: str | None) -> bool:
+    """Return `True` unless ``sqlite-pragmas`` option disables the profile.
+
+    Parameters
+    ----------
+    option : `str` or `None`
+        Value of the ``sqlite-pragmas`` migration option.
+    """
+    return (option or "").lower() not in ("0", "no", "false")
+
+
+def _can_set(connection: sqlalchemy.engine.Connection, pragma: str) -> bool:
+    """Return `True` if pragma can be changed in the current connection
+    state.
+    """
+    if pragma == "cache_size":
+        return True
+    dbapi_connection: Any = connection.connection.dbapi_connection
+    if dbapi_connection.in_transaction:
+        return False
+    if pragma == "temp_store":
+        query = "SELECT COUNT(*) FROM sqlite_temp_master WHERE type = 'table'"
+        return connection.exec_driver_sql(query).scalar() == 0
+    return True
+
+
+@contextlib.contextmanager
+def sqlite_pragmas(connection: sqlalchemy.engine.Connection, enabled: bool = True) -> Iterator[None]:
+    """Context manager which configures SQLite connection for bulk data
+    operations.
+
+    Parameters
+    ----------
+    connection : `sqlalchemy.engine.Connection`
+        Database connection.
+    enabled : `bool`, optional
+        If `False` then connection settings are not changed.
+
+    Notes
+    -----
+    Settings are changed according to a profile which favors speed over
+    durability (in-memory journal, no syncing, large cache, temporary storage
+    in memory), database has to be backed up before migration. Original
+    settings are restored on exit. Except for cache size, these settings
+    cannot be changed inside a transaction, and temporary storage cannot be
+    changed when temporary tables exist. This should be entered right after
+    connecting, before any transaction starts; settings that cannot be changed
+    or restored are reported with a warning. Nested calls, and calls for other
+    backends, do nothing.
+    """
+    if connection.dialect.name != "sqlite" or not enabled or connection.info.get(_ACTIVE_KEY):
+        yield
+        return
+
+    original: dict[str, Any] = {}
+    in_transaction = connection.in_transaction()
+    for pragma, value in _SQLITE_PRAGMAS.items():
+        if _can_set(connection, pragma):
+            original[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+        else:
+            _LOG.warning("Cannot set SQLite pragma %s now, skipping", pragma)
+    if not in_transaction:
+        # Finish transaction that SQLAlchemy started implicitly, alembic
+        # needs to start its own.
+        connection.commit()
+    connection.info[_ACTIVE_KEY] = True
+    try:
+        yield
+    finally:
+        del connection.info[_ACTIVE_KEY]
+        in_transaction = connection.in_transaction()
+        for pragma, value in original.items():
+            if _can_set(connection, pragma):
+                connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+            else:
+                _LOG.warning("Cannot restore SQLite pragma %s, it remains in effect until disconnect", pragma)
+        if not in_transaction:
+            connection.commit()
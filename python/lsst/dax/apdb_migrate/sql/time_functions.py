@@ -0,0 +1,227 @@
+# This file is part of dax_apdb.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""SQL expressions for conversion between timestamps and MJD."""
+
+from __future__ import annotations
+
+__all__ = [
+    "LEAP_SECONDS_TABLE",
+    "create_leap_seconds_table",
+    "leap_seconds",
+    "mjd_to_timestamp",
+    "timestamp_to_mjd",
+]
+
+from typing import Any, Literal
+
+import erfa
+import sqlalchemy
+
+LEAP_SECONDS_TABLE = "_apdb_migrate_leap_seconds"
+"""Default name of the leap seconds lookup table."""
+
+# MJD of 1970-01-01.
+_MJD_UNIX_EPOCH = 40587
+_SECONDS_PER_DAY = 86400.0
+# Leap seconds are only well defined since 1972, before that TAI-UTC
+# difference was not an integer number of seconds.
+_FIRST_LEAP_YEAR = 1972
+
+
+def leap_seconds() -> list[tuple[float, float, float]]:
+    """Return the table of leap seconds.
+
+    Returns
+    -------
+    leap_seconds : `list` [`tuple`]
+        List of tuples (UTC MJD, TAI MJD, TAI-UTC in seconds), one for each
+        change of TAI-UTC difference since 1972, ordered by time.
+    """
+    table = []
+    for year, month, tai_utc in erfa.leap_seconds.get():
+        if year < _FIRST_LEAP_YEAR:
+            continue
+        # Changes happen on the first day of the month at 00:00 UTC.
+        utc_mjd = float(erfa.cal2jd(year, month, 1)[1])
+        table.append((utc_mjd, utc_mjd + tai_utc / _SECONDS_PER_DAY, float(tai_utc)))
+    return table
+
+
+def create_leap_seconds_table(
+    connection: sqlalchemy.engine.Connection,
+    metadata: sqlalchemy.schema.MetaData,
+    name: str = LEAP_SECONDS_TABLE,
+) -> sqlalchemy.schema.Table:
+    """Create and populate a temporary lookup table with leap seconds.
+
+    Parameters
+    ----------
+    connection : `sqlalchemy.engine.Connection`
+        Database connection.
+    metadata : `sqlalchemy.schema.MetaData`
+        Metadata to add the table to.
+    name : `str`, optional
+        Name of the table.
+
+    Returns
+    -------
+    table : `sqlalchemy.schema.Table`
+        Lookup table, it is only visible to the same connection.
+    """
+    table = sqlalchemy.schema.Table(
+        name,
+        metadata,
+        sqlalchemy.schema.Column("utc_mjd", sqlalchemy.types.Double, primary_key=True),
+        sqlalchemy.schema.Column("tai_mjd", sqlalchemy.types.Double, nullable=False),
+        sqlalchemy.schema.Column("tai_utc", sqlalchemy.types.Double, nullable=False),
+        prefixes=["TEMPORARY"],
+        schema=sqlalchemy.schema.BLANK_SCHEMA,
+    )
+    table.create(connection)
+    rows = [
+        {"utc_mjd": utc_mjd, "tai_mjd": tai_mjd, "tai_utc": tai_utc}
+        for utc_mjd, tai_mjd, tai_utc in leap_seconds()
+    ]
+    connection.execute(table.insert(), rows)
+    return table
+
+
+def _tai_utc(
+    leap_table: sqlalchemy.schema.Table, column: Literal["utc_mjd", "tai_mjd"], mjd: Any
+) -> sqlalchemy.ColumnElement:
+    """Return expression for TAI-UTC difference in days at a given MJD."""
+    return (
+        sqlalchemy.select(leap_table.columns["tai_utc"])
+        .where(leap_table.columns[column] <= mjd)
+        .order_by(leap_table.columns[column].desc())
+        .limit(1)
+        .correlate_except(leap_table)
+        .scalar_subquery()
+        / _SECONDS_PER_DAY
+    )
+
+
+def timestamp_to_mjd(
+    column: sqlalchemy.ColumnElement,
+    dialect: str,
+    *,
+    scale: Literal["tai", "utc"] = "tai",
+    leap_table: sqlalchemy.schema.Table | None = None,
+) -> sqlalchemy.ColumnElement:
+    """Return expression converting TIMESTAMP to MJD TAI.
+
+    Parameters
+    ----------
+    column : `sqlalchemy.ColumnElement`
+        Expression of TIMESTAMP type, time zone is ignored.
+    dialect : `str`
+        Dialect name, "postgresql" or "sqlite".
+    scale : `str`, optional
+        Time scale of timestamps, "tai" or "utc".
+    leap_table : `sqlalchemy.schema.Table`, optional
+        Table returned from `create_leap_seconds_table`, required for
+        "utc" scale.
+
+    Returns
+    -------
+    expression : `sqlalchemy.ColumnElement`
+        Expression of double precision type, NULL timestamps are converted
+        to NULL.
+
+    Notes
+    -----
+    Conversion is exact to a microsecond. With "tai" scale this is the same
+    as ``Time(timestamp, format="datetime", scale="tai").mjd`` in astropy.
+    Timestamps in SQLite are stored as strings, fractional seconds are
+    converted separately because SQLite date functions only keep
+    milliseconds.
+    """
+    mjd: sqlalchemy.ColumnElement
+    if dialect == "postgresql":
+        seconds = sqlalchemy.extract("epoch", column)
+        mjd = sqlalchemy.cast(seconds, sqlalchemy.types.Double) / _SECONDS_PER_DAY + _MJD_UNIX_EPOCH
+    elif dialect == "sqlite":
+        whole = sqlalchemy.cast(
+            sqlalchemy.func.strftime("%s", sqlalchemy.func.substr(column, 1, 19)), sqlalchemy.types.Integer
+        )
+        fraction = sqlalchemy.cast(sqlalchemy.func.substr(column, 20), sqlalchemy.types.Double)
+        mjd = (whole + fraction) / _SECONDS_PER_DAY + _MJD_UNIX_EPOCH
+    else:
+        raise ValueError(f"Unsupported dialect: {dialect}")
+    if scale == "utc":
+        if leap_table is None:
+            raise ValueError("Leap seconds table is required for UTC timestamps.")
+        mjd = mjd + _tai_utc(leap_table, "utc_mjd", mjd)
+    return mjd
+
+
+def mjd_to_timestamp(
+    column: sqlalchemy.ColumnElement,
+    dialect: str,
+    *,
+    scale: Literal["tai", "utc"] = "tai",
+    leap_table: sqlalchemy.schema.Table | None = None,
+) -> sqlalchemy.ColumnElement:
+    """Return expression converting MJD TAI to TIMESTAMP.
+
+    Parameters
+    ----------
+    column : `sqlalchemy.ColumnElement`
+        Expression of floating point type with MJD TAI values.
+    dialect : `str`
+        Dialect name, "postgresql" or "sqlite".
+    scale : `str`, optional
+        Time scale of the resulting timestamps, "tai" or "utc".
+    leap_table : `sqlalchemy.schema.Table`, optional
+        Table returned from `create_leap_seconds_table`, required for
+        "utc" scale.
+
+    Returns
+    -------
+    expression : `sqlalchemy.ColumnElement`
+        Expression for a timestamp without time zone, in SQLite this is a
+        string in the format used by SQLAlchemy. NULL values are converted
+        to NULL.
+
+    Notes
+    -----
+    Values are rounded to a microsecond. SQLite expression only supports
+    times after 1970-01-01.
+    """
+    mjd = column
+    if scale == "utc":
+        if leap_table is None:
+            raise ValueError("Leap seconds table is required for UTC timestamps.")
+        mjd = mjd - _tai_utc(leap_table, "tai_mjd", mjd)
+    seconds = (mjd - _MJD_UNIX_EPOCH) * _SECONDS_PER_DAY
+    if dialect == "postgresql":
+        return sqlalchemy.func.timezone("UTC", sqlalchemy.func.to_timestamp(seconds))
+    elif dialect == "sqlite":
+        microseconds = sqlalchemy.cast(sqlalchemy.func.round(seconds * 1e6), sqlalchemy.types.Integer)
+        whole = sqlalchemy.func.strftime(
+            "%Y-%m-%d %H:%M:%S", microseconds // 1_000_000, "unixepoch", type_=sqlalchemy.types.String
+        )
+        fraction = sqlalchemy.func.printf(".%06d", microseconds % 1_000_000, type_=sqlalchemy.types.String)
+        return whole + fraction
+    else:
+        raise ValueError(f"Unsupported dialect: {dialect}")
@@ -0,0 +1,47 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+
+from lsst.dax.apdb_migrate.cassandra.backfill import BackfillJob
+
+
+class BackfillJobTestCase(unittest.TestCase):
+    """Tests for backfill module."""
+
+    def test_job(self) -> None:
+        """Test BackfillJob methods."""
+        job = BackfillJob(revision="schema_9.1.0", units=["DiaObject_12", "DiaObject_11", "DiaObject_10"])
+        self.assertEqual(job.metadata_key, "backfill:schema_9.1.0")
+        self.assertEqual(job.remaining, job.units)
+
+        job.completed.append("DiaObject_12")
+        self.assertEqual(job.remaining, ["DiaObject_11", "DiaObject_10"])
+
+        job2 = BackfillJob.from_metadata(job.metadata_key, job.to_json())
+        self.assertEqual(job2, job)
+
+        self.assertIsNone(BackfillJob.from_metadata("version:schema", "9.1.0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
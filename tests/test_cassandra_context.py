@@ -0,0 +1,303 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import collections
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Any
+from unittest.mock import Mock, patch
+
+import cassandra.query
+from alembic.script import ScriptDirectory
+from cassandra import InvalidRequest
+
+from lsst.dax.apdb_migrate.cassandra.config import ApdbMigConfigCassandra
+from lsst.dax.apdb_migrate.cassandra.context import Context, OnlineBackfillDone
+from lsst.dax.apdb_migrate.cassandra.cql_plan import CqlPlan, CqlPlanWriter
+from lsst.dax.apdb_migrate.cassandra.ddl import AddColumns, DropColumns
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineDatabase
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+
+_MIG_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "migrations", "cassandra")
+
+_FELIS_YAML = """\
+name: ApdbSchema
+version: "8.0.0"
+tables:
+- name: DiaSource
+  columns:
+  - name: diaSourceId
+    datatype: long
+  - name: bboxSize
+    datatype: int
+  - name: isNegative
+    datatype: boolean
+"""
+
+
+class ContextTestCase(unittest.TestCase):
+    """Tests for cassandra.context module, simulated database plays the role
+    of a live keyspace.
+    """
+
+    def setUp(self) -> None:
+        columns = [
+            Column("apdb_part", "bigint", "partition_key", 0),
+            Column("diaSourceId", "bigint", "clustering", 0, "asc"),
+            Column("ra", "double", "regular"),
+        ]
+        tables = {"DiaSource": TableSchema("ks", "DiaSource", columns, {})}
+        apdb_config = {"enable_replica": False, "time_partition_tables": False}
+        metadata = {
+            "version:schema": "4.0.0",
+            Context.metadataConfigKey: json.dumps(apdb_config),
+        }
+        self.db = OfflineDatabase(SchemaSnapshot("ks", tables, metadata=metadata))
+
+    def _config(self, dry_run: bool = False, options: dict[str, str] | None = None) -> ApdbMigConfigCassandra:
+        return ApdbMigConfigCassandra.from_mig_path(
+            _MIG_PATH, db=self.db, migration_options=options, dry_run=dry_run
+        )
+
+    def _column_names(self, ctx: Context, table_name: str) -> list[str]:
+        return [column.column_name for column in ctx.schema.table_columns(table_name)]
+
+    def test_dry_run_schema(self) -> None:
+        """Test that schema changes made in dry-run mode are visible to
+        following migrations.
+        """
+        config = self._config(dry_run=True)
+        with self.db.keep_session():
+            with Context("schema", "5.0.0", config=config) as ctx:
+                ctx.apply_ddl([AddColumns("DiaSource", {"is_negative": "boolean"})])
+                self.assertIn("is_negative", self._column_names(ctx, "DiaSource"))
+
+            with Context("schema", "8.0.0", config=config) as ctx:
+                self.assertIn("is_negative", self._column_names(ctx, "DiaSource"))
+                with self.assertLogs("lsst.dax.apdb_migrate.cassandra.context", "INFO") as cm:
+                    ctx.apply_ddl([DropColumns("DiaSource", ["is_negative"])])
+                self.assertIn("Executing operation: drop 1 columns from table DiaSource", cm.output[0])
+                self.assertEqual(self._column_names(ctx, "DiaSource"), ["apdb_part", "diaSourceId", "ra"])
+
+        # Database itself is not modified.
+        self.assertEqual(self.db.session.steps[0].ddl, [])
+        self.assertEqual(
+            [column.column_name for column in self.db.session.snapshot.tables["DiaSource"].columns],
+            ["apdb_part", "diaSourceId", "ra"],
+        )
+
+    def test_dry_run_prepare(self) -> None:
+        """Test that writes to columns added in dry-run mode are saved in a
+        plan.
+        """
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir, ignore_errors=True)
+        plan_path = os.path.join(tempdir, "plan.json")
+        writer = CqlPlanWriter(plan_path, "ks", {}, data_path=os.path.join(tempdir, "plan.bin"))
+        self.db.cql_plan = writer
+        config = self._config(dry_run=True)
+        with writer, Context("schema", "5.0.0", config=config) as ctx:
+            ctx.update('ALTER TABLE "ks"."DiaSource" ADD "nDiaSources" INT')
+            # Database does not know about new column.
+            with patch.object(self.db.session, "prepare", side_effect=InvalidRequest("Undefined column")):
+                stmt = ctx.prepare(
+                    'UPDATE "ks"."DiaSource" SET "nDiaSources" = ? WHERE apdb_part = ? AND "diaSourceId" = ?'
+                )
+            batch = cassandra.query.BatchStatement()
+            for i in range(5):
+                batch.add(stmt, (i, i % 2, i))
+            ctx.update(batch)
+            with self.assertRaises(InvalidRequest):
+                ctx._prepare_simulated('INSERT INTO "ks"."DiaSource" (apdb_part, "flux") VALUES (?, ?)')
+
+        plan = CqlPlan.read(plan_path)
+        self.assertEqual([step.kind for step in plan.steps], ["cql", "write", "cql"])
+        step = plan.steps[1]
+        self.assertEqual((step.rows, step.partitions), (5, 2))
+        rows = list(plan.read_rows(step))
+        self.assertEqual(rows[3], [b"\x00\x00\x00\x03", b"\x00" * 7 + b"\x01", b"\x00" * 7 + b"\x03"])
+
+    def test_target_schema(self) -> None:
+        """Test that target schema is only applied by the final revision."""
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir, ignore_errors=True)
+        felis_path = os.path.join(tempdir, "apdb.yaml")
+        with open(felis_path, "w") as file:
+            file.write(_FELIS_YAML)
+        self.db.session.snapshot.tables["DiaSource"].columns.append(Column("bboxSize", "bigint", "regular"))
+        config = self._config(options={"target-schema": felis_path})
+        script = ScriptDirectory.from_config(config)
+
+        with Context("schema", "5.0.0", config=config) as ctx:
+            ctx.mig_context = Mock(script=script, opts={"destination_rev": "schema_8.0.0"})
+            ctx.apply_ddl([DropColumns("DiaSource", ["ra"])])
+            # Intermediate revision does not modify covered tables.
+            self.assertEqual(
+                self._column_names(ctx, "DiaSource"), ["apdb_part", "diaSourceId", "bboxSize", "ra"]
+            )
+
+        # Final revision applies target schema on exit.
+        with Context("schema", "8.0.0", config=config) as ctx:
+            ctx.mig_context = Mock(script=script, opts={"destination_rev": "schema_8.0.0"})
+        columns = self.db.session.snapshot.tables["DiaSource"].columns
+        self.assertEqual(
+            [(column.column_name, column.type) for column in columns],
+            [
+                ("apdb_part", "bigint"),
+                ("diaSourceId", "bigint"),
+                ("bboxSize", "bigint"),
+                ("isNegative", "boolean"),
+            ],
+        )
+
+        with self.assertRaisesRegex(ValueError, "does not match final version"):
+            with Context("schema", "5.0.0", config=config) as ctx:
+                ctx.mig_context = Mock(script=script, opts={"destination_rev": "schema_9.0.0"})
+                ctx.apply_ddl([])
+
+    def test_online_phases(self) -> None:
+        """Test backfill and catch-up phases of online migration."""
+        metadata = self.db.session.snapshot.metadata
+        key = "online:schema_5.0.0"
+
+        # Without option and state it is a regular migration.
+        with Context("schema", "5.0.0", online=True, config=self._config()) as ctx:
+            self.assertIsNone(ctx.online_phase)
+            self.assertIsNone(ctx.online_scan_start)
+        self.assertEqual(metadata["version:schema"], "5.0.0")
+        self.assertNotIn(key, metadata)
+
+        # Option is ignored if migration does not support online mode.
+        metadata["version:schema"] = "4.0.0"
+        with Context("schema", "5.0.0", config=self._config(options={"online": "1"})) as ctx:
+            self.assertIsNone(ctx.online_phase)
+        self.assertEqual(metadata["version:schema"], "5.0.0")
+
+        # Backfill phase saves its start time and does not update version.
+        metadata["version:schema"] = "4.0.0"
+        with patch("time.time", return_value=1000.0):
+            with self.assertRaises(OnlineBackfillDone) as cm:
+                with Context(
+                    "schema", "5.0.0", online=True, config=self._config(options={"online": "yes"})
+                ) as ctx:
+                    self.assertEqual(ctx.online_phase, "backfill")
+                    self.assertEqual(ctx.online_scan_start, 1000.0)
+        self.assertEqual(cm.exception.revision, "schema_5.0.0")
+        self.assertEqual(metadata["version:schema"], "4.0.0")
+        self.assertEqual(json.loads(metadata[key]), {"scan_start": 1000.0})
+
+        # Failed catch-up phase keeps the state.
+        with self.assertRaises(RuntimeError):
+            with Context("schema", "5.0.0", online=True, config=self._config()) as ctx:
+                self.assertEqual(ctx.online_phase, "catch-up")
+                raise RuntimeError("failed")
+        self.assertEqual(metadata["version:schema"], "4.0.0")
+        self.assertIn(key, metadata)
+
+        # Catch-up phase updates version and removes the state, online option
+        # does not matter once state exists.
+        with Context("schema", "5.0.0", online=True, config=self._config(options={"online": "1"})) as ctx:
+            self.assertEqual(ctx.online_phase, "catch-up")
+            self.assertEqual(ctx.online_scan_start, 1000.0)
+        self.assertEqual(metadata["version:schema"], "5.0.0")
+        self.assertNotIn(key, metadata)
+
+    def test_online_backfill_failure(self) -> None:
+        """Test that failed backfill phase does not save its state."""
+        metadata = self.db.session.snapshot.metadata
+        with self.assertRaises(RuntimeError):
+            with Context("schema", "5.0.0", online=True, config=self._config(options={"online": "1"})) as ctx:
+                self.assertEqual(ctx.online_phase, "backfill")
+                raise RuntimeError("failed")
+        self.assertEqual(metadata["version:schema"], "4.0.0")
+        self.assertNotIn("online:schema_5.0.0", metadata)
+
+    def test_online_dry_run(self) -> None:
+        """Test that backfill phase in dry-run mode does not save its state."""
+        metadata = self.db.session.snapshot.metadata
+        config = self._config(dry_run=True, options={"online": "1"})
+        with self.assertRaises(OnlineBackfillDone):
+            with Context("schema", "5.0.0", online=True, config=config) as ctx:
+                self.assertEqual(ctx.online_phase, "backfill")
+        self.assertNotIn("online:schema_5.0.0", metadata)
+
+    def test_bulk_load(self) -> None:
+        """Test that bulk load restores default compaction of the table."""
+        columns = [Column("id", "bigint", "partition_key", 0), Column("value", "double", "regular")]
+        table_schema = TableSchema("ks", "NewTable", columns, {})
+        row_type = collections.namedtuple("row_type", ["compaction"])
+        compaction = {"class": "UnifiedCompactionStrategy", "scaling_parameters": "T4"}
+        with Context("schema", "5.0.0", config=self._config()) as ctx:
+            query = ctx.query
+
+            def _query(query_str: str, parameters: Any = None, **kwargs: Any) -> Any:
+                if "system_schema.tables" in query_str:
+                    return [row_type(compaction)]
+                return query(query_str, parameters, **kwargs)
+
+            with patch.object(ctx, "query", side_effect=_query):
+                with ctx.bulk_load(table_schema):
+                    pass
+
+        ddl = self.db.session.steps[0].ddl
+        self.assertEqual(len(ddl), 3)
+        self.assertTrue(ddl[0].startswith('CREATE TABLE "ks"."NewTable"'))
+        self.assertNotIn("compaction", ddl[0])
+        self.assertEqual(
+            ddl[1:],
+            [
+                'ALTER TABLE "ks"."NewTable" WITH compaction = '
+                "{'class': 'UnifiedCompactionStrategy', 'scaling_parameters': 'T4', 'enabled': 'false'}",
+                'ALTER TABLE "ks"."NewTable" WITH compaction = '
+                "{'class': 'UnifiedCompactionStrategy', 'scaling_parameters': 'T4', 'enabled': 'true'}",
+            ],
+        )
+        # Production options are not modified.
+        self.assertEqual(table_schema.table_options, {})
+
+        # Failed load reports how to restore options.
+        table_schema = TableSchema("ks", "OtherTable", columns, {"compaction": compaction})
+        with Context("schema", "5.0.0", config=self._config()) as ctx:
+            with self.assertLogs("lsst.dax.apdb_migrate.cassandra.context", "ERROR") as cm:
+                with self.assertRaises(RuntimeError):
+                    with ctx.bulk_load(table_schema):
+                        raise RuntimeError("failure")
+        self.assertEqual(len(cm.output), 1)
+        self.assertIn(table_schema.make_restore_ddl(), cm.output[0])
+        self.assertEqual(len(self.db.session.steps[1].ddl), 1)
+
+    def test_scan_table_since(self) -> None:
+        """Test that scan_table_since allows for clock skew of clients."""
+        rows = [(1, 10, 1.0, 999_000_000), (1, 11, 2.0, 1_000_000_000), (2, 12, 3.0, None)]
+        for options, expected in [(None, 3), ({"clock-skew": "0.5"}, 2)]:
+            with Context("schema", "5.0.0", config=self._config(options=options)) as ctx:
+                with patch.object(ctx.schema, "scan", return_value=iter(rows)):
+                    snapshot = ctx.scan_table_since("DiaSource", ["apdb_part", "diaSourceId", "ra"], 1000.0)
+                self.assertEqual(len(snapshot), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Any
+
+import cassandra.query
+from cassandra.cqltypes import DoubleType, LongType
+from cassandra.protocol import ColumnMetadata
+
+from lsst.dax.apdb_migrate.cassandra.context import DryRunSession
+from lsst.dax.apdb_migrate.cassandra.cql_plan import CqlPlan, CqlPlanWriter
+
+
+def _prepared(query_id: bytes, query: str) -> cassandra.query.PreparedStatement:
+    """Make prepared statement for a query with (double, bigint) parameters,
+    second parameter is a partition key.
+    """
+    columns = [ColumnMetadata("ks", "t", "ra", DoubleType), ColumnMetadata("ks", "t", "id", LongType)]
+    return cassandra.query.PreparedStatement(columns, query_id, [1], query, "ks", 4, None, None)
+
+
+class CqlPlanTestCase(unittest.TestCase):
+    """Tests for cql_plan module."""
+
+    def setUp(self) -> None:
+        self.tempdir = tempfile.mkdtemp()
+        self.plan_path = os.path.join(self.tempdir, "plan.json")
+        self.data_path = os.path.join(self.tempdir, "plan.bin")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _run_queries(self, session: Any) -> None:
+        update = _prepared(b"1", 'UPDATE "t" SET ra = ? WHERE id = ?')
+        insert = _prepared(b"2", 'INSERT INTO "t" (ra, id) VALUES (?, ?)')
+        session.add_prepared(update)
+        session.add_prepared(insert)
+
+        session.execute('ALTER TABLE "t" ADD ra DOUBLE')
+        batch = cassandra.query.BatchStatement()
+        for i in range(10):
+            batch.add(update, (1.0, i % 3))
+        batch.add(insert, (None, 100))
+        session.execute(batch)
+        session.execute(insert, (2.0, 101))
+        session.execute("INSERT INTO metadata (name, value) VALUES (%s, %s)", ("version:schema", "1.0.0"))
+
+    def test_plan(self) -> None:
+        """Test recording plan in dry-run session and reading it back."""
+        with CqlPlanWriter(self.plan_path, "ks", {"schema": "0.1.0"}, data_path=self.data_path) as writer:
+            self._run_queries(DryRunSession(None, writer))  # type: ignore[arg-type]
+
+        plan = CqlPlan.read(self.plan_path)
+        self.assertEqual(plan.versions, {"schema": "0.1.0"})
+        self.assertEqual([step.kind for step in plan.steps], ["cql", "write", "write", "cql"])
+        self.assertEqual(plan.steps[3].parameters, ["version:schema", "1.0.0"])
+        update, insert = plan.steps[1:3]
+        self.assertEqual((update.rows, update.partitions), (10, 3))
+        # Insert from batch and a separate insert are merged.
+        self.assertEqual((insert.rows, insert.partitions), (2, 2))
+        self.assertEqual(plan.summary()[1], '-- 10 rows in 3 partitions: UPDATE "t" SET ra = ? WHERE id = ?')
+
+        # Serialized values are read back unchanged.
+        statement = _prepared(b"2", "")
+        rows = list(plan.read_rows(insert))
+        self.assertEqual(rows, [statement.bind((None, 100)).values, statement.bind((2.0, 101)).values])
+        self.assertEqual(len(list(plan.read_rows(update))), 10)
+
+        # Data file is stored relative to plan file, and is verified.
+        with open(self.plan_path) as file:
+            self.assertEqual(CqlPlan.from_json(file.read()).data_path, "plan.bin")
+        self.assertEqual(plan.data_file_size, os.path.getsize(self.data_path))
+        plan.check_data()
+        with open(self.data_path, "r+b") as file:
+            file.seek(-1, os.SEEK_END)
+            last_byte = file.read(1)
+            file.seek(-1, os.SEEK_END)
+            file.write(bytes([last_byte[0] ^ 1]))
+        with self.assertRaisesRegex(ValueError, "Checksum"):
+            plan.check_data()
+        with open(self.data_path, "ab") as file:
+            file.write(b"\x00")
+        with self.assertRaisesRegex(ValueError, "Size"):
+            plan.check_data()
+        os.remove(self.data_path)
+        with self.assertRaisesRegex(ValueError, "does not exist"):
+            plan.check_data()
+
+    def test_plan_without_data(self) -> None:
+        """Test plan without data file."""
+        with CqlPlanWriter(self.plan_path, "ks", {}) as writer:
+            self._run_queries(DryRunSession(None, writer))  # type: ignore[arg-type]
+        plan = CqlPlan.read(self.plan_path)
+        self.assertEqual(plan.steps[1].rows, 10)
+        plan.check_data()
+        self.assertIsNone(plan.steps[1].data_offset)
+        with self.assertRaises(ValueError):
+            list(plan.read_rows(plan.steps[1]))
+
+        # Failure does not save a plan.
+        os.remove(self.plan_path)
+        with self.assertRaises(RuntimeError):
+            with CqlPlanWriter(self.plan_path, "ks", {}):
+                raise RuntimeError()
+        self.assertFalse(os.path.exists(self.plan_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from unittest.mock import patch
+
+from cassandra.cluster import EXEC_PROFILE_DEFAULT
+from cassandra.policies import RoundRobinPolicy, WhiteListRoundRobinPolicy
+
+from lsst.dax.apdb_migrate.cassandra.database import Database
+
+
+class _Session:
+    """Session which counts prepared statements."""
+
+    def __init__(self) -> None:
+        self.prepared: list[str] = []
+
+    def prepare(self, query: str) -> Any:
+        self.prepared.append(query)
+        return object()
+
+
+class _Cluster:
+    """Cluster which records its parameters and returns fake sessions."""
+
+    instances: list["_Cluster"] = []
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.kwargs = kwargs
+        self.instances.append(self)
+
+    def connect(self) -> Any:
+        return _MetadataSession()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class _MetadataSession(_Session):
+    """Session which returns rows from metadata table."""
+
+    default_fetch_size: int | None = 5000
+
+    def add_request_init_listener(self, listener: Any) -> None:
+        pass
+
+    def execute(self, query: str, params: Any = None) -> list:
+        return [("version:schema", "9.0.0"), ("config:apdb-cassandra.json", "{}")]
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Tests for database module."""
+
+    def test_keep_session(self) -> None:
+        """Test sharing of a session."""
+        sessions: list[_Session] = []
+
+        @contextmanager
+        def make_session(self: Database, **kwargs: Any) -> Iterator[_Session]:
+            sessions.append(_Session())
+            yield sessions[-1]
+
+        db = Database("localhost", "keyspace")
+        with patch.object(Database, "_make_session", make_session):
+            with db.make_session() as session1, db.make_session() as session2:
+                self.assertIsNot(session1, session2)
+                # No caching for non-shared sessions.
+                db.prepare(session1, "query")
+                db.prepare(session1, "query")
+                self.assertEqual(sessions[0].prepared, ["query", "query"])
+            self.assertEqual(len(sessions), 2)
+
+            with db.keep_session():
+                with db.keep_session():
+                    with db.make_session() as session1, db.make_session() as session2:
+                        self.assertIs(session1, session2)
+                        stmt1 = db.prepare(session1, "query")
+                        stmt2 = db.prepare(session2, "query")
+                        self.assertIs(stmt1, stmt2)
+                        self.assertEqual(sessions[-1].prepared, ["query"])
+            self.assertEqual(len(sessions), 3)
+
+            with db.make_session() as session1:
+                self.assertIsNot(session1, sessions[2])
+
+    def test_lightweight(self) -> None:
+        """Test parameters of lightweight sessions."""
+        db = Database("localhost", "keyspace")
+        _Cluster.instances.clear()
+        with patch("lsst.dax.apdb_migrate.cassandra.database.Cluster", _Cluster):
+            self.assertEqual(db.tree_versions(), {"schema": ("9.0.0", "schema_9.0.0")})
+            with db.make_session():
+                pass
+
+        lightweight, regular = [cluster.kwargs for cluster in _Cluster.instances]
+        self.assertFalse(lightweight["schema_metadata_enabled"])
+        self.assertFalse(lightweight["token_metadata_enabled"])
+        policy = lightweight["execution_profiles"][EXEC_PROFILE_DEFAULT].load_balancing_policy
+        self.assertIsInstance(policy, WhiteListRoundRobinPolicy)
+        self.assertTrue(regular["schema_metadata_enabled"])
+        self.assertTrue(regular["token_metadata_enabled"])
+        policy = regular["execution_profiles"][EXEC_PROFILE_DEFAULT].load_balancing_policy
+        self.assertNotIsInstance(policy, WhiteListRoundRobinPolicy)
+        self.assertIsInstance(policy, RoundRobinPolicy)
+
+
+if __name__ == "__main__":
+    unittest.main()
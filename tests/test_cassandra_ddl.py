@@ -0,0 +1,83 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from lsst.dax.apdb_migrate.cassandra.ddl import AddColumns, CreateTable, DropColumns, DropTable
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineSession
+from lsst.dax.apdb_migrate.cassandra.schema import Schema
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+
+
+class DdlTestCase(unittest.TestCase):
+    """Tests for ddl module."""
+
+    def setUp(self) -> None:
+        columns = [
+            Column("apdb_part", "bigint", "partition_key", 0),
+            Column("diaObjectId", "bigint", "clustering", 0, "asc"),
+            Column("ra", "double", "regular"),
+            Column("nearbyLowzGal", "text", "regular"),
+        ]
+        tables = {"DiaObject": TableSchema("ks", "DiaObject", columns, {})}
+        self.schema = Schema(OfflineSession(SchemaSnapshot("ks", tables)), "ks", {})
+
+    def test_columns(self) -> None:
+        """Test AddColumns and DropColumns operations."""
+        op = AddColumns("DiaObject", {"ra": "DOUBLE", "dec": "DOUBLE", "nearbyLowzGal": "VARCHAR"})
+        self.assertEqual(op.statement(self.schema, "ks"), 'ALTER TABLE "ks"."DiaObject" ADD ("dec" DOUBLE)')
+        op = AddColumns("DiaObject", {"ra": "DOUBLE"})
+        self.assertIsNone(op.statement(self.schema, "ks"))
+        op = AddColumns("DiaObject", {"ra": "FLOAT"})
+        with self.assertRaises(ValueError):
+            op.statement(self.schema, "ks")
+        with self.assertRaises(LookupError):
+            AddColumns("DiaSource", {"ra": "DOUBLE"}).statement(self.schema, "ks")
+
+        drop_op = DropColumns("DiaObject", ["ra", "dec", "nearbyLowzGal"])
+        self.assertEqual(
+            drop_op.statement(self.schema, "ks"), 'ALTER TABLE "ks"."DiaObject" DROP ("ra", "nearbyLowzGal")'
+        )
+        self.assertIsNone(DropColumns("DiaObject", ["dec"]).statement(self.schema, "ks"))
+
+    def test_tables(self) -> None:
+        """Test CreateTable and DropTable operations."""
+        columns = [
+            Column("apdb_part", "bigint", "partition_key", 0),
+            Column("diaObjectId", "bigint", "clustering", 0, "asc"),
+        ]
+        create_op = CreateTable(TableSchema("ks", "DiaObject", columns, {}))
+        self.assertIsNone(create_op.statement(self.schema, "ks"))
+        create_op = CreateTable(TableSchema("ks", "DiaObject", columns[:1], {}))
+        with self.assertRaises(ValueError):
+            create_op.statement(self.schema, "ks")
+        create_op = CreateTable(TableSchema("ks", "DiaSource", columns, {}))
+        statement = create_op.statement(self.schema, "ks")
+        assert statement is not None
+        self.assertTrue(statement.startswith('CREATE TABLE "ks"."DiaSource"'))
+
+        self.assertEqual(DropTable("DiaObject").statement(self.schema, "ks"), 'DROP TABLE "ks"."DiaObject"')
+        self.assertIsNone(DropTable("DiaSource").statement(self.schema, "ks"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+from typing import Any
+
+from lsst.dax.apdb_migrate.cassandra.estimates import CostRecorder, TableSample, sample_table
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineSession
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+
+
+class _Session(OfflineSession):
+    """Offline session which returns two rows for each token range query."""
+
+    def __init__(self, snapshot: SchemaSnapshot):
+        super().__init__(snapshot)
+        self.ranges: list[tuple[int, int]] = []
+
+    def _execute(self, query: str, parameters: Any) -> list:
+        if "token(" in query:
+            self.ranges.append(parameters)
+            return [(1, 1.0), (2, 2.0)]
+        return super()._execute(query, parameters)
+
+
+class EstimatesTestCase(unittest.TestCase):
+    """Tests for estimates module."""
+
+    def setUp(self) -> None:
+        columns = [Column("apdb_part", "bigint", "partition_key", 0), Column("ra", "double", "regular")]
+        tables = {"DiaObjectLast": TableSchema("ks", "DiaObjectLast", columns, {})}
+        self.session = _Session(SchemaSnapshot("ks", tables))
+
+    def test_sample(self) -> None:
+        """Test sampling of token ranges."""
+        sample = sample_table(self.session, "ks", "DiaObjectLast", ["apdb_part"], fraction=1 / 64, ranges=4)
+        self.assertEqual(len(self.session.ranges), 4)
+        for start, end in self.session.ranges:
+            self.assertEqual(end - start + 1, 2**64 // 256)
+        self.assertEqual(sample.rows, 8)
+        self.assertAlmostEqual(sample.fraction, 1 / 64)
+        self.assertEqual(sample.estimated_rows, 512)
+
+        self.assertIsNone(TableSample(rows=0, fraction=0.5, seconds=1.0).read_rate)
+        self.assertEqual(TableSample(rows=10, fraction=0.5, seconds=2.0).read_rate, 5.0)
+
+    def test_report(self) -> None:
+        """Test recording and reporting of migration costs."""
+        recorder = CostRecorder()
+        recorder.record_scan("DiaObjectLast", 2)
+        recorder.record_scan("DiaObjectLast", 1)
+        recorder.record_write("DiaObjectLast")
+        recorder.finish_revision("schema_9.1.0")
+        # Revision without any data access is not reported.
+        recorder.finish_revision("schema_9.1.1")
+        recorder.record_scan("DiaSource", 3)
+        self.assertEqual(
+            [cost.revision for cost in recorder.revisions], ["schema_9.1.0", "schema_9.1.1", None]
+        )
+        self.assertEqual(recorder.revisions[0].scans, {"DiaObjectLast": 2})
+        self.assertEqual(recorder.revisions[0].writes, {"DiaObjectLast"})
+
+        lines = recorder.report(self.session, "ks", write_rate=8192.0)
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[0].startswith("Revision schema_9.1.0: estimated duration"))
+        self.assertTrue(lines[1].startswith("  scan DiaObjectLast: ~8192 rows, "))
+        self.assertEqual(lines[2], "  write DiaObjectLast: up to ~8192 rows, ~1 s at 8192 rows/s")
+        self.assertTrue(lines[3].startswith("Revision (not completed): estimated duration 0.0 min"))
+        self.assertEqual(lines[4], "  scan DiaSource: table does not exist, not estimated")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import cassandra.query
+from cassandra import InvalidRequest
+
+from lsst.dax.apdb_migrate.cassandra.apdb_metadata import ApdbMetadata
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineDatabase
+from lsst.dax.apdb_migrate.cassandra.schema import Schema
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+
+
+class OfflineTestCase(unittest.TestCase):
+    """Tests for offline module."""
+
+    def setUp(self) -> None:
+        columns = [
+            Column("apdb_part", "bigint", "partition_key", 0),
+            Column("diaObjectId", "bigint", "clustering", 0, "asc"),
+            Column("ra", "double", "regular"),
+        ]
+        tables = {"DiaObjectLast": TableSchema("ks", "DiaObjectLast", columns, {"gc_grace_seconds": 0})}
+        self.snapshot = SchemaSnapshot("ks", tables, metadata={"version:schema": "9.0.0"})
+
+    def test_schema(self) -> None:
+        """Test schema queries and DDL."""
+        db = OfflineDatabase(self.snapshot)
+        with db.make_session() as session:
+            schema = Schema(session, "ks", {})
+            self.assertEqual(schema.all_tables(), ["DiaObjectLast"])
+            self.assertEqual(TableSchema.from_keyspace(session, "ks"), self.snapshot.tables)
+
+            session.execute('ALTER TABLE "ks"."DiaObjectLast" ADD ("dec" DOUBLE, "nDiaSources" INT)')
+            session.execute('ALTER TABLE "ks"."DiaObjectLast" DROP "ra"')
+            session.execute(
+                'CREATE TABLE "ks"."Dedup" ("part" int, "id" bigint, "time" double, "ra" double, '
+                'PRIMARY KEY ("part", "id", "time")) WITH CLUSTERING ORDER BY ("id" ASC, "time" DESC)'
+            )
+            session.execute(
+                "CREATE TABLE ks.Visits (visit bigint, detector smallint, PRIMARY KEY ((visit, detector)))"
+            )
+            with self.assertRaises(InvalidRequest):
+                session.execute('ALTER TABLE "ks"."DiaObjectLast" ADD "dec" DOUBLE')
+            with self.assertRaises(InvalidRequest):
+                session.execute('ALTER TABLE "ks"."DiaObjectLast" DROP "ra"')
+
+            schema.refresh()
+            self.assertEqual(
+                [column.column_name for column in schema.table_columns("DiaObjectLast")],
+                ["apdb_part", "diaObjectId", "dec", "nDiaSources"],
+            )
+            self.assertEqual(
+                [
+                    (column.column_name, column.kind, column.clustering_order)
+                    for column in schema.table_columns("Dedup")
+                ],
+                [
+                    ("part", "partition_key", None),
+                    ("id", "clustering", "asc"),
+                    ("time", "clustering", "desc"),
+                    ("ra", "regular", None),
+                ],
+            )
+            self.assertEqual(schema.partition_key("visits"), ["visit", "detector"])
+
+            session.execute('DROP TABLE "ks"."Dedup"')
+            self.assertEqual(len(session.steps), 1)
+            self.assertEqual(len(session.steps[0].ddl), 5)
+
+        # Original snapshot is not modified.
+        self.assertEqual(len(self.snapshot.tables), 1)
+
+    def test_steps(self) -> None:
+        """Test recording of data queries and migration steps."""
+        db = OfflineDatabase(self.snapshot)
+        with db.make_session() as session:
+            schema = Schema(session, "ks", {})
+            self.assertEqual(list(schema.scan("DiaObjectLast", '"diaObjectId"', token_ranges=4)), [])
+
+            statement = session.prepare('UPDATE "ks"."DiaObjectLast" SET ra = ? WHERE apdb_part = ?')
+            batch = cassandra.query.BatchStatement()
+            batch.add(statement, (1.0, 1))
+            batch.add(statement, (2.0, 2))
+            session.execute(batch)
+
+            metadata = ApdbMetadata(session, "ks")
+            self.assertEqual(metadata.get("version:schema"), "9.0.0")
+            metadata.update_tree_version("schema", "9.1.0")
+            self.assertEqual(metadata.get("version:schema"), "9.1.0")
+            metadata.insert("online:schema_9.1.0", "{}")
+            metadata.delete("online:schema_9.1.0")
+            self.assertIsNone(metadata.get("online:schema_9.1.0"))
+
+        self.assertEqual(len(session.steps), 2)
+        step = session.steps[0]
+        self.assertEqual(step.revision, "schema_9.1.0")
+        self.assertEqual(step.scans["DiaObjectLast"], 4)
+        self.assertEqual(step.writes["DiaObjectLast"], 2)
+        self.assertEqual(step.prepared_writes, {"DiaObjectLast"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineSession
+from lsst.dax.apdb_migrate.cassandra.schema import Schema
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+
+
+class _Session(OfflineSession):
+    """Offline session which returns pre-defined rows for data queries."""
+
+    def __init__(self, partition_key: list[str], metadata: dict[str, str], rows: list[tuple] | None = None):
+        columns = [Column(column, "int", "partition_key", pos) for pos, column in enumerate(partition_key)]
+        columns.append(Column("value", "int", "regular"))
+        chunk_columns = [Column("partition", "int", "partition_key", 0)]
+        tables = {
+            "Table": TableSchema("keyspace", "Table", columns, {}),
+            "ApdbReplicaChunks": TableSchema("keyspace", "ApdbReplicaChunks", chunk_columns, {}),
+        }
+        super().__init__(SchemaSnapshot("keyspace", tables, metadata=metadata))
+        self.rows = rows or []
+        self.queries: list[tuple[str, Any]] = []
+
+    def _execute(self, query: str, parameters: Any) -> list:
+        if '"ApdbReplicaChunks"' in query:
+            return [(100,), (101,)]
+        elif '"Table"' in query:
+            self.queries.append((query, parameters))
+            return self.rows
+        return super()._execute(query, parameters)
+
+
+class SchemaTestCase(unittest.TestCase):
+    """Tests for schema module."""
+
+    def test_partition_values(self) -> None:
+        """Test enumeration of partition key values."""
+        config = {"part_pixelization": "mq3c", "part_pix_level": 1, "replica_sub_chunk_count": 2}
+        metadata = {"config:time-partition-range.json": json.dumps({"start": 10, "end": 12})}
+
+        schema = Schema(_Session(["apdb_part"], metadata), "keyspace", config)
+        self.assertEqual(schema.partition_values("Table"), [(part,) for part in range(40, 64)])
+        self.assertIsNone(schema.partition_values("Table", max_count=10))
+
+        schema = Schema(_Session(["apdb_part", "apdb_time_part"], metadata), "keyspace", config)
+        values = schema.partition_values("Table")
+        assert values is not None
+        self.assertEqual(len(values), 24 * 3)
+        self.assertEqual(values[:4], [(40, 10), (40, 11), (40, 12), (41, 10)])
+        self.assertEqual(schema.time_partition_range(), range(10, 13))
+        values = schema.partition_values("Table", time_partitions=[5])
+        assert values is not None
+        self.assertEqual(len(values), 24)
+
+        schema = Schema(_Session(["apdb_part", "apdb_time_part"], {}), "keyspace", config)
+        self.assertIsNone(schema.partition_values("Table"))
+        self.assertIsNone(schema.time_partition_range())
+
+        schema = Schema(_Session(["apdb_replica_chunk", "apdb_replica_subchunk"], {}), "keyspace", config)
+        self.assertEqual(schema.partition_values("Table"), [(100, 0), (100, 1), (101, 0), (101, 1)])
+
+        schema = Schema(_Session(["apdb_part"], {}), "keyspace", {"part_pixelization": "healpix"})
+        self.assertIsNone(schema.partition_values("Table"))
+
+    def test_scan_token_ranges(self) -> None:
+        """Test scanning token ranges when partitions cannot be enumerated."""
+        session = _Session(["apdb_part", "apdb_time_part"], {}, rows=[(1, 10), (2, 11), (3, 12)])
+        schema = Schema(session, "keyspace", {})
+        rows = list(schema.scan("Table", "value", time_partitions=[10, 12], token_ranges=2))
+        self.assertEqual(rows, [(1,), (3,), (1,), (3,)])
+        self.assertEqual(len(session.queries), 2)
+        query, _ = session.queries[0]
+        self.assertIn("SELECT value, apdb_time_part FROM", query)
+        self.assertNotIn("ALLOW FILTERING", query)
+
+    def test_scan_partitions(self) -> None:
+        """Test scanning explicitly listed partitions."""
+        session = _Session(["apdb_part", "apdb_time_part"], {}, rows=[(1,)])
+        schema = Schema(session, "keyspace", {})
+        rows = list(schema.scan("Table", "value", partitions=[(40, 10), (41, 10)]))
+        self.assertEqual(rows, [(1,), (1,)])
+        self.assertEqual([parameters for _, parameters in session.queries], [(40, 10), (41, 10)])
+        query, _ = session.queries[0]
+        self.assertIn('WHERE "apdb_part" = %s AND "apdb_time_part" = %s', query)
+
+    def test_cache(self) -> None:
+        """Test caching of keyspace schema."""
+        columns = [Column("apdb_part", "bigint", "partition_key", 0)]
+        table_names = ["DiaObjectLast", "DiaObject_12", "DiaObject_9", "DiaObjectChunks", "metadata"]
+        tables = {name: TableSchema("keyspace", name, columns, {}) for name in table_names}
+        session = OfflineSession(SchemaSnapshot("keyspace", tables))
+        config = {"enable_replica": True, "time_partition_tables": True}
+        schema = Schema(session, "keyspace", config)
+        query_columns = self.enterContext(patch.object(session, "_columns", wraps=session._columns))
+
+        self.assertTrue(schema.check_table("DiaObjectLast"))
+        self.assertFalse(schema.check_table("DiaObject"))
+        self.assertEqual(schema.partitioned_tables("DiaObject"), ["DiaObject_9", "DiaObject_12"])
+        self.assertEqual(schema.replica_tables("DiaObject"), ["DiaObjectChunks"])
+        self.assertEqual(
+            schema.tables_for_schema("DiaObject", include_obj_last=True),
+            ["DiaObjectChunks", "DiaObjectLast", "DiaObject_9", "DiaObject_12"],
+        )
+        self.assertEqual(schema.partition_key("DiaObject_9"), ["apdb_part"])
+        self.assertEqual([column.column_name for column in schema.table_columns("metadata")], ["apdb_part"])
+        with self.assertRaises(LookupError):
+            schema.table_columns("DiaSource")
+        self.assertEqual(query_columns.call_count, 1)
+
+        # New table.
+        session.snapshot.tables["DiaObject_13"] = TableSchema("keyspace", "DiaObject_13", columns, {})
+        schema.refresh("DiaObject_13")
+        self.assertEqual(
+            schema.partitioned_tables("DiaObject"), ["DiaObject_9", "DiaObject_12", "DiaObject_13"]
+        )
+        # Dropped table.
+        del session.snapshot.tables["DiaObject_9"]
+        schema.refresh("DiaObject_9")
+        self.assertEqual(schema.partitioned_tables("DiaObject"), ["DiaObject_12", "DiaObject_13"])
+        self.assertEqual(query_columns.call_count, 3)
+
+        schema.refresh()
+        self.assertEqual(len(schema.all_tables()), 5)
+        self.assertEqual(query_columns.call_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
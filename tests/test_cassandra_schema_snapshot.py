@@ -0,0 +1,115 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from typing import Any
+
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineSession
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+
+
+class _Session(OfflineSession):
+    """Offline session which also returns size estimates, system tables
+    include columns that are not table options.
+    """
+
+    def __init__(self) -> None:
+        dia_object_columns = [
+            Column("diaObjectId", "bigint", "partition_key", 0),
+            Column("ra", "double", "regular"),
+        ]
+        dia_source_columns = [
+            Column("diaSourceId", "bigint", "clustering", 0, "asc"),
+            Column("apdb_part", "bigint", "partition_key", 0),
+        ]
+        tables = {
+            "DiaObject": TableSchema(
+                "ks",
+                "DiaObject",
+                dia_object_columns,
+                {"id": b"\x01", "compaction": {"class": "LCS"}, "gc_grace_seconds": 0},
+            ),
+            "DiaSource": TableSchema(
+                "ks",
+                "DiaSource",
+                dia_source_columns,
+                {"id": b"\x02", "compaction": {"class": "STCS"}, "gc_grace_seconds": 864000},
+            ),
+        }
+        super().__init__(SchemaSnapshot("ks", tables))
+        self.queries: list[str] = []
+
+    def _execute(self, query: str, parameters: Any) -> list:
+        self.queries.append(query)
+        if "system.size_estimates" in query:
+            return [
+                ("DiaObject", "0", str(2**62), 10, 1000),
+                ("DiaObject", str(2**62), str(2**63), 30, 3000),
+            ]
+        return super()._execute(query, parameters)
+
+
+class SchemaSnapshotTestCase(unittest.TestCase):
+    """Tests for schema_snapshot module."""
+
+    def test_json(self) -> None:
+        """Test loading snapshot and its JSON round trip."""
+        session = _Session()
+        snapshot = SchemaSnapshot.from_keyspace(session, "ks")
+        self.assertEqual(len(session.queries), 3)
+        self.assertEqual(set(snapshot.tables), {"DiaObject", "DiaSource"})
+        table = snapshot.tables["DiaSource"]
+        self.assertEqual([column.column_name for column in table.columns], ["apdb_part", "diaSourceId"])
+        self.assertEqual(table.table_options, {"compaction": {"class": "STCS"}, "gc_grace_seconds": 864000})
+        # Two ranges cover half of the token ring.
+        self.assertEqual(snapshot.sizes["DiaObject"].partitions, 80)
+        self.assertEqual(snapshot.sizes["DiaObject"].mean_partition_size, 2500)
+
+        restored = SchemaSnapshot.from_json(snapshot.to_json())
+        self.assertEqual(restored, snapshot)
+        self.assertEqual(snapshot.diff(restored), [])
+
+    def test_diff(self) -> None:
+        """Test diff method."""
+        snapshot1 = SchemaSnapshot.from_keyspace(_Session(), "ks")
+        snapshot2 = SchemaSnapshot.from_json(snapshot1.to_json())
+        snapshot2.keyspace = "ks2"
+        self.assertEqual(snapshot1.diff(snapshot2), [])
+
+        dia_object = snapshot2.tables["DiaObject"]
+        dia_object.columns[1].type = "float"
+        dia_object.columns.append(Column("dec", "double", "regular"))
+        dia_object.table_options["gc_grace_seconds"] = 3600
+        del snapshot2.tables["DiaSource"]
+        self.assertEqual(
+            snapshot1.diff(snapshot2),
+            [
+                "table=DiaSource removed",
+                "table=DiaObject column=dec added",
+                "table=DiaObject column=ra type: double -> float",
+                "table=DiaObject option=gc_grace_seconds: 0 -> 3600",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import shutil
+import tempfile
+import time
+import unittest
+
+from lsst.dax.apdb_migrate.cassandra.snapshot_cache import SnapshotCache, TableSnapshot
+
+
+class SnapshotCacheTestCase(unittest.TestCase):
+    """Tests for snapshot_cache module."""
+
+    def setUp(self) -> None:
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _make_snapshot(self, scan_time: float) -> TableSnapshot:
+        rows = [(1, 10, 60000.5), (2, 10, None), (3, 11, 60001.0)]
+        return TableSnapshot.from_rows(
+            "keyspace",
+            "DiaObject",
+            ("diaObjectId", "apdb_part", "validityStartMjdTai"),
+            "9.0.0",
+            scan_time,
+            rows,
+        )
+
+    def test_snapshot(self) -> None:
+        """Test TableSnapshot methods."""
+        snapshot = self._make_snapshot(time.time())
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(snapshot.data["diaObjectId"].dtype.kind, "i")
+        self.assertEqual(set(snapshot.masks), {"validityStartMjdTai"})
+        self.assertEqual(list(snapshot.rows()), [(1, 10, 60000.5), (2, 10, None), (3, 11, 60001.0)])
+        self.assertEqual(
+            list(snapshot.rows(["validityStartMjdTai", "diaObjectId"])),
+            [(60000.5, 1), (None, 2), (60001.0, 3)],
+        )
+
+        selected = snapshot.select(snapshot.data["diaObjectId"] % 2 == 0)
+        self.assertEqual(len(selected), 1)
+        self.assertEqual(selected.scan_time, snapshot.scan_time)
+        self.assertEqual(list(selected.rows()), [(2, 10, None)])
+
+        with self.assertRaises(TypeError):
+            TableSnapshot.from_rows("keyspace", "table", ("a",), "1.0.0", 0.0, [(object(),)])
+
+    def test_cache(self) -> None:
+        """Test storing and finding snapshots."""
+        cache = SnapshotCache(self.tempdir)
+        columns = ("diaObjectId", "validityStartMjdTai")
+        self.assertIsNone(cache.find("keyspace", "DiaObject", columns, "9.0.0"))
+
+        snapshot = self._make_snapshot(time.time() - 100)
+        cache.store(snapshot)
+
+        # Subset of columns can be found.
+        found = cache.find("keyspace", "DiaObject", columns, "9.0.0")
+        assert found is not None
+        self.assertEqual(found.columns, snapshot.columns)
+        self.assertEqual(list(found.rows(columns)), list(snapshot.rows(columns)))
+        self.assertAlmostEqual(found.scan_time, snapshot.scan_time)
+
+        # Various mismatches.
+        self.assertIsNone(cache.find("keyspace", "DiaObject", columns, "9.1.0"))
+        self.assertIsNone(cache.find("keyspace", "DiaObjectLast", columns, "9.0.0"))
+        self.assertIsNone(cache.find("keyspace", "DiaObject", ("ra",), "9.0.0"))
+        self.assertIsNone(cache.find("keyspace", "DiaObject", columns, "9.0.0", max_age=10))
+        self.assertIsNotNone(cache.find("keyspace", "DiaObject", columns, "9.0.0", max_age=1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -202,6 +202,55 @@ CREATE TABLE "spacekey"."table3" (
 """
         self.assertEqual(ddl, expected_ddl)
 
+        # No options at all.
+        schema = TableSchema(keyspace="spacekey", table_name="table4", columns=columns, table_options={})
+        ddl = schema.make_ddl()
+        self.assertTrue(ddl.endswith(')\n) WITH CLUSTERING ORDER BY ("clust1" acs, "clust3" desc)'))
+        schema = TableSchema(
+            keyspace="spacekey", table_name="table4", columns=[self.columns["part1"]], table_options={}
+        )
+        ddl = schema.make_ddl()
+        self.assertTrue(ddl.endswith('PRIMARY KEY ("part1")\n)'))
+
+    def test_make_ddl_bulk_load(self) -> None:
+        """Test make_ddl method with bulk_load and make_restore_ddl."""
+        columns = [self.columns["part1"], self.columns["a"]]
+        compaction = {"class": "LeveledCompactionStrategy", "sstable_size_in_mb": "160"}
+        table_options = {"compaction": compaction, "gc_grace_seconds": 0}
+        schema = TableSchema(
+            keyspace="spacekey", table_name="table1", columns=columns, table_options=table_options
+        )
+        ddl = schema.make_ddl(bulk_load=True)
+        expected_ddl = """\
+CREATE TABLE "spacekey"."table1" (
+    "part1" longint,
+    "a" int,
+    PRIMARY KEY ("part1")
+) WITH compaction = {'class': 'LeveledCompactionStrategy', 'sstable_size_in_mb': '160', 'enabled': 'false'}
+    AND gc_grace_seconds = 0\
+"""
+        self.assertEqual(ddl, expected_ddl)
+        # Production options are not modified.
+        self.assertNotIn("enabled", compaction)
+        self.assertEqual(
+            schema.make_restore_ddl(),
+            'ALTER TABLE "spacekey"."table1" WITH compaction = '
+            "{'class': 'LeveledCompactionStrategy', 'sstable_size_in_mb': '160', 'enabled': 'true'}",
+        )
+
+        self.assertEqual(
+            schema.make_bulk_load_ddl(),
+            'ALTER TABLE "spacekey"."table1" WITH compaction = '
+            "{'class': 'LeveledCompactionStrategy', 'sstable_size_in_mb': '160', 'enabled': 'false'}",
+        )
+
+        # Compaction has to be specified, default depends on the cluster.
+        schema = TableSchema(keyspace="spacekey", table_name="table1", columns=columns, table_options={})
+        with self.assertRaises(ValueError):
+            schema.make_ddl(bulk_load=True)
+        with self.assertRaises(ValueError):
+            schema.make_restore_ddl()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,98 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+
+from lsst.dax.apdb_migrate.cassandra.offline import OfflineSession
+from lsst.dax.apdb_migrate.cassandra.schema import Schema
+from lsst.dax.apdb_migrate.cassandra.schema_snapshot import SchemaSnapshot
+from lsst.dax.apdb_migrate.cassandra.table_schema import Column, TableSchema
+from lsst.dax.apdb_migrate.cassandra.target_schema import TargetSchema
+
+_FELIS_YAML = """\
+name: ApdbSchema
+version:
+  current: "8.0.0"
+tables:
+- name: DiaSource
+  columns:
+  - name: diaSourceId
+    datatype: long
+  - name: ra
+    datatype: double
+  - name: isNegative
+    datatype: boolean
+"""
+
+
+class TargetSchemaTestCase(unittest.TestCase):
+    """Tests for target_schema module."""
+
+    def test_target_schema(self) -> None:
+        """Test reading felis schema and generating operations."""
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as file:
+            file.write(_FELIS_YAML)
+        try:
+            target = TargetSchema.from_felis(file.name)
+        finally:
+            os.unlink(file.name)
+        self.assertEqual(target.version, "8.0.0")
+        self.assertEqual(
+            target.tables, {"DiaSource": {"diaSourceId": "BIGINT", "ra": "DOUBLE", "isNegative": "BOOLEAN"}}
+        )
+
+        config = {"enable_replica": False, "time_partition_tables": True}
+        tables = {}
+        for table_name, extra_column in [
+            ("DiaSource_100", "is_negative"),
+            ("DiaSource_101", "isNegative"),
+            ("DiaObjectLast", None),
+        ]:
+            columns = [
+                Column("apdb_part", "bigint", "partition_key", 0),
+                Column("diaSourceId", "bigint", "clustering", 0, "asc"),
+                Column("ra", "double", "regular"),
+                Column("apdb_extra", "int", "regular"),
+            ]
+            if extra_column:
+                columns.append(Column(extra_column, "boolean", "regular"))
+            tables[table_name] = TableSchema("ks", table_name, columns, {})
+        schema = Schema(OfflineSession(SchemaSnapshot("ks", tables)), "ks", config)
+        self.assertEqual(
+            target.live_tables(schema), {"DiaSource_100": "DiaSource", "DiaSource_101": "DiaSource"}
+        )
+
+        additions, drops = target.operations(schema)
+        statements = [operation.statement(schema, "ks") for operation in additions + drops]
+        self.assertEqual(
+            statements,
+            [
+                'ALTER TABLE "ks"."DiaSource_100" ADD ("isNegative" BOOLEAN)',
+                None,
+                'ALTER TABLE "ks"."DiaSource_100" DROP ("is_negative")',
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
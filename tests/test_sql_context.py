@@ -0,0 +1,452 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import sqlalchemy
+from alembic.operations import Operations
+from alembic.runtime.environment import EnvironmentContext
+from alembic.runtime.migration import MigrationContext
+
+from lsst.dax.apdb_migrate.sql.config import ApdbMigConfigSql
+from lsst.dax.apdb_migrate.sql.context import Context, _copy_text
+from lsst.dax.apdb_migrate.sql.pragmas import pragmas_enabled, sqlite_pragmas
+
+_MIG_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "migrations", "sql")
+
+
+class ContextTestCase(unittest.TestCase):
+    """Tests for sql.context module."""
+
+    def setUp(self) -> None:
+        self.engine = sqlalchemy.create_engine("sqlite://")
+        self.connection = self.engine.connect()
+        self.addCleanup(self.connection.close)
+        config = ApdbMigConfigSql.from_mig_path(_MIG_PATH)
+        # Script directory is not needed to run individual operations.
+        env = EnvironmentContext(config, None)  # type: ignore[arg-type]
+        env.configure(connection=self.connection)
+        mig_context = env.get_context()
+        # This is what alembic does for each migration script on SQLite.
+        self.enterContext(mig_context.begin_transaction(_per_migration=True))
+        self.enterContext(Operations.context(mig_context))
+        self.enterContext(patch("alembic.context.is_offline_mode", return_value=False))
+        with patch("alembic.context.get_context", return_value=mig_context):
+            self.ctx = Context()
+
+    def test_bulk_insert(self) -> None:
+        """Test create_staging_table and bulk_insert methods."""
+        table = self.ctx.create_staging_table(
+            "staging",
+            sqlalchemy.schema.Column("id", sqlalchemy.BigInteger, primary_key=True),
+            sqlalchemy.schema.Column("value", sqlalchemy.Double),
+        )
+        inspector = sqlalchemy.inspect(self.connection)
+        self.assertNotIn("staging", inspector.get_table_names())
+        self.assertIn("staging", inspector.get_temp_table_names())
+
+        count = self.ctx.bulk_insert(table, ((i, i / 2) for i in range(10)))
+        self.assertEqual(count, 10)
+
+        # Masked values become NULL, column order follows mapping.
+        value = np.ma.array([1.0, 2.0, 3.0], mask=[False, True, False])
+        count = self.ctx.bulk_insert(table, {"value": value, "id": np.array([10, 11, 12])})
+        self.assertEqual(count, 3)
+
+        rows = self.connection.execute(sqlalchemy.select(table).order_by(table.columns.id)).all()
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[3], (3, 1.5))
+        self.assertEqual(rows[10:], [(10, 1.0), (11, None), (12, 3.0)])
+
+        # Non-temporary table is created in the migrated schema.
+        table = self.ctx.create_staging_table(
+            "staging2", sqlalchemy.schema.Column("id", sqlalchemy.BigInteger), temporary=False
+        )
+        self.assertIn("staging2", sqlalchemy.inspect(self.connection).get_table_names())
+        self.assertEqual(self.ctx.bulk_insert(table, []), 0)
+
+    def test_update_from(self) -> None:
+        """Test update_from method."""
+        metadata = sqlalchemy.MetaData()
+        target = sqlalchemy.schema.Table(
+            "target",
+            metadata,
+            sqlalchemy.schema.Column("id", sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.schema.Column("a", sqlalchemy.Integer),
+            sqlalchemy.schema.Column("b", sqlalchemy.Integer),
+        )
+        source = sqlalchemy.schema.Table(
+            "source",
+            metadata,
+            sqlalchemy.schema.Column("source_id", sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.schema.Column("x", sqlalchemy.Integer),
+        )
+        metadata.create_all(self.connection)
+
+        for version in ((3, 40, 0), (3, 20, 0)):
+            with self.subTest(version=version):
+                self.connection.execute(target.delete())
+                self.connection.execute(source.delete())
+                self.connection.execute(target.insert(), [{"id": i, "a": -1, "b": -1} for i in range(5)])
+                self.connection.execute(source.insert(), [{"source_id": i, "x": i * 10} for i in range(3)])
+                with patch.object(self.connection.dialect, "server_version_info", version):
+                    count = self.ctx.update_from(
+                        target,
+                        source,
+                        on={"id": "source_id"},
+                        values={"a": "x", "b": source.columns.x + target.columns.id},
+                    )
+                self.assertEqual(count, 3)
+                rows = self.connection.execute(sqlalchemy.select(target).order_by(target.columns.id)).all()
+                self.assertEqual(rows, [(0, 0, 0), (1, 10, 11), (2, 20, 22), (3, -1, -1), (4, -1, -1)])
+
+    def test_chunked_update(self) -> None:
+        """Test chunked_update method."""
+        table = self.ctx.create_staging_table(
+            "data",
+            sqlalchemy.schema.Column("id", sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.schema.Column("value", sqlalchemy.Integer),
+            temporary=False,
+        )
+        self.ctx.bulk_insert(table, ((i, i if i % 3 else None) for i in range(5000)))
+        update = table.update().values(value=-table.columns.id).where(table.columns.value.is_(None))
+
+        for commit in (False, True):
+            with self.subTest(commit=commit):
+                with self.assertLogs("lsst.dax.apdb_migrate.sql.context", "DEBUG") as cm:
+                    count = self.ctx.chunked_update(update, chunk_size=1000, commit=commit)
+                self.assertEqual(count, 1667 if not commit else 0)
+                # Chunk size doubles after each fast chunk: 1000, 2000, rest.
+                self.assertEqual(len([line for line in cm.output if " chunk " in line]), 3)
+
+        query = sqlalchemy.select(sqlalchemy.func.count()).where(table.columns.value < 0)
+        self.assertEqual(self.connection.execute(query).scalar(), 1666)
+
+    def test_coalesce_batches(self) -> None:
+        """Test merging of batch operations."""
+        self.connection.exec_driver_sql("CREATE TABLE data (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)")
+        self.connection.exec_driver_sql("CREATE INDEX idx_data_b ON data (b)")
+        self.connection.exec_driver_sql("INSERT INTO data VALUES (1, 10, 100)")
+
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.context", "INFO") as cm:
+            with self.ctx.coalesce_batches():
+                with self.ctx.batch_alter_table("data") as batch_op:
+                    batch_op.alter_column("a", new_column_name="a2")
+                    batch_op.add_column(sqlalchemy.Column("c", sqlalchemy.Integer))
+                with self.ctx.batch_alter_table("data") as batch_op:
+                    batch_op.alter_column("a2", new_column_name="a3")
+                    batch_op.alter_column("a3", nullable=False)
+                    batch_op.drop_index("idx_data_b")
+                    batch_op.drop_column("b")
+                    batch_op.create_index("idx_data_a3", ["a3", "c"])
+                self.assertEqual(self.ctx.get_column_names("data"), ["id", "a3", "c"])
+                # Nothing has changed in database yet.
+                inspector = sqlalchemy.inspect(self.connection)
+                self.assertEqual([c["name"] for c in inspector.get_columns("data")], ["id", "a", "b"])
+
+                # Data access executes queued operations.
+                table = self.ctx.get_table("data")
+                self.assertEqual(set(table.columns.keys()), {"id", "a3", "c"})
+                self.ctx.chunked_update(table.update().values(c=table.columns.a3 + 1), commit=False)
+
+                with self.ctx.batch_alter_table("data") as batch_op:
+                    batch_op.alter_column("c", new_column_name="c2")
+
+        self.assertEqual(len([line for line in cm.output if "queued batch operations" in line]), 2)
+        inspector = sqlalchemy.inspect(self.connection)
+        columns = {column["name"]: column for column in inspector.get_columns("data")}
+        self.assertEqual(set(columns), {"id", "a3", "c2"})
+        self.assertFalse(columns["a3"]["nullable"])
+        self.assertEqual(
+            [(index["name"], index["column_names"]) for index in inspector.get_indexes("data")],
+            [("idx_data_a3", ["a3", "c2"])],
+        )
+        self.assertEqual(self.connection.exec_driver_sql("SELECT id, a3, c2 FROM data").all(), [(1, 10, 11)])
+
+    def test_alter_in_place(self) -> None:
+        """Test that SQLite uses ALTER TABLE when possible."""
+        self.connection.exec_driver_sql("CREATE TABLE data (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)")
+        self.connection.exec_driver_sql("CREATE INDEX idx_data_b ON data (b)")
+        self.connection.exec_driver_sql("INSERT INTO data VALUES (1, 10, 100)")
+
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.context", "INFO") as cm:
+            with self.ctx.batch_alter_table("data") as batch_op:
+                batch_op.alter_column("a", new_column_name="a2")
+                batch_op.alter_column("a2", new_column_name="a3")
+                batch_op.add_column(sqlalchemy.Column("c", sqlalchemy.Integer))
+                batch_op.create_index("idx_data_c", ["c"])
+                batch_op.drop_column("a3")
+        self.assertTrue(cm.output[-1].endswith("in place"))
+        self.assertEqual(self.ctx.get_column_names("data"), ["id", "b", "c"])
+
+        # Indexed column can be dropped after its index.
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.context", "INFO") as cm:
+            with self.ctx.batch_alter_table("data") as batch_op:
+                batch_op.drop_index("idx_data_b")
+                batch_op.drop_column("b")
+        self.assertTrue(cm.output[-1].endswith("in place"))
+
+        # Other changes need re-creation of the table.
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.context", "INFO") as cm:
+            with self.ctx.batch_alter_table("data") as batch_op:
+                batch_op.alter_column("c", nullable=False, existing_type=sqlalchemy.Integer)
+                batch_op.drop_index("idx_data_c")
+                batch_op.drop_column("c")
+        self.assertFalse(cm.output[-1].endswith("in place"))
+        self.assertEqual(self.ctx.get_column_names("data"), ["id"])
+        self.assertEqual(self.connection.exec_driver_sql("SELECT * FROM data").all(), [(1,)])
+
+    def test_sqlite_pragmas(self) -> None:
+        """Test sqlite_pragmas method."""
+
+        def _pragma(name: str) -> int:
+            return self.connection.exec_driver_sql(f"PRAGMA {name}").scalar_one()
+
+        cache_size, synchronous = _pragma("cache_size"), _pragma("synchronous")
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.pragmas", "WARNING") as cm:
+            with self.ctx.sqlite_pragmas():
+                self.assertEqual(_pragma("cache_size"), -262144)
+                self.assertEqual(_pragma("synchronous"), 0)
+                self.assertEqual(_pragma("temp_store"), 2)
+                # Temporary table prevents restoring temp_store.
+                self.ctx.create_staging_table("staging", sqlalchemy.schema.Column("id", sqlalchemy.Integer))
+        self.assertEqual(_pragma("cache_size"), cache_size)
+        self.assertEqual(_pragma("synchronous"), synchronous)
+        self.assertEqual(_pragma("temp_store"), 2)
+        self.assertIn("Cannot restore SQLite pragma temp_store", cm.output[0])
+
+        # Only cache size can be changed after DML in a transaction.
+        self.connection.exec_driver_sql("CREATE TABLE data (id INTEGER)")
+        self.connection.exec_driver_sql("INSERT INTO data VALUES (1)")
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.pragmas", "WARNING") as cm:
+            with self.ctx.sqlite_pragmas():
+                self.assertEqual(_pragma("cache_size"), -262144)
+                self.assertEqual(_pragma("synchronous"), synchronous)
+        self.assertEqual(len(cm.output), 3)
+
+    def test_connection_sqlite_pragmas(self) -> None:
+        """Test sqlite_pragmas applied to a connection before migration
+        starts.
+        """
+        with self.engine.connect() as connection:
+
+            def _pragma(name: str) -> int:
+                return connection.exec_driver_sql(f"PRAGMA {name}").scalar_one()
+
+            synchronous, temp_store = _pragma("synchronous"), _pragma("temp_store")
+            connection.commit()
+            with sqlite_pragmas(connection):
+                self.assertFalse(connection.in_transaction())
+                with connection.begin():
+                    connection.exec_driver_sql("CREATE TABLE data (id INTEGER)")
+                    connection.exec_driver_sql("INSERT INTO data VALUES (1)")
+                    self.assertEqual(_pragma("synchronous"), 0)
+                    self.assertEqual(_pragma("temp_store"), 2)
+                    with patch.object(self.ctx, "bind", connection):
+                        with self.assertNoLogs("lsst.dax.apdb_migrate.sql.pragmas", "WARNING"):
+                            with self.ctx.sqlite_pragmas():
+                                self.assertEqual(_pragma("synchronous"), 0)
+            self.assertFalse(connection.in_transaction())
+            self.assertEqual(_pragma("synchronous"), synchronous)
+            self.assertEqual(_pragma("temp_store"), temp_store)
+
+        # Disabled profile does not change anything.
+        with self.engine.connect() as connection, sqlite_pragmas(connection, pragmas_enabled("no")):
+            self.assertEqual(connection.exec_driver_sql("PRAGMA synchronous").scalar_one(), synchronous)
+
+    def test_set_not_null(self) -> None:
+        """Test set_not_null method on SQLite."""
+        self.connection.exec_driver_sql("CREATE TABLE data (id INTEGER PRIMARY KEY, a INTEGER)")
+        self.ctx.set_not_null("data", ["a"])
+        columns = sqlalchemy.inspect(self.connection).get_columns("data")
+        self.assertFalse(columns[1]["nullable"])
+
+    def test_suspended_indexes(self) -> None:
+        """Test suspended_indexes method."""
+        self.connection.exec_driver_sql("CREATE TABLE data (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)")
+        self.connection.exec_driver_sql("CREATE INDEX idx_data_a ON data (a)")
+        self.connection.exec_driver_sql("CREATE INDEX idx_data_b ON data (b)")
+        self.connection.exec_driver_sql("CREATE UNIQUE INDEX idx_data_ab ON data (a, b)")
+
+        def _indexes() -> set[str | None]:
+            return {index["name"] for index in sqlalchemy.inspect(self.connection).get_indexes("data")}
+
+        with self.ctx.suspended_indexes("data", keep=["idx_data_b"]) as indexes:
+            self.assertEqual(indexes, {"idx_data_a": ["a"]})
+            self.assertEqual(_indexes(), {"idx_data_b", "idx_data_ab"})
+            self.connection.exec_driver_sql("INSERT INTO data VALUES (1, 10, 100)")
+            # Replace index with a different one.
+            del indexes["idx_data_a"]
+            indexes["idx_data_a_b"] = ["a", "b"]
+        self.assertEqual(_indexes(), {"idx_data_a_b", "idx_data_b", "idx_data_ab"})
+
+        # Dropped indices are reported when they cannot be re-created.
+        with self.assertLogs("lsst.dax.apdb_migrate.sql.context", "WARNING") as cm:
+            with self.assertRaises(RuntimeError):
+                with self.ctx.suspended_indexes("data"):
+                    raise RuntimeError("failure")
+        self.assertIn("idx_data_a_b (a, b)", cm.output[0])
+        self.assertIn("idx_data_a_b, idx_data_b", cm.output[-1])
+
+    def test_rebuild_table(self) -> None:
+        """Test rebuild_table method on SQLite, which does not rebuild."""
+        self.connection.exec_driver_sql("CREATE TABLE data (id INTEGER PRIMARY KEY, a INTEGER, b INTEGER)")
+        self.connection.exec_driver_sql("CREATE INDEX idx_data_a ON data (a)")
+        self.connection.exec_driver_sql("INSERT INTO data VALUES (1, 10, 100), (2, 20, 200)")
+
+        table = self.ctx.get_table("data")
+        values = {"a2": table.columns.a * 2}
+        with self.ctx.rebuild_table("data", values=values) as batch_op:
+            batch_op.add_column(sqlalchemy.Column("a2", sqlalchemy.Integer))
+            batch_op.drop_index("idx_data_a")
+            batch_op.create_index("idx_data_a2", ["a2"])
+            batch_op.drop_column("a")
+            batch_op.alter_column("b", new_column_name="b2")
+        self.assertEqual(set(self.ctx.get_column_names("data")), {"id", "a2", "b2"})
+        self.assertEqual(
+            self.connection.exec_driver_sql("SELECT id, a2, b2 FROM data ORDER BY id").all(),
+            [(1, 20, 100), (2, 40, 200)],
+        )
+
+        with self.assertRaises(ValueError):
+            with self.ctx.rebuild_table("data", values={"b2": table.columns.b}):
+                pass
+
+    def test_copy_text(self) -> None:
+        """Test conversion of rows to COPY text format."""
+        rows = [
+            (1, None, True, "a\tb\\c\nd"),
+            (float("nan"), float("-inf"), 1.5, datetime.datetime(2025, 1, 2, 3, 4, 5, 6)),
+        ]
+        self.assertEqual(
+            _copy_text(rows),
+            "1\t\\N\tt\ta\\tb\\\\c\\nd\nNaN\t-Infinity\t1.5\t2025-01-02 03:04:05.000006\n",
+        )
+
+
+class PostgresContextTestCase(unittest.TestCase):
+    """Tests for sql.context module using PostgreSQL in offline mode."""
+
+    def setUp(self) -> None:
+        self.buffer = io.StringIO()
+        mig_context = MigrationContext.configure(
+            dialect_name="postgresql",
+            opts={"as_sql": True, "output_buffer": self.buffer, "version_table_schema": "apdb"},
+        )
+        self.enterContext(Operations.context(mig_context))
+        self.enterContext(mig_context.begin_transaction())
+        with patch("alembic.context.get_context", return_value=mig_context):
+            self.ctx = Context()
+
+    def test_set_not_null(self) -> None:
+        """Test set_not_null method."""
+        self.ctx.set_not_null("DiaObject", ["ra", "nDiaSources"], commit=True)
+        statements = [line.rstrip(";") for line in self.buffer.getvalue().splitlines() if line]
+        self.assertEqual(
+            statements,
+            [
+                "BEGIN",
+                "COMMIT",
+                'ALTER TABLE apdb."DiaObject" ADD CONSTRAINT ra_not_null_tmp '
+                "CHECK (ra IS NOT NULL) NOT VALID",
+                'ALTER TABLE apdb."DiaObject" ADD CONSTRAINT "nDiaSources_not_null_tmp" '
+                'CHECK ("nDiaSources" IS NOT NULL) NOT VALID',
+                'ALTER TABLE apdb."DiaObject" VALIDATE CONSTRAINT ra_not_null_tmp',
+                'ALTER TABLE apdb."DiaObject" VALIDATE CONSTRAINT "nDiaSources_not_null_tmp"',
+                'ALTER TABLE apdb."DiaObject" ALTER COLUMN ra SET NOT NULL',
+                'ALTER TABLE apdb."DiaObject" ALTER COLUMN "nDiaSources" SET NOT NULL',
+                'ALTER TABLE apdb."DiaObject" DROP CONSTRAINT ra_not_null_tmp',
+                'ALTER TABLE apdb."DiaObject" DROP CONSTRAINT "nDiaSources_not_null_tmp"',
+                "BEGIN",
+            ],
+        )
+
+        # Without commits column is altered directly.
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.ctx.set_not_null("DiaObject", ["ra"], commit=False)
+        self.assertEqual(
+            self.buffer.getvalue().strip(), 'ALTER TABLE apdb."DiaObject" ALTER COLUMN ra SET NOT NULL;'
+        )
+
+    def test_rebuild_table(self) -> None:
+        """Test rebuild_table method."""
+        table = sqlalchemy.schema.Table(
+            "DiaObject",
+            sqlalchemy.schema.MetaData(schema="apdb"),
+            sqlalchemy.schema.Column("id", sqlalchemy.BigInteger),
+            sqlalchemy.schema.Column("time", sqlalchemy.TIMESTAMP),
+            sqlalchemy.schema.Column("flux", sqlalchemy.Float, comment="Flux"),
+            sqlalchemy.schema.Column("extra", sqlalchemy.Float),
+            sqlalchemy.schema.PrimaryKeyConstraint("id", "time", name="DiaObject_pkey"),
+            sqlalchemy.schema.Index("IDX_DiaObject_time", "time"),
+            sqlalchemy.schema.Index("IDX_DiaObject_flux", "flux", postgresql_using="brin"),
+            comment="Objects",
+        )
+        with patch.object(self.ctx, "get_table", return_value=table):
+            with self.ctx.rebuild_table(
+                "DiaObject",
+                values={"mjd": sqlalchemy.extract("epoch", table.columns.time)},
+                rebuild=True,
+            ) as batch_op:
+                batch_op.add_column(sqlalchemy.Column("mjd", sqlalchemy.Double))
+                batch_op.drop_constraint("DiaObject_pkey")
+                batch_op.create_primary_key("DiaObject_pkey", ["id", "mjd"])
+                batch_op.drop_index("IDX_DiaObject_time")
+                batch_op.create_index("IDX_DiaObject_mjd", ["mjd"])
+                batch_op.drop_column("time")
+                batch_op.drop_column("extra")
+                batch_op.alter_column("flux", new_column_name="psfFlux", type_=sqlalchemy.REAL)
+        statements = [" ".join(statement.split()) for statement in self.buffer.getvalue().split(";")]
+        self.assertEqual(
+            [statement for statement in statements if statement],
+            [
+                "BEGIN",
+                'LOCK TABLE apdb."DiaObject" IN SHARE MODE',
+                'DROP TABLE IF EXISTS apdb."DiaObject_rebuild"',
+                'CREATE TABLE apdb."DiaObject_rebuild" '
+                '( id BIGINT NOT NULL, "psfFlux" REAL, mjd DOUBLE PRECISION )',
+                """COMMENT ON TABLE apdb."DiaObject_rebuild" IS 'Objects'""",
+                """COMMENT ON COLUMN apdb."DiaObject_rebuild"."psfFlux" IS 'Flux'""",
+                'INSERT INTO apdb."DiaObject_rebuild" (id, "psfFlux", mjd) SELECT apdb."DiaObject".id, '
+                'CAST(apdb."DiaObject".flux AS REAL) AS flux, '
+                'EXTRACT(epoch FROM apdb."DiaObject".time) AS anon_1 FROM apdb."DiaObject"',
+                'ALTER TABLE apdb."DiaObject_rebuild" '
+                'ADD CONSTRAINT "DiaObject_rebuild_pkey" PRIMARY KEY (id, mjd)',
+                'CREATE INDEX "DiaObject_rebuild_idx0" ON apdb."DiaObject_rebuild" USING brin ("psfFlux")',
+                'CREATE INDEX "DiaObject_rebuild_idx1" ON apdb."DiaObject_rebuild" (mjd)',
+                'DROP TABLE apdb."DiaObject"',
+                'ALTER TABLE apdb."DiaObject_rebuild" RENAME TO "DiaObject"',
+                'ALTER TABLE apdb."DiaObject" RENAME CONSTRAINT "DiaObject_rebuild_pkey" TO "DiaObject_pkey"',
+                'ALTER INDEX apdb."DiaObject_rebuild_idx0" RENAME TO "IDX_DiaObject_flux"',
+                'ALTER INDEX apdb."DiaObject_rebuild_idx1" RENAME TO "IDX_DiaObject_mjd"',
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
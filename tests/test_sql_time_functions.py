@@ -0,0 +1,113 @@
+# This file is part of dax_apdb_migrate.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import unittest
+
+import sqlalchemy
+from astropy.time import Time
+from sqlalchemy.dialects import postgresql
+
+from lsst.dax.apdb_migrate.sql.time_functions import (
+    create_leap_seconds_table,
+    leap_seconds,
+    mjd_to_timestamp,
+    timestamp_to_mjd,
+)
+
+# One microsecond in days.
+_MICROSECOND = 1e-6 / 86400
+
+
+class TimeFunctionsTestCase(unittest.TestCase):
+    """Tests for time_functions module."""
+
+    def setUp(self) -> None:
+        self.engine = sqlalchemy.create_engine("sqlite://")
+        self.metadata = sqlalchemy.MetaData()
+        self.table = sqlalchemy.Table(
+            "data",
+            self.metadata,
+            sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column("timestamp", sqlalchemy.TIMESTAMP),
+            sqlalchemy.Column("mjd", sqlalchemy.Double),
+        )
+        # Timestamps around leap seconds and with various fractions.
+        self.timestamps: list[datetime.datetime | None] = [
+            datetime.datetime(2016, 12, 31, 23, 59, 59, 999999),
+            datetime.datetime(2017, 1, 1, 0, 0, 0),
+            datetime.datetime(2017, 1, 1, 0, 0, 36, 500000),
+            datetime.datetime(2025, 8, 25, 11, 38, 59, 590064),
+            datetime.datetime(1985, 3, 1, 12, 0, 0, 1),
+            None,
+        ]
+        self.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(
+                self.table.insert(), [{"id": i, "timestamp": ts} for i, ts in enumerate(self.timestamps)]
+            )
+
+    def test_leap_seconds(self) -> None:
+        """Test leap seconds table."""
+        table = leap_seconds()
+        self.assertEqual(table[0][2], 10.0)
+        self.assertEqual(table[-1][0], Time("2017-01-01", scale="utc").mjd)
+        self.assertEqual(table[-1][2], 37.0)
+
+    def test_conversion(self) -> None:
+        """Test conversion in both directions against astropy."""
+        table = self.table
+        with self.engine.begin() as connection:
+            leap_table = create_leap_seconds_table(connection, self.metadata)
+            for scale in ("tai", "utc"):
+                to_mjd = timestamp_to_mjd(
+                    table.columns.timestamp, "sqlite", scale=scale, leap_table=leap_table
+                )
+                connection.execute(table.update().values(mjd=to_mjd))
+                to_timestamp = mjd_to_timestamp(
+                    table.columns.mjd, "sqlite", scale=scale, leap_table=leap_table
+                )
+                query = sqlalchemy.select(table.columns.mjd, to_timestamp).order_by(table.columns.id)
+                rows = connection.execute(query).all()
+                for timestamp, (mjd, timestamp_str) in zip(self.timestamps, rows, strict=True):
+                    if timestamp is None:
+                        self.assertIsNone(mjd)
+                        self.assertIsNone(timestamp_str)
+                        continue
+                    expected = Time(timestamp, format="datetime", scale=scale).tai.mjd
+                    self.assertAlmostEqual(mjd, expected, delta=_MICROSECOND)
+                    self.assertEqual(datetime.datetime.fromisoformat(timestamp_str), timestamp)
+
+    def test_errors(self) -> None:
+        """Test for errors and PostgreSQL expressions."""
+        column = self.table.columns.timestamp
+        with self.assertRaises(ValueError):
+            timestamp_to_mjd(column, "mysql")
+        with self.assertRaises(ValueError):
+            mjd_to_timestamp(self.table.columns.mjd, "sqlite", scale="utc")
+
+        update = self.table.update().values(mjd=timestamp_to_mjd(column, "postgresql"))
+        self.assertIn("EXTRACT(epoch FROM data.timestamp)", str(update.compile(dialect=postgresql.dialect())))
+
+
+if __name__ == "__main__":
+    unittest.main()